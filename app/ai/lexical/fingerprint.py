@@ -0,0 +1,218 @@
+# app/ai/lexical/fingerprint.py
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ai.lexical.shingles import Tokenizer, gram_hashes
+from app.utils.artifact_utils import (
+    META_FILE,
+    check_meta,
+    load_arrays,
+    read_meta,
+    save_arrays,
+    staging_dir,
+    write_json,
+)
+
+ARTIFACT_VERSION = 1
+ARRAY_FILES = ("keys", "offsets", "docs", "starts", "ends")
+
+
+class FingerprintIndex:
+    """
+    Winnowing sobre k-gramas de palavras para detectar cópia literal.
+    Cada documento vira um conjunto de fingerprints (hash do k-grama + trecho de
+    caracteres) guardados num índice invertido em arrays: `keys` ordenadas,
+    `offsets` para as postings e, por posting, (doc, início, fim).
+    Uma consulta só procura os próprios fingerprints, então o custo depende do
+    tamanho da query e não do corpus.
+    Uso:
+        fp = FingerprintIndex(k=5, window=4)
+        fp.fit(corpus)
+        fp.search("meu trecho copiado", top_k=5)
+    """
+
+    def __init__(self, k: int = 5, window: int = 4):
+        self.k = k
+        self.window = window
+        self.n_docs = 0
+        self._keys: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._docs: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+        self._ends: Optional[np.ndarray] = None
+        self._tokenizer = Tokenizer()
+
+    def fingerprints(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calcula os fingerprints de um texto por winnowing.
+        Saída: (hashes, início, fim), com o trecho de caracteres de cada k-grama.
+        """
+        tok_hashes, tok_starts, tok_ends = self._tokenizer.tokenize(text)
+        grams = gram_hashes(tok_hashes, self.k)
+        if grams.size == 0:
+            empty = np.empty(0, dtype=np.int32)
+            return grams, empty, empty
+
+        # em cada janela fica o menor hash (o mais à direita em caso de empate)
+        w = min(self.window, grams.size)
+        windows = np.lib.stride_tricks.sliding_window_view(grams, w)
+        picked = np.arange(windows.shape[0]) + (w - 1 - np.argmin(windows[:, ::-1], axis=1))
+        picked = picked[np.concatenate(([True], picked[1:] != picked[:-1]))]
+
+        return (
+            grams[picked],
+            tok_starts[picked],
+            tok_ends[picked + self.k - 1],
+        )
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """Calcula os fingerprints de todos os documentos e monta o índice invertido."""
+        hashes, docs, starts, ends = [], [], [], []
+        for i, text in enumerate(texts):
+            h, s, e = self.fingerprints(text)
+            hashes.append(h)
+            docs.append(np.full(h.size, i, dtype=np.int32))
+            starts.append(s)
+            ends.append(e)
+
+        all_hashes = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+        order = np.argsort(all_hashes, kind="stable")
+        sorted_hashes = all_hashes[order]
+        keys, first = np.unique(sorted_hashes, return_index=True)
+
+        self.n_docs = len(texts)
+        self._keys = keys
+        self._offsets = np.append(first, sorted_hashes.size).astype(np.int64)
+        self._docs = np.concatenate(docs)[order] if docs else np.empty(0, dtype=np.int32)
+        self._starts = np.concatenate(starts)[order] if starts else np.empty(0, dtype=np.int32)
+        self._ends = np.concatenate(ends)[order] if ends else np.empty(0, dtype=np.int32)
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Retorna os documentos que compartilham fingerprints com a `query`.
+        `similarity` é a fração dos fingerprints da query encontrada no documento, e
+        `spans` traz os trechos (query_start, query_end, doc_start, doc_end) em comum.
+        """
+        if self._keys is None:
+            raise RuntimeError("Chame fit(corpus) antes de search().")
+
+        q_hashes, q_starts, q_ends = self.fingerprints(query)
+        if q_hashes.size == 0 or self._keys.size == 0:
+            return []
+
+        postings, q_idx = self._lookup(q_hashes)
+        if postings.size == 0:
+            return []
+        docs = np.asarray(self._docs[postings])
+
+        n_unique = np.unique(q_hashes).size
+        doc_ids, matched = self._count_matches(docs, q_hashes[q_idx])
+        k = min(max(1, top_k), doc_ids.size)
+        best = np.argsort(-matched, kind="stable")[:k]
+
+        results: List[Dict[str, Any]] = []
+        for b in best:
+            doc = int(doc_ids[b])
+            mask = docs == doc
+            spans = self._merge_spans(
+                q_starts[q_idx[mask]],
+                q_ends[q_idx[mask]],
+                np.asarray(self._starts[postings[mask]]),
+                np.asarray(self._ends[postings[mask]]),
+            )
+            results.append(
+                {"index": doc, "similarity": float(matched[b]) / n_unique, "spans": spans}
+            )
+        return results
+
+    def _lookup(self, q_hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca binária dos hashes da query nas `keys`.
+        Saída: (posições das postings encontradas, índice do fingerprint da query de cada uma).
+        """
+        loc = np.minimum(np.searchsorted(self._keys, q_hashes), self._keys.size - 1)
+        found = np.flatnonzero(self._keys[loc] == q_hashes)
+
+        begins = self._offsets[loc[found]]
+        lengths = self._offsets[loc[found] + 1] - begins
+        postings = np.repeat(begins - np.cumsum(lengths) + lengths, lengths) + np.arange(
+            lengths.sum()
+        )
+        return postings, np.repeat(found, lengths)
+
+    @staticmethod
+    def _count_matches(docs: np.ndarray, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Conta, por documento, quantos hashes distintos da query ele contém."""
+        pairs = np.unique(np.stack([docs.astype(np.uint64), hashes]), axis=1)
+        return np.unique(pairs[0].astype(np.int64), return_counts=True)
+
+    @staticmethod
+    def _merge_spans(
+        q_starts: np.ndarray, q_ends: np.ndarray, d_starts: np.ndarray, d_ends: np.ndarray
+    ) -> List[Dict[str, int]]:
+        """Junta trechos que se sobrepõem tanto na query quanto no documento."""
+        order = np.lexsort((q_starts, d_starts))
+        spans: List[Dict[str, int]] = []
+        for i in order:
+            qs, qe, ds, de = int(q_starts[i]), int(q_ends[i]), int(d_starts[i]), int(d_ends[i])
+            if spans and ds <= spans[-1]["doc_end"] and qs <= spans[-1]["query_end"]:
+                last = spans[-1]
+                last["query_start"] = min(last["query_start"], qs)
+                last["query_end"] = max(last["query_end"], qe)
+                last["doc_end"] = max(last["doc_end"], de)
+                continue
+            spans.append({"query_start": qs, "query_end": qe, "doc_start": ds, "doc_end": de})
+        return spans
+
+    def save(self, path: str, corpus_sha1: str) -> None:
+        """Grava o índice invertido em `path` (arrays .npy + meta.json)."""
+        if self._keys is None:
+            raise RuntimeError("Chame fit(corpus) antes de save().")
+
+        with staging_dir(path) as tmp_path:
+            save_arrays(
+                tmp_path,
+                {
+                    "keys": self._keys,
+                    "offsets": self._offsets,
+                    "docs": self._docs,
+                    "starts": self._starts,
+                    "ends": self._ends,
+                },
+            )
+            write_json(
+                os.path.join(tmp_path, META_FILE),
+                {
+                    "version": ARTIFACT_VERSION,
+                    "corpus_sha1": corpus_sha1,
+                    "n_docs": self.n_docs,
+                    "k": self.k,
+                    "window": self.window,
+                },
+            )
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[Dict[str, Any]]:
+        """Lê o meta.json de um artefato. Retorna None se não existir ou for inválido."""
+        return read_meta(path)
+
+    @classmethod
+    def load(
+        cls, path: str, corpus_sha1: Optional[str] = None, mmap: bool = True
+    ) -> "FingerprintIndex":
+        """
+        Carrega um índice gravado por save(), com os arrays mapeados em memória.
+        Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado.
+        """
+        meta = check_meta(path, "de fingerprints", ARTIFACT_VERSION, corpus_sha1)
+        fp = cls(k=meta["k"], window=meta["window"])
+        arrays = load_arrays(path, ARRAY_FILES, mmap=mmap)
+        fp.n_docs = meta["n_docs"]
+        fp._keys = arrays["keys"]
+        fp._offsets = arrays["offsets"]
+        fp._docs = arrays["docs"]
+        fp._starts = arrays["starts"]
+        fp._ends = arrays["ends"]
+        return fp
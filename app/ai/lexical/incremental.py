@@ -0,0 +1,165 @@
+# app/ai/lexical/incremental.py
+import heapq
+import threading
+from itertools import chain
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.ai.lexical.tfidf import TextSimilarity
+
+Ranked = List[Tuple[int, float]]
+
+
+class _Segments:
+    """Estado publicado do índice; nunca é alterado depois de publicado."""
+
+    __slots__ = ("base", "deleted", "delta", "n_deleted")
+
+    def __init__(
+        self,
+        base: TextSimilarity,
+        delta: Optional[sparse.csr_matrix],
+        deleted: np.ndarray,
+        n_deleted: int,
+    ):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_deleted = n_deleted
+
+    @property
+    def n_base(self) -> int:
+        return self.base.n_docs
+
+    @property
+    def n_docs(self) -> int:
+        return self.n_base + (0 if self.delta is None else self.delta.shape[0])
+
+    def exclude(self, segment: slice) -> Optional[np.ndarray]:
+        """Máscara de removidos de um segmento (None sem remoções, para pular o filtro)."""
+        return self.deleted[segment] if self.n_deleted else None
+
+
+class IncrementalTextSimilarity:
+    """
+    TF-IDF que aceita inclusões e remoções de documentos sem refit, em segmentos:
+    a base (TextSimilarity ou ShardedTextSimilarity, treinada ou carregada do artefato),
+    um delta com os documentos incluídos (vetorizados com o vocabulário e o IDF da
+    base) e uma máscara de removidos. Cada alteração monta um novo estado e o publica
+    com uma única atribuição, então as consultas em andamento nunca veem meia alteração.
+    Termos novos só passam a contar quando o scripts/compact.py retreina a base com
+    todos os documentos numa nova versão do corpus.
+    Uso:
+        inc = IncrementalTextSimilarity(ts)
+        inc.add(["nova redação"])  # -> [índice do novo documento]
+        inc.delete([3])
+        inc.rank("meu trecho", top_k=5)
+    """
+
+    def __init__(self, base: TextSimilarity):
+        self._state = _Segments(base, None, np.zeros(base.n_docs, dtype=bool), 0)
+        self._n_indexed = base.n_docs
+        self._lock = threading.Lock()
+        self.doc_ids = base.doc_ids
+
+    @property
+    def n_docs(self) -> int:
+        return self._state.n_docs
+
+    @property
+    def n_delta(self) -> int:
+        """Documentos incluídos desde a última compactação."""
+        state = self._state
+        return state.n_docs - state.n_base
+
+    @property
+    def n_deleted(self) -> int:
+        """Documentos removidos desde a última compactação."""
+        return self._state.n_deleted
+
+    def is_deleted(self, index: int) -> bool:
+        deleted = self._state.deleted
+        return 0 <= index < deleted.size and bool(deleted[index])
+
+    def add(self, texts: List[str]) -> List[int]:
+        """Inclui documentos no fim do corpus. Saída: os índices atribuídos a eles."""
+        if not texts:
+            return []
+        with self._lock:
+            state = self._state
+            rows = state.base.transform(texts)
+            delta = rows if state.delta is None else sparse.vstack([state.delta, rows], "csr")
+            deleted = np.concatenate([state.deleted, np.zeros(len(texts), dtype=bool)])
+            self._state = _Segments(state.base, delta, deleted, state.n_deleted)
+        return list(range(state.n_docs, state.n_docs + len(texts)))
+
+    def delete(self, indices: List[int]) -> int:
+        """Marca documentos como removidos. Saída: quantos ainda não estavam removidos."""
+        with self._lock:
+            state = self._state
+            idx = np.asarray(indices, dtype=np.int64)
+            if idx.size and (idx.min() < 0 or idx.max() >= state.n_docs):
+                raise IndexError(f"Documento fora do intervalo (0..{state.n_docs - 1})")
+            removed = int(np.count_nonzero(~state.deleted[idx]))
+            deleted = state.deleted.copy()
+            deleted[idx] = True
+            self._state = _Segments(state.base, state.delta, deleted, state.n_deleted + removed)
+        return removed
+
+    def rank(self, query: str, top_k: int = 10, candidates: Optional[np.ndarray] = None) -> Ranked:
+        """
+        Mesmo contrato de TextSimilarity.rank. `candidates` (ex.: do MinHash) só cobre
+        os documentos do corpus indexado; os incluídos depois são sempre pontuados.
+        """
+        state = self._state
+        if candidates is not None and state.n_docs > self._n_indexed:
+            candidates = np.concatenate(
+                [candidates, np.arange(self._n_indexed, state.n_docs, dtype=np.int64)]
+            )
+        base_candidates = None if candidates is None else candidates[candidates < state.n_base]
+
+        # removidos saem antes da seleção do top-k de cada segmento
+        base, delta = slice(0, state.n_base), slice(state.n_base, None)
+        ranked = state.base.rank(
+            query, top_k, candidates=base_candidates, exclude=state.exclude(base)
+        )
+        if state.delta is None:
+            return ranked
+
+        scores = state.delta @ state.base.transform([query]).toarray()[0]
+        idx = np.flatnonzero(scores)
+        added = TextSimilarity._select(
+            *TextSimilarity._live(idx, scores[idx], state.exclude(delta)), top_k
+        )
+        return self._merge([ranked, self._shift(added, state.n_base)], top_k)
+
+    def rank_many(self, queries: List[str], top_k: int = 10) -> List[Ranked]:
+        """Versão em lote de rank(), com um produto matricial por segmento."""
+        state = self._state
+        base, delta = slice(0, state.n_base), slice(state.n_base, None)
+        ranked = state.base.rank_many(queries, top_k, exclude=state.exclude(base))
+        if state.delta is None or not queries:
+            return ranked
+
+        scores = (state.delta @ state.base.transform(queries).T).T.tocsr()
+        scores.eliminate_zeros()
+        out = []
+        for q, base_ranked in enumerate(ranked):
+            row = slice(scores.indptr[q], scores.indptr[q + 1])
+            added = TextSimilarity._select(
+                *TextSimilarity._live(scores.indices[row], scores.data[row], state.exclude(delta)),
+                top_k,
+            )
+            out.append(self._merge([base_ranked, self._shift(added, state.n_base)], top_k))
+        return out
+
+    @staticmethod
+    def _shift(ranked: Ranked, offset: int) -> Ranked:
+        return [(i + offset, s) for i, s in ranked]
+
+    @staticmethod
+    def _merge(parts: List[Ranked], top_k: int) -> Ranked:
+        """Top-k dos segmentos (empates ficam com o menor índice)."""
+        return heapq.nlargest(max(1, top_k), chain.from_iterable(parts), key=lambda x: x[1])
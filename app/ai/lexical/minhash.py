@@ -0,0 +1,150 @@
+# app/ai/lexical/minhash.py
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.ai.lexical.shingles import Tokenizer, gram_hashes
+from app.utils.artifact_utils import (
+    META_FILE,
+    check_meta,
+    load_arrays,
+    read_meta,
+    save_arrays,
+    staging_dir,
+    write_json,
+)
+
+ARTIFACT_VERSION = 1
+ARRAY_FILES = ("band_keys", "band_docs")
+
+_PRIME = np.uint64((1 << 31) - 1)
+_LOW_32 = np.uint64(0xFFFFFFFF)
+_BAND_MULT = np.uint64(0x9E3779B97F4A7C15)
+_SHINGLE_CHUNK = 4096
+
+
+class MinHashLSH:
+    """
+    Assinaturas MinHash de k-gramas de palavras com LSH por bandas, usadas como
+    gerador de candidatos: só documentos que colidem em pelo menos uma banda
+    seguem para o cosseno exato do TF-IDF.
+    Com `bands` bandas de `rows` linhas, a chance de um par com Jaccard `s` virar
+    candidato é 1 - (1 - s**rows) ** bands.
+    Uso:
+        lsh = MinHashLSH(bands=32, rows=4)
+        lsh.fit(corpus)
+        lsh.candidates("meu texto")  # array ordenado de índices do corpus
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4, shingle_k: int = 3, seed: int = 13):
+        self.bands = bands
+        self.rows = rows
+        self.shingle_k = shingle_k
+        self.seed = seed
+        self.n_docs = 0
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=bands * rows, dtype=np.uint64)
+        self._band_keys: Optional[np.ndarray] = None
+        self._band_docs: Optional[np.ndarray] = None
+        self._tokenizer = Tokenizer()
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Assinatura MinHash (bands * rows valores) do texto, ou None se ele for curto demais."""
+        tok_hashes, _, _ = self._tokenizer.tokenize(text)
+        shingles = np.unique(gram_hashes(tok_hashes, self.shingle_k) & _LOW_32)
+        if shingles.size == 0:
+            return None
+
+        sig = np.full(self._a.size, _PRIME, dtype=np.uint64)
+        for i in range(0, shingles.size, _SHINGLE_CHUNK):
+            chunk = shingles[i : i + _SHINGLE_CHUNK]
+            values = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % _PRIME
+            np.minimum(sig, values.min(axis=1), out=sig)
+        return sig
+
+    def _band_hashes(self, signatures: np.ndarray) -> np.ndarray:
+        """Combina as `rows` linhas de cada banda num único hash: (n, bands)."""
+        per_band = signatures.reshape(-1, self.bands, self.rows)
+        keys = np.zeros(per_band.shape[:2], dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for r in range(self.rows):
+                keys = keys * _BAND_MULT + per_band[:, :, r]
+        return keys
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """Calcula as assinaturas do corpus e monta, por banda, os buckets ordenados."""
+        signatures = np.empty((len(texts), self._a.size), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            sig = self.signature(text)
+            signatures[i] = _PRIME if sig is None else sig
+
+        keys = self._band_hashes(signatures).T
+        order = np.argsort(keys, axis=1, kind="stable")
+        self.n_docs = len(texts)
+        self._band_keys = np.take_along_axis(keys, order, axis=1)
+        self._band_docs = order.astype(np.int32)
+
+    def candidates(self, text: str) -> np.ndarray:
+        """Índices (ordenados) dos documentos que caem no mesmo bucket da query em alguma banda."""
+        if self._band_keys is None:
+            raise RuntimeError("Chame fit(corpus) antes de candidates().")
+
+        sig = self.signature(text)
+        if sig is None or self.n_docs == 0:
+            return np.empty(0, dtype=np.int64)
+
+        q_keys = self._band_hashes(sig)[0]
+        found = []
+        for b in range(self.bands):
+            band = self._band_keys[b]
+            lo = np.searchsorted(band, q_keys[b], side="left")
+            hi = np.searchsorted(band, q_keys[b], side="right")
+            if hi > lo:
+                found.append(np.asarray(self._band_docs[b, lo:hi]))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+    def save(self, path: str, corpus_sha1: str) -> None:
+        """Grava os buckets das bandas em `path` (arrays .npy + meta.json)."""
+        if self._band_keys is None:
+            raise RuntimeError("Chame fit(corpus) antes de save().")
+
+        with staging_dir(path) as tmp_path:
+            save_arrays(tmp_path, {"band_keys": self._band_keys, "band_docs": self._band_docs})
+            write_json(
+                os.path.join(tmp_path, META_FILE),
+                {
+                    "version": ARTIFACT_VERSION,
+                    "corpus_sha1": corpus_sha1,
+                    "n_docs": self.n_docs,
+                    "bands": self.bands,
+                    "rows": self.rows,
+                    "shingle_k": self.shingle_k,
+                    "seed": self.seed,
+                },
+            )
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[Dict[str, Any]]:
+        """Lê o meta.json de um artefato. Retorna None se não existir ou for inválido."""
+        return read_meta(path)
+
+    @classmethod
+    def load(cls, path: str, corpus_sha1: Optional[str] = None, mmap: bool = True) -> "MinHashLSH":
+        """
+        Carrega um índice gravado por save(), com os arrays mapeados em memória.
+        Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado.
+        """
+        meta = check_meta(path, "MinHash", ARTIFACT_VERSION, corpus_sha1)
+        lsh = cls(
+            bands=meta["bands"], rows=meta["rows"], shingle_k=meta["shingle_k"], seed=meta["seed"]
+        )
+        arrays = load_arrays(path, ARRAY_FILES, mmap=mmap)
+        lsh.n_docs = meta["n_docs"]
+        lsh._band_keys = arrays["band_keys"]
+        lsh._band_docs = arrays["band_docs"]
+        return lsh
@@ -0,0 +1,359 @@
+# app/ai/lexical/sharded.py
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.utils import murmurhash3_32
+
+from app.ai.lexical.tfidf import DOC_IDS_FILE, VOCABULARY_FILE, TextSimilarity
+from app.utils.artifact_utils import (
+    META_FILE,
+    check_meta,
+    load_arrays,
+    save_arrays,
+    staging_dir,
+    write_json,
+)
+from app.utils.json_utils import read_json
+
+ARTIFACT_VERSION = 1
+SHARD_DIR = "shard-{:03d}"
+SHARD_ARRAYS = ("data", "indices", "indptr")
+# buckets do pré-filtro de termos raros no fit (df por hash do termo)
+DF_BUCKETS = 1 << 22
+
+Ranked = List[Tuple[int, float]]
+
+
+class ShardedTextSimilarity(TextSimilarity):
+    """
+    TF-IDF com a matriz dividida em `n_shards` faixas contíguas de documentos, todas
+    com o mesmo vocabulário e IDF globais. Cada consulta é pontuada nas faixas em
+    paralelo (as operações esparsas do scipy liberam o GIL) e os top-k locais são
+    juntados por heap. Os rankings são os mesmos do TextSimilarity monolítico.
+    O fit lê o corpus faixa a faixa (ex.: de um DocumentStore mapeado em memória), sem
+    montar a matriz de contagens do corpus inteiro, e só guarda df/tf dos termos que
+    podem passar pelo min_df (ver fit()).
+    Uso:
+        ts = ShardedTextSimilarity(n_shards=4)
+        ts.fit(corpus)
+        ts.rank("meu trecho", top_k=5)
+    """
+
+    def __init__(self, n_shards: int = 4, workers: Optional[int] = None, **params: Any):
+        super().__init__(**params)
+        self.n_shards = n_shards
+        self.workers = workers or n_shards
+        self._shards: List[sparse.csr_matrix] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+
+    @property
+    def n_docs(self) -> int:
+        return int(self._offsets[-1])
+
+    def _executor(self) -> ThreadPoolExecutor:
+        """Pool de threads do processo atual (threads não sobrevivem ao fork dos workers)."""
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="lexical-shard")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _map(self, fn, *iterables) -> List[Any]:
+        if len(self._shards) == 1:
+            return list(map(fn, *iterables))
+        return list(self._executor().map(fn, *iterables))
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """
+        Passadas pelo corpus, uma faixa por vez (a matriz de contagens de cada faixa é
+        descartada logo em seguida), com as mesmas regras de min_df/max_df/max_features
+        do sklearn:
+        - com min_df > 1, o df é somado por bucket (hash do termo); o df de um termo nunca
+          passa o do seu bucket, então termos de bucket abaixo do min_df são descartados
+          sem entrar no dicionário de termos, que não cresce com os n-gramas raros;
+        - df/tf exatos dos demais termos, para o vocabulário e o IDF globais;
+        - vetorização de cada faixa já no vocabulário global, com o IDF.
+        """
+        n = len(texts)
+        self._offsets = np.linspace(0, n, max(1, min(self.n_shards, n)) + 1).astype(np.int64)
+        ranges = list(zip(self._offsets[:-1], self._offsets[1:]))
+        options = {
+            "lowercase": True,
+            "strip_accents": "unicode",
+            "ngram_range": tuple(self.params["ngram_range"]),
+        }
+        counter = CountVectorizer(**options)
+        min_count = self._min_count(n)
+        bucket_df = self._bucket_df(texts, ranges, counter) if min_count > 1 else None
+
+        # df/tf por termo frequente, somados faixa a faixa
+        ids: Dict[str, int] = {}
+        df = tf = np.zeros(0)
+        for start, end in ranges:
+            counts = counter.fit_transform(texts[i] for i in range(start, end)).tocsr()
+            terms = counter.get_feature_names_out()
+            local_df = np.bincount(counts.indices, minlength=terms.size)
+            local_tf = np.asarray(counts.sum(axis=0)).ravel()
+            del counts
+            if bucket_df is not None:
+                frequent = np.flatnonzero(bucket_df[self._buckets(terms)] >= min_count)
+                terms, local_df, local_tf = terms[frequent], local_df[frequent], local_tf[frequent]
+            local = np.fromiter(
+                (ids.setdefault(term, len(ids)) for term in terms), dtype=np.int64, count=terms.size
+            )
+            df = np.bincount(local, weights=local_df, minlength=len(ids)) + np.pad(
+                df, (0, len(ids) - df.size)
+            )
+            tf = np.bincount(local, weights=local_tf, minlength=len(ids)) + np.pad(
+                tf, (0, len(ids) - tf.size)
+            )
+        del bucket_df
+
+        # termos em ordem alfabética, como no sklearn
+        terms = sorted(ids)
+        order = np.fromiter((ids[t] for t in terms), dtype=np.int64, count=len(terms))
+        del ids
+        df, tf = df[order], tf[order]
+        keep = self._limit_terms(df, tf, n)
+
+        vocabulary = {terms[i]: col for col, i in enumerate(keep)}
+        idf = np.log((1 + n) / (1 + df[keep])) + 1
+        del terms, df, tf
+        self.vectorizer.vocabulary_ = vocabulary
+        self.vectorizer.idf_ = idf
+
+        # 2ª passada: contagens de cada faixa direto no vocabulário global
+        encoder = CountVectorizer(vocabulary=vocabulary, **options)
+        self._shards = [
+            self._prepare(
+                encoder.transform(texts[i] for i in range(start, end)).multiply(idf[np.newaxis, :])
+            )
+            for start, end in ranges
+        ]
+
+    @staticmethod
+    def _buckets(terms: np.ndarray) -> np.ndarray:
+        """Bucket do pré-filtro de cada termo."""
+        hashes = (murmurhash3_32(str(term), positive=True) for term in terms)
+        return np.fromiter(hashes, dtype=np.int64, count=len(terms)) % DF_BUCKETS
+
+    def _bucket_df(
+        self, texts: Sequence[str], ranges: List[Tuple[int, int]], counter: CountVectorizer
+    ) -> np.ndarray:
+        """df de cada bucket: soma do df dos termos que caem nele (limite superior do df)."""
+        bucket_df = np.zeros(DF_BUCKETS, dtype=np.int64)
+        for start, end in ranges:
+            counts = counter.fit_transform(texts[i] for i in range(start, end)).tocsr()
+            local_df = np.bincount(counts.indices, minlength=counts.shape[1])
+            del counts
+            buckets = self._buckets(counter.get_feature_names_out())
+            bucket_df += np.bincount(buckets, weights=local_df, minlength=DF_BUCKETS).astype(
+                np.int64
+            )
+        return bucket_df
+
+    def _min_count(self, n_docs: int) -> float:
+        min_df = self.params["min_df"]
+        return min_df if isinstance(min_df, int) else min_df * n_docs
+
+    def _limit_terms(self, df: np.ndarray, tf: np.ndarray, n_docs: int) -> np.ndarray:
+        """Índices (ordenados) dos termos mantidos, com o mesmo critério do sklearn."""
+        max_df = self.params["max_df"]
+        max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+        min_count = self._min_count(n_docs)
+        kept = np.flatnonzero((df >= min_count) & (df <= max_count))
+        limit = self.params["max_features"]
+        if limit is not None and kept.size > limit:
+            kept = kept[(-tf[kept]).argsort()[:limit]]
+        if kept.size == 0:
+            raise ValueError("Depois do corte por min_df/max_df, nenhum termo sobrou.")
+        return np.sort(kept)
+
+    def _shard_exclude(self, shard: int, exclude: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Trecho de `exclude` da faixa, indexado pela linha local."""
+        if exclude is None:
+            return None
+        return exclude[self._offsets[shard] : self._offsets[shard + 1]]
+
+    def _shard_scores(
+        self,
+        shard: int,
+        q_dense: np.ndarray,
+        top_k: int,
+        candidates: Optional[np.ndarray],
+        exclude: Optional[np.ndarray],
+    ) -> Ranked:
+        """Top-k de uma faixa, com os índices já globais."""
+        offset = int(self._offsets[shard])
+        matrix = self._shards[shard]
+        exclude = self._shard_exclude(shard, exclude)
+        if candidates is None:
+            scores = matrix @ q_dense
+            idx = np.flatnonzero(scores)
+            ranked = self._select(*self._live(idx, scores[idx], exclude), top_k)
+        else:
+            scores = matrix[candidates] @ q_dense
+            nz = np.flatnonzero(scores)
+            ranked = self._select(*self._live(candidates[nz], scores[nz], exclude), top_k)
+        return [(i + offset, s) for i, s in ranked]
+
+    @staticmethod
+    def _merge(parts: List[Ranked], top_k: int) -> Ranked:
+        """Top-k global a partir dos top-k das faixas (empates ficam com o menor índice)."""
+        return heapq.nlargest(max(1, top_k), chain.from_iterable(parts), key=lambda x: x[1])
+
+    def rank(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidates: Optional[np.ndarray] = None,
+        exclude: Optional[np.ndarray] = None,
+    ) -> Ranked:
+        """Mesmo contrato de TextSimilarity.rank; `candidates` deve vir ordenado."""
+        if not self._shards:
+            raise RuntimeError("Chame fit(corpus) antes de rank().")
+
+        q_vec = self.vectorizer.transform([query])
+        if q_vec.nnz == 0 or (candidates is not None and candidates.size == 0):
+            return []
+        q_dense = q_vec.toarray()[0].astype(np.float32)
+
+        shards = range(len(self._shards))
+        if candidates is None:
+            local: List[Optional[np.ndarray]] = [None] * len(self._shards)
+        else:
+            cuts = np.searchsorted(candidates, self._offsets)
+            local = [candidates[cuts[s] : cuts[s + 1]] - self._offsets[s] for s in shards]
+
+        def shard_rank(shard: int, shard_candidates: Optional[np.ndarray]) -> Ranked:
+            if shard_candidates is not None and shard_candidates.size == 0:
+                return []
+            return self._shard_scores(shard, q_dense, top_k, shard_candidates, exclude)
+
+        return self._merge(self._map(shard_rank, shards, local), top_k)
+
+    def rank_many(
+        self, queries: List[str], top_k: int = 10, exclude: Optional[np.ndarray] = None
+    ) -> List[Ranked]:
+        """Versão em lote: um produto matricial por faixa, em paralelo, e um merge por query."""
+        if not self._shards:
+            raise RuntimeError("Chame fit(corpus) antes de rank_many().")
+        if not queries:
+            return []
+
+        q_vecs = self.vectorizer.transform(queries).astype(np.float32).T.tocsc()
+
+        def shard_rank(shard: int) -> List[Ranked]:
+            scores = (self._shards[shard] @ q_vecs).T.tocsr()
+            scores.eliminate_zeros()
+            offset = int(self._offsets[shard])
+            shard_exclude = self._shard_exclude(shard, exclude)
+            return [
+                [
+                    (i + offset, s)
+                    for i, s in self._select(
+                        *self._live(
+                            scores.indices[scores.indptr[q] : scores.indptr[q + 1]],
+                            scores.data[scores.indptr[q] : scores.indptr[q + 1]],
+                            shard_exclude,
+                        ),
+                        top_k,
+                    )
+                ]
+                for q in range(len(queries))
+            ]
+
+        per_shard = self._map(shard_rank, range(len(self._shards)))
+        return [self._merge([part[q] for part in per_shard], top_k) for q in range(len(queries))]
+
+    def save(
+        self,
+        path: str,
+        corpus_sha1: str,
+        doc_ids: Optional[List[Optional[str]]] = None,
+    ) -> None:
+        """Grava vocabulário, IDF e offsets na raiz de `path` e os arrays CSR de cada faixa."""
+        if not self._shards:
+            raise RuntimeError("Chame fit(corpus) antes de save().")
+
+        terms: List[str] = [""] * len(self.vectorizer.vocabulary_)
+        for term, col in self.vectorizer.vocabulary_.items():
+            terms[col] = term
+
+        with staging_dir(path) as tmp_path:
+            save_arrays(
+                tmp_path, {"idf": np.asarray(self.vectorizer.idf_), "offsets": self._offsets}
+            )
+            for i, shard in enumerate(self._shards):
+                shard_path = os.path.join(tmp_path, SHARD_DIR.format(i))
+                os.makedirs(shard_path)
+                save_arrays(
+                    shard_path,
+                    {"data": shard.data, "indices": shard.indices, "indptr": shard.indptr},
+                )
+            write_json(os.path.join(tmp_path, VOCABULARY_FILE), terms)
+            write_json(
+                os.path.join(tmp_path, DOC_IDS_FILE),
+                list(doc_ids) if doc_ids is not None else [],
+            )
+            write_json(
+                os.path.join(tmp_path, META_FILE),
+                {
+                    "version": ARTIFACT_VERSION,
+                    "corpus_sha1": corpus_sha1,
+                    "n_docs": self.n_docs,
+                    "n_features": len(terms),
+                    "n_shards": len(self._shards),
+                    "params": self.params,
+                },
+            )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        corpus_sha1: Optional[str] = None,
+        mmap: bool = True,
+        workers: Optional[int] = None,
+    ) -> "ShardedTextSimilarity":
+        """
+        Carrega um artefato gravado por save(), com as faixas mapeadas em memória.
+        Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado
+        ou não for particionado.
+        """
+        meta = check_meta(path, "léxico", ARTIFACT_VERSION, corpus_sha1)
+        if "n_shards" not in meta:
+            raise ValueError(f"Artefato léxico em {path} não é particionado.")
+
+        params = meta["params"]
+        ts = cls(
+            n_shards=meta["n_shards"],
+            workers=workers,
+            ngram_range=tuple(params["ngram_range"]),
+            min_df=params["min_df"],
+            max_df=params["max_df"],
+            max_features=params["max_features"],
+        )
+        arrays = load_arrays(path, ("idf", "offsets"), mmap=False)
+        terms = read_json(os.path.join(path, VOCABULARY_FILE)) or []
+        ts.doc_ids = read_json(os.path.join(path, DOC_IDS_FILE)) or []
+        ts.vectorizer.vocabulary_ = {term: col for col, term in enumerate(terms)}
+        ts.vectorizer.idf_ = arrays["idf"]
+        ts._offsets = arrays["offsets"]
+        for i in range(meta["n_shards"]):
+            shard = load_arrays(os.path.join(path, SHARD_DIR.format(i)), SHARD_ARRAYS, mmap=mmap)
+            ts._shards.append(
+                sparse.csr_matrix(
+                    (shard["data"], shard["indices"], shard["indptr"]),
+                    shape=(int(ts._offsets[i + 1] - ts._offsets[i]), len(terms)),
+                    copy=False,
+                )
+            )
+        return ts
@@ -0,0 +1,57 @@
+# app/ai/lexical/shingles.py
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+_HASH_MULT = np.uint64(0x100000001B3)
+_MAX_TOKEN_CACHE = 1_000_000
+
+
+class Tokenizer:
+    """
+    Quebra o texto em palavras (sem acento e em minúsculas) com hash estável de 64 bits,
+    compartilhado pelos índices de fingerprints e de MinHash.
+    """
+
+    def __init__(self):
+        self._token_hashes: Dict[str, int] = {}
+
+    def tokenize(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Retorna (hash, início, fim) de cada palavra."""
+        hashes: List[int] = []
+        starts: List[int] = []
+        ends: List[int] = []
+        for m in _TOKEN_RE.finditer(text):
+            tok = m.group().lower()
+            h = self._token_hashes.get(tok)
+            if h is None:
+                norm = "".join(
+                    c for c in unicodedata.normalize("NFKD", tok) if not unicodedata.combining(c)
+                )
+                h = int.from_bytes(hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest())
+                if len(self._token_hashes) < _MAX_TOKEN_CACHE:
+                    self._token_hashes[tok] = h
+            hashes.append(h)
+            starts.append(m.start())
+            ends.append(m.end())
+        return (
+            np.asarray(hashes, dtype=np.uint64),
+            np.asarray(starts, dtype=np.int32),
+            np.asarray(ends, dtype=np.int32),
+        )
+
+
+def gram_hashes(tok_hashes: np.ndarray, k: int) -> np.ndarray:
+    """Hash polinomial de cada k-grama de palavras (o overflow em uint64 é proposital)."""
+    n_grams = tok_hashes.size - k + 1
+    if n_grams <= 0:
+        return np.empty(0, dtype=np.uint64)
+    out = np.zeros(n_grams, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            out = out * _HASH_MULT + tok_hashes[j : j + n_grams]
+    return out
@@ -1,9 +1,27 @@
 # app/ai/lexical/tfidf.py
-from typing import List, Optional, Tuple
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from app.utils.artifact_utils import (
+    META_FILE,
+    check_meta,
+    load_arrays,
+    read_meta,
+    save_arrays,
+    staging_dir,
+    write_json,
+)
+from app.utils.json_utils import read_json
+
+ARTIFACT_VERSION = 2
+VOCABULARY_FILE = "vocabulary.json"
+DOC_IDS_FILE = "doc_ids.json"
+ARRAY_FILES = ("idf", "data", "indices", "indptr")
 
 
 class TextSimilarity:
@@ -13,7 +31,11 @@ class TextSimilarity:
         ts = TextSimilarity()
         ts.fit(corpus)
         ts.rank("meu trecho", top_k=5)
+        ts.rank_many(["trecho 1", "trecho 2"], top_k=5)
         ts.top1("meu trecho")  # só o mais parecido
+
+        ts.save("data/index/lexical", corpus_sha1="...")
+        ts = TextSimilarity.load("data/index/lexical", corpus_sha1="...")
     """
 
     def __init__(
@@ -23,6 +45,12 @@ class TextSimilarity:
         max_df: float = 0.9,
         max_features: Optional[int] = 100_000,
     ):
+        self.params: Dict[str, Any] = {
+            "ngram_range": list(ngram_range),
+            "min_df": min_df,
+            "max_df": max_df,
+            "max_features": max_features,
+        }
         self.vectorizer = TfidfVectorizer(
             lowercase=True,
             strip_accents="unicode",
@@ -32,29 +60,207 @@ class TextSimilarity:
             max_features=max_features,
         )
         self._tfidf_matrix = None
-        self.docs: List[str] = []
+        self.doc_ids: List[Optional[str]] = []
+
+    @property
+    def n_docs(self) -> int:
+        """Quantidade de documentos indexados."""
+        return 0 if self._tfidf_matrix is None else self._tfidf_matrix.shape[0]
+
+    def fit(self, texts: Iterable[str]) -> None:
+        """
+        Treina o vetorizar no corpus e guarda só a matriz TF-IDF (L2-normalizada, float32);
+        os textos não ficam referenciados aqui.
+        """
+        self._tfidf_matrix = self._prepare(self.vectorizer.fit_transform(texts))
+
+    def fit_transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """fit() que também devolve a matriz TF-IDF (L2, float32) dos próprios textos."""
+        self.fit(texts)
+        return self._tfidf_matrix
 
-    def fit(self, texts: List[str]) -> None:
-        """Treina o vetorizar no corpus e guarda a matriz TF-IDF."""
-        self.docs = texts
-        self._tfidf_matrix = self.vectorizer.fit_transform(texts)
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """Vetores TF-IDF (L2, float32) de textos novos, no vocabulário e IDF já treinados."""
+        return self._prepare(self.vectorizer.transform(texts))
 
-    def rank(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+    @staticmethod
+    def _prepare(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+        """
+        Normaliza as linhas (L2) e converte para float32 uma única vez, para que o
+        cosseno vire um produto escalar esparso no momento da consulta.
+        """
+        return normalize(matrix, norm="l2", copy=False).astype(np.float32).tocsr()
+
+    def rank(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidates: Optional[np.ndarray] = None,
+        exclude: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
         """
         Retorna os índices dos documentos mais parecidos com a `query` e seus scores.
-        Saída: lista de (indice_no_corpus, score) em ordem decrescente.
+        Com `candidates` (índices vindos de um pré-filtro, ex.: MinHash-LSH), o cosseno
+        é calculado só nessas linhas da matriz. `exclude` (máscara booleana por documento,
+        ex.: removidos) tira documentos da seleção antes do top-k.
+        Saída: lista de (indice_no_corpus, score) em ordem decrescente, apenas com
+        documentos de score positivo (vazia se a query não tem termos no vocabulário).
         """
         if self._tfidf_matrix is None:
             raise RuntimeError("Chame fit(corpus) antes de rank().")
 
         q_vec = self.vectorizer.transform([query])
-        scores = cosine_similarity(q_vec, self._tfidf_matrix)[0]
+        if q_vec.nnz == 0 or (candidates is not None and candidates.size == 0):
+            return []
+
+        q_dense = q_vec.toarray()[0].astype(np.float32)
+        if candidates is None:
+            scores = self._tfidf_matrix @ q_dense
+            idx = np.flatnonzero(scores)
+            return self._select(*self._live(idx, scores[idx], exclude), top_k)
+
+        scores = self._tfidf_matrix[candidates] @ q_dense
+        nz = np.flatnonzero(scores)
+        return self._select(*self._live(candidates[nz], scores[nz], exclude), top_k)
+
+    def rank_many(
+        self, queries: List[str], top_k: int = 10, exclude: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Versão em lote de rank(): transforma todas as queries numa única matriz
+        esparsa e calcula os scores com um único produto matricial.
+        Saída: uma lista de (indice_no_corpus, score) por query, na mesma ordem.
+        """
+        if self._tfidf_matrix is None:
+            raise RuntimeError("Chame fit(corpus) antes de rank_many().")
+        if not queries:
+            return []
+
+        q_vecs = self.vectorizer.transform(queries).astype(np.float32)
+        scores = (self._tfidf_matrix @ q_vecs.T).T.tocsr()
+        scores.eliminate_zeros()
+        return [
+            self._select(
+                *self._live(
+                    scores.indices[scores.indptr[i] : scores.indptr[i + 1]],
+                    scores.data[scores.indptr[i] : scores.indptr[i + 1]],
+                    exclude,
+                ),
+                top_k,
+            )
+            for i in range(len(queries))
+        ]
 
-        top_k = max(1, min(top_k, len(self.docs)))
-        idx = np.argsort(-scores)[:top_k]
-        return [(int(i), float(scores[i])) for i in idx]
+    @staticmethod
+    def _live(
+        idx: np.ndarray, scores: np.ndarray, exclude: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Tira dos pontuados os documentos marcados em `exclude`."""
+        if exclude is None:
+            return idx, scores
+        keep = ~exclude[idx]
+        return idx[keep], scores[keep]
 
-    def top1(self, query: str) -> Tuple[int, float]:
-        """Retorna (indice, score) do **documento mais parecido** com a query."""
-        idx_score = self.rank(query, top_k=1)[0]
-        return idx_score
+    @staticmethod
+    def _select(idx: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Seleciona os `top_k` maiores scores em ordem decrescente sem ordenar tudo:
+        argpartition isola os k melhores e só eles são ordenados.
+        """
+        k = min(max(1, top_k), scores.size)
+        if k == 0:
+            return []
+        part = np.argpartition(-scores, k - 1)[:k] if k < scores.size else np.arange(k)
+        order = part[np.argsort(-scores[part], kind="stable")]
+        return [(int(idx[i]), float(scores[i])) for i in order]
+
+    def top1(self, query: str) -> Optional[Tuple[int, float]]:
+        """Retorna (indice, score) do **documento mais parecido** com a query, ou None."""
+        ranked = self.rank(query, top_k=1)
+        return ranked[0] if ranked else None
+
+    def save(
+        self,
+        path: str,
+        corpus_sha1: str,
+        doc_ids: Optional[List[Optional[str]]] = None,
+    ) -> None:
+        """
+        Grava o índice em `path` (vocabulário, IDF, arrays CSR, ids e hash do corpus).
+        A escrita é feita num diretório temporário e trocada no final, para que
+        leitores nunca vejam um artefato pela metade.
+        """
+        if self._tfidf_matrix is None:
+            raise RuntimeError("Chame fit(corpus) antes de save().")
+
+        matrix = self._tfidf_matrix.tocsr()
+        vocabulary = self.vectorizer.vocabulary_
+        terms: List[str] = [""] * len(vocabulary)
+        for term, col in vocabulary.items():
+            terms[col] = term
+
+        with staging_dir(path) as tmp_path:
+            save_arrays(
+                tmp_path,
+                {
+                    "idf": np.asarray(self.vectorizer.idf_),
+                    "data": matrix.data,
+                    "indices": matrix.indices,
+                    "indptr": matrix.indptr,
+                },
+            )
+            write_json(os.path.join(tmp_path, VOCABULARY_FILE), terms)
+            write_json(
+                os.path.join(tmp_path, DOC_IDS_FILE),
+                list(doc_ids) if doc_ids is not None else [],
+            )
+            write_json(
+                os.path.join(tmp_path, META_FILE),
+                {
+                    "version": ARTIFACT_VERSION,
+                    "corpus_sha1": corpus_sha1,
+                    "n_docs": matrix.shape[0],
+                    "n_features": matrix.shape[1],
+                    "params": self.params,
+                },
+            )
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[Dict[str, Any]]:
+        """Lê o meta.json de um artefato. Retorna None se não existir ou for inválido."""
+        return read_meta(path)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        corpus_sha1: Optional[str] = None,
+        mmap: bool = True,
+    ) -> "TextSimilarity":
+        """
+        Carrega um artefato gravado por save(). Com `mmap=True` os arrays da matriz
+        são mapeados em memória, e o page cache é compartilhado entre processos.
+        Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado.
+        """
+        meta = check_meta(path, "léxico", ARTIFACT_VERSION, corpus_sha1)
+
+        params = meta["params"]
+        ts = cls(
+            ngram_range=tuple(params["ngram_range"]),
+            min_df=params["min_df"],
+            max_df=params["max_df"],
+            max_features=params["max_features"],
+        )
+
+        arrays = load_arrays(path, ARRAY_FILES, mmap=mmap)
+        terms = read_json(os.path.join(path, VOCABULARY_FILE)) or []
+        ts.doc_ids = read_json(os.path.join(path, DOC_IDS_FILE)) or []
+
+        ts.vectorizer.vocabulary_ = {term: col for col, term in enumerate(terms)}
+        ts.vectorizer.idf_ = np.asarray(arrays["idf"])
+        ts._tfidf_matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(meta["n_docs"], meta["n_features"]),
+            copy=False,
+        )
+        return ts
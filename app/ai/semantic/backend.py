@@ -0,0 +1,92 @@
+# app/ai/semantic/backend.py
+import asyncio
+from typing import Any, Optional, Union
+
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+from app.config.config import Config
+
+BACKENDS = ("remote", "local")
+QUANTIZATIONS = ("scalar", "binary")
+
+
+class ThreadedAsyncClient:
+    """
+    Expõe os métodos de um QdrantClient síncrono como corrotinas, rodando cada
+    chamada num thread. Usado no modo local, em que a pasta de dados só pode ser
+    aberta por um cliente por vez.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+def create_client(config: Config) -> QdrantClient:
+    """
+    Cria o cliente do backend vetorial escolhido em `vector_backend`:
+    - "remote": servidor Qdrant em `qdrant_url`;
+    - "local": Qdrant embutido no processo, persistido em `qdrant_local_path`
+      (":memory:" mantém tudo em memória, útil nos testes).
+    """
+    if config.vector_backend == "remote":
+        return QdrantClient(url=config.qdrant_url)
+    if config.vector_backend == "local":
+        if config.qdrant_local_path == ":memory:":
+            return QdrantClient(location=":memory:")
+        return QdrantClient(path=config.qdrant_local_path)
+    raise ValueError(
+        f"vector_backend inválido: {config.vector_backend!r} (use um de {', '.join(BACKENDS)})"
+    )
+
+
+def create_async_client(
+    config: Config, client: QdrantClient
+) -> Union[AsyncQdrantClient, ThreadedAsyncClient]:
+    """Cliente assíncrono do mesmo backend; no modo local, reaproveita `client` via threads."""
+    if config.vector_backend == "remote":
+        return AsyncQdrantClient(url=config.qdrant_url)
+    return ThreadedAsyncClient(client)
+
+
+def quantization_config(kind: Optional[str]) -> Optional[models.QuantizationConfig]:
+    """
+    Quantização dos vetores densos: "scalar" (int8, 4x menos memória) ou "binary"
+    (1 bit por dimensão, 32x menos). Os vetores quantizados ficam sempre em RAM.
+    """
+    if kind is None:
+        return None
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(
+        f"quantization inválida: {kind!r} (use None ou um de {', '.join(QUANTIZATIONS)})"
+    )
+
+
+def search_params(config: Config) -> Optional[models.SearchParams]:
+    """
+    Parâmetros de busca densa: `hnsw_ef` e, com quantização, oversampling +
+    rescoring (os candidatos achados nos vetores quantizados são reordenados pelos
+    vetores originais).
+    """
+    quantization = None
+    if config.quantization is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=config.search_rescore, oversampling=config.search_oversampling
+        )
+    if quantization is None and config.search_hnsw_ef is None:
+        return None
+    return models.SearchParams(hnsw_ef=config.search_hnsw_ef, quantization=quantization)
@@ -0,0 +1,116 @@
+# app/ai/semantic/batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, List, Optional
+
+from app.utils.metrics import REGISTRY
+
+BATCH_SIZE = REGISTRY.histogram(
+    "plagiarism_embed_batch_size",
+    "Textos por chamada ao modelo denso no micro-batching.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT = REGISTRY.histogram(
+    "plagiarism_embed_batch_wait_seconds",
+    "Espera do primeiro pedido de um lote até o modelo rodar.",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+class _Job:
+    __slots__ = ("enqueued", "future", "texts")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """
+    Junta pedidos de embedding concorrentes numa única chamada ao modelo.
+    Uma thread dedicada pega o primeiro pedido da fila e espera até `max_wait`
+    segundos (ou até somar `max_batch` textos) por outros; o lote roda de uma vez e
+    cada chamador recebe só os seus vetores. Um pedido maior que `max_batch` roda sozinho.
+    Uso:
+        batcher = EmbeddingBatcher(lambda texts: model.embed(texts), max_batch=32)
+        batcher.embed(["consulta"])  # bloqueia até o lote do pedido rodar
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], Iterable[Any]],
+        max_batch: int = 32,
+        max_wait: float = 0.002,
+    ):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._carry: Optional[_Job] = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, texts: List[str]) -> List[Any]:
+        """Enfileira `texts` e espera os vetores, na mesma ordem."""
+        if not texts:
+            return []
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher encerrado.")
+        job = _Job(texts)
+        self._queue.put(job)
+        return job.future.result()
+
+    def close(self) -> None:
+        """Encerra a thread depois dos pedidos já enfileirados."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first: _Job) -> List[_Job]:
+        """Junta pedidos ao lote de `first` até encher ou vencer o prazo."""
+        jobs, size = [first], len(first.texts)
+        deadline = first.enqueued + self.max_wait
+        while size < self.max_batch:
+            try:
+                job = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if job is None:
+                self._closed = True
+                break
+            if size + len(job.texts) > self.max_batch:
+                self._carry = job
+                break
+            jobs.append(job)
+            size += len(job.texts)
+        return jobs
+
+    def _run(self) -> None:
+        while True:
+            first, self._carry = self._carry, None
+            if first is None:
+                if self._closed and self._queue.empty():
+                    return
+                first = self._queue.get()
+                if first is None:
+                    continue
+            jobs = self._collect(first)
+
+            texts = [t for job in jobs for t in job.texts]
+            BATCH_SIZE.observe(len(texts))
+            BATCH_WAIT.observe(time.perf_counter() - first.enqueued)
+            try:
+                vectors = list(self._encode(texts))
+            except Exception as e:
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+
+            pos = 0
+            for job in jobs:
+                job.future.set_result(vectors[pos : pos + len(job.texts)])
+                pos += len(job.texts)
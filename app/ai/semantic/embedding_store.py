@@ -0,0 +1,99 @@
+# app/ai/semantic/embedding_store.py
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DATA_FILE = "vectors.f32"
+INDEX_FILE = "index.tsv"
+
+
+def pack_sparse(indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Empacota um vetor esparso num único array float32 (índices reinterpretados bit a bit)."""
+    return np.concatenate(
+        [np.asarray(indices, dtype=np.int32).view(np.float32), np.asarray(values, np.float32)]
+    )
+
+
+def unpack_sparse(packed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverso de pack_sparse: (índices int32, valores float32)."""
+    n = packed.size // 2
+    return np.asarray(packed[:n]).view(np.int32), np.asarray(packed[n:])
+
+
+class EmbeddingStore:
+    """
+    Cache de embeddings em disco endereçado por conteúdo (SHA1 do texto), um por modelo.
+    Os vetores ficam concatenados num arquivo float32 só de append, lido via mmap, e
+    um índice de texto guarda (chave, offset, tamanho) de cada um, então vetores de
+    tamanho variável (ex.: esparsos empacotados) também cabem.
+    Uso:
+        store = EmbeddingStore("data/index/embeddings", "sentence-transformers/all-MiniLM-L6-v2")
+        store.put_many(["<sha1>"], [vetor])
+        store.get_many(["<sha1>", "<outro>"])  # [array, None]
+    """
+
+    def __init__(self, path: str, model: str):
+        self.path = os.path.join(path, re.sub(r"[^\w.-]+", "_", model))
+        os.makedirs(self.path, exist_ok=True)
+        self._data_path = os.path.join(self.path, DATA_FILE)
+        self._index_path = os.path.join(self.path, INDEX_FILE)
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._size = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._offsets
+
+    def _load_index(self) -> None:
+        """Lê o índice, ignorando entradas cujo vetor não chegou inteiro ao disco."""
+        self._size = os.path.getsize(self._data_path) // 4 if os.path.exists(self._data_path) else 0
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue
+                key, offset, length = parts[0], int(parts[1]), int(parts[2])
+                if offset + length <= self._size:
+                    self._offsets[key] = (offset, length)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Vetores guardados para cada chave (None quando ausente)."""
+        if not any(k in self._offsets for k in keys):
+            return [None] * len(keys)
+        if self._matrix is None:
+            self._matrix = np.memmap(self._data_path, dtype=np.float32, mode="r")
+
+        out: List[Optional[np.ndarray]] = []
+        for k in keys:
+            loc = self._offsets.get(k)
+            out.append(None if loc is None else np.array(self._matrix[loc[0] : loc[0] + loc[1]]))
+        return out
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """Acrescenta ao disco os vetores de chaves ainda não guardadas."""
+        with open(self._data_path, "ab") as data:
+            data.truncate(self._size * 4)
+            entries = []
+            for k, v in zip(keys, vectors):
+                if k in self._offsets:
+                    continue
+                arr = np.asarray(v, dtype=np.float32).ravel()
+                data.write(arr.tobytes())
+                self._offsets[k] = (self._size, arr.size)
+                entries.append(f"{k}\t{self._size}\t{arr.size}\n")
+                self._size += arr.size
+            data.flush()
+            os.fsync(data.fileno())
+
+        if entries:
+            with open(self._index_path, "a", encoding="utf-8") as index:
+                index.writelines(entries)
+            self._matrix = None
@@ -2,25 +2,41 @@
 import hashlib
 import os
 import uuid
-from typing import Any, Dict, Iterable, List
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from qdrant_client import QdrantClient, models
+import numpy as np
+from fastembed import SparseTextEmbedding, TextEmbedding
+from qdrant_client import models
 from qdrant_client.http.exceptions import UnexpectedResponse
 
+from app.ai.semantic.backend import create_client, quantization_config
+from app.ai.semantic.embedding_store import EmbeddingStore, pack_sparse, unpack_sparse
+from app.ai.semantic.passages import split_passages
 from app.config.config import Config
 from app.utils.json_utils import iter_jsonl
 
+UUID_NS = uuid.UUID("11111111-2222-3333-4444-555555555555")
+
+
+def doc_id(text: str) -> str:
+    """ID determinístico (uuid5) de um documento a partir do seu texto."""
+    return str(uuid.uuid5(UUID_NS, text))
+
 
 class Indexer:
     def __init__(self, config: Config):
-        """Inicializa o indexador com as configurações e o cliente Qdrant."""
+        """Inicializa o indexador com as configurações e o cliente do backend vetorial."""
         self.config = config
-        self.client = QdrantClient(url=self.config.qdrant_url)
+        self.client = create_client(self.config)
         self.DENSE_NAME = self.config.dense_name
         self.SPARSE_NAME = self.config.sparse_name
-        self.UUID_NS = uuid.UUID("11111111-2222-3333-4444-555555555555")
+        self.UUID_NS = UUID_NS
         self.DENSE_MODEL = self.config.model_dense_name
         self.SPARSE_MODEL = self.config.model_sparse_name
+        self._dense_encoder: Optional[TextEmbedding] = None
+        self._sparse_encoder: Optional[SparseTextEmbedding] = None
+        self._stores: Dict[str, EmbeddingStore] = {}
+        self.embed_stats = {"cached": 0, "computed": 0}
 
     @staticmethod
     def iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
@@ -45,6 +61,26 @@ class Indexer:
         """Retorna a dimensão do embedding do modelo denso."""
         return 384
 
+    def _dense_vector_params(self, dense_size: int) -> models.VectorParams:
+        """Vetor denso (cosseno); com `vectors_on_disk` os originais ficam em disco."""
+        return models.VectorParams(
+            size=dense_size,
+            distance=models.Distance.COSINE,
+            on_disk=self.config.vectors_on_disk,
+        )
+
+    def _collection_params(self) -> Dict[str, Any]:
+        """Parâmetros do HNSW e quantização (int8 ou binária) das coleções, conforme o Config."""
+        params: Dict[str, Any] = {
+            "hnsw_config": models.HnswConfigDiff(
+                m=self.config.hnsw_m, ef_construct=self.config.hnsw_ef_construct
+            )
+        }
+        quantization = quantization_config(self.config.quantization)
+        if quantization is not None:
+            params["quantization_config"] = quantization
+        return params
+
     def collection_exists(self, name: str) -> bool:
         """Verifica se uma coleção existe no Qdrant."""
         try:
@@ -60,12 +96,9 @@ class Indexer:
         try:
             self.client.create_collection(
                 collection_name=name,
-                vectors_config={
-                    self.DENSE_NAME: models.VectorParams(
-                        size=dense_size, distance=models.Distance.COSINE
-                    )
-                },
+                vectors_config={self.DENSE_NAME: self._dense_vector_params(dense_size)},
                 sparse_vectors_config={self.SPARSE_NAME: models.SparseVectorParams()},
+                **self._collection_params(),
             )
             print(f"Coleção híbrida criada: {name}", flush=True)
         except UnexpectedResponse as e:
@@ -78,38 +111,38 @@ class Indexer:
             else:
                 raise
 
-    def ensure_collection_dense_only(self, name: str, dense_size: int) -> None:
-        """Garante a existência de uma coleção densa, criando-a se necessário."""
+    def ensure_collection_passages(self, name: str, dense_size: int) -> None:
+        """Garante a existência da coleção de passagens (só denso), criando-a se necessário."""
         if self.collection_exists(name):
-            print(f"Coleção densa já existe: {name}", flush=True)
+            print(f"Coleção de passagens já existe: {name}", flush=True)
             return
         try:
             self.client.create_collection(
                 collection_name=name,
-                vectors_config={
-                    self.DENSE_NAME: models.VectorParams(
-                        size=dense_size, distance=models.Distance.COSINE
-                    )
-                },
+                vectors_config={self.DENSE_NAME: self._dense_vector_params(dense_size)},
+                **self._collection_params(),
             )
-            print(f"Coleção densa criada: {name}", flush=True)
+            print(f"Coleção de passagens criada: {name}", flush=True)
         except UnexpectedResponse as e:
             msg = str(e).lower()
             if "already exists" in msg or "409" in msg:
-                print(f"Coleção densa já existia (conflito): {name}", flush=True)
+                print(f"Coleção de passagens já existia (conflito): {name}", flush=True)
             else:
                 raise
 
     def fetch_existing_hashes(
         self, collection: str, ids: List[str], step: int = 1024
     ) -> Dict[str, str]:
-        """Retorna os hashes SHA1 já armazenados para os IDs informados."""
+        """
+        Retorna os hashes SHA1 já armazenados para os IDs informados. Só o campo
+        `content_sha1` do payload é trazido, nunca o texto.
+        """
         out: Dict[str, str] = {}
         for i in range(0, len(ids), step):
             pts = self.client.retrieve(
                 collection_name=collection,
                 ids=ids[i : i + step],
-                with_payload=True,
+                with_payload=["content_sha1"],
                 with_vectors=False,
             )
             for p in pts:
@@ -117,26 +150,140 @@ class Indexer:
                 out[str(p.id)] = payload.get("content_sha1")
         return out
 
+    def iter_point_ids(self, collection: str, step: int = 1024) -> Iterable[str]:
+        """Percorre os IDs de todos os pontos da coleção, sem payload nem vetores."""
+        offset = None
+        while True:
+            pts, offset = self.client.scroll(
+                collection_name=collection,
+                limit=step,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            for p in pts:
+                yield str(p.id)
+            if offset is None:
+                return
+
+    def delete(self, collection: str, ids: List[str], step: int = 1024) -> None:
+        """Remove da coleção os pontos com os IDs informados."""
+        for i in range(0, len(ids), step):
+            self.client.delete(
+                collection_name=collection,
+                points_selector=models.PointIdsList(points=ids[i : i + step]),
+            )
+
     @staticmethod
     def build_payloads(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Cria payloads com texto e hash para upload."""
-        return [{"text": r["text"], "content_sha1": r["content_sha1"]} for r in rows]
-
-    def build_documents_hybrid(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Cria documentos para indexação híbrida (denso + esparso)."""
-        return [
-            {
-                self.DENSE_NAME: models.Document(text=r["text"], model=self.DENSE_MODEL),
-                self.SPARSE_NAME: models.Document(text=r["text"], model=self.SPARSE_MODEL),
-            }
-            for r in rows
-        ]
-
-    def build_documents_dense(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Cria documentos para indexação apenas densa."""
-        return [
-            {self.DENSE_NAME: models.Document(text=r["text"], model=self.DENSE_MODEL)} for r in rows
-        ]
+        """
+        Cria payloads para upload só com o hash do conteúdo; o texto fica no
+        DocumentStore e é resolvido pelo índice do documento.
+        """
+        return [{"content_sha1": r["content_sha1"]} for r in rows]
+
+    def build_vectors_hybrid(
+        self, dense: List[List[float]], sparse: List[models.SparseVector]
+    ) -> List[Dict[str, Any]]:
+        """Monta os vetores nomeados (denso + esparso) já calculados para upload."""
+        return [{self.DENSE_NAME: d, self.SPARSE_NAME: s} for d, s in zip(dense, sparse)]
+
+    def build_vectors_dense(self, dense: List[List[float]]) -> List[Dict[str, Any]]:
+        """Monta os vetores nomeados (só denso) já calculados para upload."""
+        return [{self.DENSE_NAME: d} for d in dense]
+
+    def build_passages(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Divide cada documento em passagens sobrepostas (`passage_words` palavras a cada
+        `passage_stride`). Cada passagem guarda o id do documento pai, seus offsets
+        de caracteres e o hash do pai, usado na detecção de mudanças.
+        """
+        out: List[Dict[str, Any]] = []
+        for r in rows:
+            spans = split_passages(r["text"], self.config.passage_words, self.config.passage_stride)
+            for start, end in spans:
+                out.append(
+                    {
+                        "id": str(uuid.uuid5(self.UUID_NS, f"{r['id']}:{start}")),
+                        "parent_id": r["id"],
+                        "start": start,
+                        "end": end,
+                        "text": r["text"][start:end],
+                        "content_sha1": r["content_sha1"],
+                    }
+                )
+        return out
+
+    @staticmethod
+    def build_passage_payloads(passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria payloads das passagens (pai, offsets e hash do pai), sem o texto."""
+        return [{k: p[k] for k in ("parent_id", "start", "end", "content_sha1")} for p in passages]
+
+    def _store(self, model: str) -> Optional[EmbeddingStore]:
+        """EmbeddingStore do modelo (None se `embedding_store_path` estiver vazio)."""
+        if not self.config.embedding_store_path:
+            return None
+        if model not in self._stores:
+            self._stores[model] = EmbeddingStore(self.config.embedding_store_path, model)
+        return self._stores[model]
+
+    def _embed_cached(
+        self,
+        texts: List[str],
+        model: str,
+        encode: Callable[[List[str]], Iterable[np.ndarray]],
+    ) -> List[np.ndarray]:
+        """
+        Embeda cada texto distinto uma única vez, reaproveitando os vetores já gravados
+        no EmbeddingStore (chave = content_sha1 do texto) e gravando os novos.
+        """
+        keys = [self.content_sha1(t) for t in texts]
+        unique = dict(zip(keys, texts))
+        store = self._store(model)
+        found = dict(zip(unique, store.get_many(list(unique)))) if store else dict.fromkeys(unique)
+
+        missing = [k for k, v in found.items() if v is None]
+        if missing:
+            vectors = list(encode([unique[k] for k in missing]))
+            found.update(zip(missing, vectors))
+            if store is not None:
+                store.put_many(missing, vectors)
+        self.embed_stats["cached"] += len(unique) - len(missing)
+        self.embed_stats["computed"] += len(missing)
+        return [found[k] for k in keys]
+
+    def embed_dense(
+        self, texts: List[str], batch_size: int = 256, parallel: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        Gera os vetores densos localmente, em lotes grandes. Textos repetidos (ex.: um
+        documento curto que é a sua própria passagem) são embedados uma única vez.
+        `parallel` repassa ao FastEmbed o número de processos (0 = todos os núcleos).
+        """
+
+        def encode(batch: List[str]) -> Iterable[np.ndarray]:
+            if self._dense_encoder is None:
+                self._dense_encoder = TextEmbedding(self.DENSE_MODEL)
+            return self._dense_encoder.embed(batch, batch_size=batch_size, parallel=parallel)
+
+        return [v.tolist() for v in self._embed_cached(texts, self.DENSE_MODEL, encode)]
+
+    def embed_sparse(
+        self, texts: List[str], batch_size: int = 256, parallel: Optional[int] = None
+    ) -> List[models.SparseVector]:
+        """Gera os vetores esparsos (BM25) localmente, em lotes grandes."""
+
+        def encode(batch: List[str]) -> Iterable[np.ndarray]:
+            if self._sparse_encoder is None:
+                self._sparse_encoder = SparseTextEmbedding(self.SPARSE_MODEL)
+            for e in self._sparse_encoder.embed(batch, batch_size=batch_size, parallel=parallel):
+                yield pack_sparse(e.indices, e.values)
+
+        out = []
+        for packed in self._embed_cached(texts, self.SPARSE_MODEL, encode):
+            indices, values = unpack_sparse(packed)
+            out.append(models.SparseVector(indices=indices.tolist(), values=values.tolist()))
+        return out
 
     def upsert(
         self,
@@ -144,6 +291,7 @@ class Indexer:
         vectors: List[Dict[str, Any]],
         payloads: List[Dict[str, Any]],
         ids: List[str],
+        parallel: Optional[int] = None,
     ) -> None:
         """Insere ou atualiza documentos na coleção."""
         self.client.upload_collection(
@@ -151,7 +299,7 @@ class Indexer:
             vectors=vectors,
             payload=payloads,
             ids=ids,
-            parallel=os.cpu_count() or 2,
+            parallel=parallel or os.cpu_count() or 2,
         )
 
     def count(self, collection: str) -> int:
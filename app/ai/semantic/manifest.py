@@ -0,0 +1,56 @@
+# app/ai/semantic/manifest.py
+from typing import Dict, Optional
+
+from app.utils.json_utils import read_json, write_json_atomic
+
+MANIFEST_VERSION = 1
+
+
+class IndexManifest:
+    """
+    Manifesto local do que o indexador já enviou a cada coleção do Qdrant:
+    id -> content_sha1, mais a contagem de pontos da coleção ao fim da execução.
+    Enquanto a contagem no Qdrant bater com a do manifesto, a detecção de mudanças
+    e de pontos removidos é feita só com o manifesto, sem idas ao Qdrant.
+    Uso:
+        manifest = IndexManifest.load("data/index/manifest.json")
+        manifest.points("docs_hybrid", count=idx.count("docs_hybrid"))  # None se não confiável
+        manifest.update("docs_hybrid", {"id": "sha1"}, count=1)
+        manifest.save()
+    """
+
+    def __init__(self, path: str, collections: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self._collections: Dict[str, Dict] = collections or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """Lê o manifesto; se não existir ou for de outra versão, começa vazio."""
+        data = read_json(path) or {}
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("collections") or {})
+
+    def points(self, collection: str, count: int) -> Optional[Dict[str, str]]:
+        """
+        Mapa id -> content_sha1 registrado para a coleção, ou None quando o manifesto
+        não é confiável (coleção desconhecida ou contagem diferente da do Qdrant).
+        """
+        entry = self._collections.get(collection)
+        if entry is None or entry.get("count") != count:
+            return None
+        return entry["points"]
+
+    def update(self, collection: str, points: Dict[str, str], count: int) -> None:
+        """Substitui o registro da coleção pelo estado ao fim da execução."""
+        self._collections[collection] = {"count": count, "points": points}
+
+    def forget(self, collection: str) -> None:
+        """Descarta o registro de uma coleção apagada."""
+        self._collections.pop(collection, None)
+
+    def save(self) -> None:
+        """Grava o manifesto de forma atômica."""
+        write_json_atomic(
+            self.path, {"version": MANIFEST_VERSION, "collections": self._collections}
+        )
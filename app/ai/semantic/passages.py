@@ -0,0 +1,20 @@
+# app/ai/semantic/passages.py
+import re
+from typing import List, Tuple
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def split_passages(text: str, size: int, stride: int) -> List[Tuple[int, int]]:
+    """
+    Divide o texto em janelas de `size` palavras, avançando `stride` palavras por vez
+    (janelas sobrepostas quando stride < size). Retorna (início, fim) em caracteres.
+    """
+    words = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+    spans: List[Tuple[int, int]] = []
+    for i in range(0, len(words), stride):
+        chunk = words[i : i + size]
+        spans.append((chunk[0][0], chunk[-1][1]))
+        if i + size >= len(words):
+            break
+    return spans
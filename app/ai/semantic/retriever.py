@@ -1,49 +1,239 @@
 # app/ai/semantic/retriever.py
-from typing import Any, Dict, List
+import copy
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from fastembed import TextEmbedding
-from qdrant_client import QdrantClient, models
+from qdrant_client import models
+from qdrant_client.http.models import QueryResponse
 
+from app.ai.semantic.backend import create_async_client, create_client, search_params
+from app.ai.semantic.batcher import EmbeddingBatcher
+from app.ai.semantic.passages import split_passages
 from app.config.config import Config
+from app.utils.cache_utils import LRUCache
+from app.utils.hash_utils import text_sha1
+from app.utils.metrics import timed
 
 
 class Retriever:
-    """Executa buscas dense-only e híbridas (dense + sparse) no Qdrant."""
+    """
+    Executa buscas dense-only sobre as passagens dos documentos e buscas híbridas
+    (dense + sparse) sobre os documentos inteiros.
+    """
 
     def __init__(self, config: Config):
         """Inicializa o retriever."""
         self.config = config
-        self.client = QdrantClient(url=self.config.qdrant_url)
+        self.client = create_client(self.config)
+        self.async_client = create_async_client(self.config, self.client)
         self.dense_name = self.config.dense_name
         self.sparse_name = self.config.sparse_name
         self.dense_model_name = self.config.model_dense_name
         self.sparse_model_name = self.config.model_sparse_name
 
-        self.enc = TextEmbedding(self.dense_model_name)
+        self.enc = TextEmbedding(self.dense_model_name, threads=self.config.embed_threads)
+        self.batcher: Optional[EmbeddingBatcher] = (
+            EmbeddingBatcher(
+                self._embed,
+                max_batch=self.config.embed_batch_max,
+                max_wait=self.config.embed_batch_wait_ms / 1000,
+            )
+            if self.config.embed_batching
+            else None
+        )
+        self.embedding_cache = LRUCache(
+            maxsize=self.config.embedding_cache_size, ttl=self.config.embedding_cache_ttl
+        )
+
+    def with_config(self, config: Config) -> "Retriever":
+        """
+        Retriever para outra config (ex.: coleções de outra versão do corpus) que
+        compartilha o modelo, o micro-batching, o cache de embeddings e os clientes.
+        """
+        other = copy.copy(self)
+        other.config = config
+        return other
+
+    def _embed(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self.enc.embed(texts))
+
+    def encode_passages(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embeddings de lotes grandes (ex.: passagens das redações de uma turma) direto no
+        modelo, na thread de quem chama: não passam pelo micro-batching, para não segurar
+        as consultas do /compare atrás de um lote grande, nem pelo cache de consultas.
+        """
+        return self._embed(texts)
 
     def encode_query(self, query: str) -> List[float]:
         """Gera o embedding denso para a consulta."""
-        return list(self.enc.embed([query]))[0].tolist()
+        return self.encode_queries([query])[0]
 
-    def search_dense_only(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Busca apenas no índice denso. Retorna score = cosine (da própria coleção)."""
-        q_vec = self.encode_query(query)
-        res = self.client.query_points(
-            collection_name=self.config.qdrant_collection_dense,
-            query=q_vec,
+    def encode_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Gera os embeddings densos de várias consultas numa única chamada ao modelo.
+        Textos já vistos (pelo hash do texto normalizado) saem do cache, e textos
+        repetidos no mesmo lote são embedados uma vez só. Com `embed_batching`, os
+        textos que faltam entram no micro-batch junto com os de requisições concorrentes.
+        """
+        keys = [text_sha1(q) for q in queries]
+        found: Dict[str, Optional[List[float]]] = {k: self.embedding_cache.get(k) for k in keys}
+
+        missing: Dict[str, str] = {}
+        for k, q in zip(keys, queries):
+            if found[k] is None:
+                missing.setdefault(k, q)
+        if missing:
+            embed = self.batcher.embed if self.batcher is not None else self._embed
+            with timed("encode"):
+                vecs = embed(list(missing.values()))
+            for k, v in zip(missing, vecs):
+                found[k] = v.tolist()
+                self.embedding_cache.set(k, found[k])
+        return [found[k] for k in keys]
+
+    def query_windows(self, query: str) -> List[Tuple[int, int]]:
+        """Janelas (início, fim) da consulta, do mesmo tamanho das passagens indexadas."""
+        windows = split_passages(query, self.config.passage_words, self.config.passage_stride)
+        return windows or [(0, len(query))]
+
+    def _passage_request(self, w_vec: List[float], top_k: int) -> models.QueryRequest:
+        """
+        Monta a consulta dense-only de uma janela na coleção de passagens. Pede mais
+        que `top_k` passagens porque várias podem ser do mesmo documento.
+        """
+        return models.QueryRequest(
+            query=w_vec,
             using=self.dense_name,
+            limit=top_k * self.config.passage_candidates,
+            params=search_params(self.config),
+            with_payload=["parent_id", "start", "end"],
+            with_vector=False,
+        )
+
+    def _hybrid_request(
+        self,
+        query: str,
+        q_vec: List[float],
+        top_k: int,
+        candidates_dense: int,
+        candidates_sparse: int,
+    ) -> models.QueryRequest:
+        """Monta a consulta de fusão RRF (dense + sparse)."""
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    query=q_vec,
+                    using=self.dense_name,
+                    limit=candidates_dense,
+                    params=search_params(self.config),
+                ),
+                models.Prefetch(
+                    query=models.Document(text=query, model=self.sparse_model_name),
+                    using=self.sparse_name,
+                    limit=candidates_sparse,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
             limit=top_k,
-            with_payload=True,
-            with_vectors=False,
+            with_payload=False,
+            with_vector=[self.dense_name],
         )
-        return [
-            {
-                "id": p.id,
-                "similarity": p.score,
-                "text": (p.payload or {}).get("text"),
-            }
-            for p in res.points
+
+    def _passage_results(
+        self,
+        windows: List[Tuple[int, int]],
+        responses: List[QueryResponse],
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrega as passagens encontradas pelas janelas da query por documento pai.
+        Cada passagem conta com o melhor score entre as janelas; o documento recebe
+        o máximo (ou a soma, com `passage_aggregation="sum"`) das suas passagens.
+        Saída: [{"id": pai, "similarity", "spans": [...]}], sem texto (o serviço o resolve).
+        """
+        parents: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        for (q_start, q_end), res in zip(windows, responses):
+            for p in res.points:
+                payload = p.payload or {}
+                passages = parents.setdefault(payload.get("parent_id"), {})
+                best = passages.get(p.id)
+                if best is None or p.score > best["similarity"]:
+                    passages[p.id] = {
+                        "query_start": q_start,
+                        "query_end": q_end,
+                        "doc_start": payload.get("start"),
+                        "doc_end": payload.get("end"),
+                        "similarity": p.score,
+                    }
+
+        aggregate = sum if self.config.passage_aggregation == "sum" else max
+        results: List[Dict[str, Any]] = []
+        for parent_id, passages in parents.items():
+            spans = sorted(passages.values(), key=lambda x: x["similarity"], reverse=True)
+            results.append(
+                {
+                    "id": parent_id,
+                    "similarity": float(aggregate(sp["similarity"] for sp in spans)),
+                    "spans": spans[: self.config.passage_spans],
+                }
+            )
+        results.sort(key=lambda x: x["similarity"], reverse=True)
+        return results[:top_k]
+
+    def _hybrid_results(
+        self, fused: List[models.ScoredPoint], q_vec: List[float]
+    ) -> List[Dict[str, Any]]:
+        """
+        Troca o score RRF pelo cosine, calculado localmente entre a query e os
+        vetores densos devolvidos pela própria fusão, e reordena.
+        """
+        if not fused:
+            return []
+
+        q = np.asarray(q_vec, dtype=np.float32)
+        docs = np.asarray([p.vector[self.dense_name] for p in fused], dtype=np.float32)
+        norms = np.linalg.norm(docs, axis=1) * np.linalg.norm(q)
+        cosines = (docs @ q) / np.where(norms == 0, 1.0, norms)
+
+        results: List[Dict[str, Any]] = [
+            {"id": p.id, "similarity": float(cos)} for p, cos in zip(fused, cosines)
         ]
+        results.sort(key=lambda x: x["similarity"], reverse=True)
+        return results
+
+    def search_dense_only(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Busca apenas no índice denso de passagens: a query é dividida em janelas e
+        os scores (cosine) são agregados por documento.
+        """
+        return self.search_dense_only_batch([query], top_k=top_k)[0]
+
+    def search_dense_only_batch(
+        self, queries: List[str], top_k: int = 3
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Versão em lote de search_dense_only: todas as janelas de todas as consultas
+        num único embed e numa única ida ao Qdrant.
+        """
+        if not queries:
+            return []
+
+        windows = [self.query_windows(q) for q in queries]
+        w_vecs = self.encode_queries([q[s:e] for q, ws in zip(queries, windows) for s, e in ws])
+        with timed("qdrant_passages"):
+            responses = self.client.query_batch_points(
+                collection_name=self.config.qdrant_collection_passages,
+                requests=[self._passage_request(w_vec, top_k) for w_vec in w_vecs],
+            )
+
+        out: List[List[Dict[str, Any]]] = []
+        pos = 0
+        for ws in windows:
+            out.append(self._passage_results(ws, responses[pos : pos + len(ws)], top_k))
+            pos += len(ws)
+        return out
 
     def search_hybrid(
         self,
@@ -54,58 +244,72 @@ class Retriever:
     ) -> List[Dict[str, Any]]:
         """
         Híbrido: combina dense+sparse via RRF para ORDENAR.
-        Depois, roda uma segunda consulta rápida filtrando pelos IDs retornados
-        para obter o cosine oficial do Qdrant. O campo `score` abaixo é SEMPRE
-        a similaridade de cosseno.
+        A fusão já devolve os vetores densos dos top-k, e o cosine é calculado
+        localmente contra o embedding da query, sem uma segunda ida ao Qdrant.
+        O campo `similarity` abaixo é SEMPRE a similaridade de cosseno.
         """
-        q_vec = self.encode_query(query)
+        return self.search_hybrid_batch(
+            [query],
+            top_k=top_k,
+            candidates_dense=candidates_dense,
+            candidates_sparse=candidates_sparse,
+        )[0]
 
-        dense_prefetch = models.Prefetch(
-            query=q_vec,
-            using=self.dense_name,
-            limit=candidates_dense,
-        )
-        sparse_prefetch = models.Prefetch(
-            query=models.Document(text=query, model=self.sparse_model_name),
-            using=self.sparse_name,
-            limit=candidates_sparse,
-        )
-
-        fusion = models.FusionQuery(fusion=models.Fusion.RRF)
-        fused = self.client.query_points(
-            collection_name=self.config.qdrant_collection_hybrid,
-            prefetch=[dense_prefetch, sparse_prefetch],
-            query=fusion,
-            limit=top_k,
-            with_payload=True,
-            with_vectors=False,
-        )
-
-        if not fused.points:
+    def search_hybrid_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        candidates_dense: int = 10,
+        candidates_sparse: int = 10,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Versão em lote de search_hybrid: um embed para todas as consultas e um
+        único batch de fusões RRF.
+        """
+        if not queries:
             return []
 
-        ids = [p.id for p in fused.points]
+        q_vecs = self.encode_queries(queries)
 
-        dense_filtered = self.client.query_points(
-            collection_name=self.config.qdrant_collection_dense,
-            query=q_vec,
-            using=self.dense_name,
-            limit=len(ids),
-            with_payload=False,
-            with_vectors=False,
-            query_filter=models.Filter(must=[models.HasIdCondition(has_id=ids)]),
-        )
+        with timed("qdrant_hybrid"):
+            fused_responses = self.client.query_batch_points(
+                collection_name=self.config.qdrant_collection_hybrid,
+                requests=[
+                    self._hybrid_request(query, q_vec, top_k, candidates_dense, candidates_sparse)
+                    for query, q_vec in zip(queries, q_vecs)
+                ],
+            )
 
-        cos_by_id: Dict[Any, float] = {p.id: p.score for p in dense_filtered.points}
+        return [
+            self._hybrid_results(fused.points, q_vec)
+            for fused, q_vec in zip(fused_responses, q_vecs)
+        ]
 
-        results: List[Dict[str, Any]] = []
-        for p in fused.points:
-            results.append(
-                {
-                    "id": p.id,
-                    "similarity": cos_by_id.get(p.id),
-                    "text": (p.payload or {}).get("text"),
-                }
+    async def asearch_dense_only(
+        self, windows: List[Tuple[int, int]], w_vecs: List[List[float]], top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """Versão assíncrona de search_dense_only, com os embeddings das janelas já calculados."""
+        with timed("qdrant_passages"):
+            responses = await self.async_client.query_batch_points(
+                collection_name=self.config.qdrant_collection_passages,
+                requests=[self._passage_request(w_vec, top_k) for w_vec in w_vecs],
             )
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results
+        return self._passage_results(windows, responses, top_k)
+
+    async def asearch_hybrid(
+        self,
+        query: str,
+        q_vec: List[float],
+        top_k: int = 3,
+        candidates_dense: int = 10,
+        candidates_sparse: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Versão assíncrona de search_hybrid, com o embedding já calculado."""
+        with timed("qdrant_hybrid"):
+            fused = await self.async_client.query_batch_points(
+                collection_name=self.config.qdrant_collection_hybrid,
+                requests=[
+                    self._hybrid_request(query, q_vec, top_k, candidates_dense, candidates_sparse)
+                ],
+            )
+        return self._hybrid_results(fused[0].points, q_vec)
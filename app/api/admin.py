@@ -0,0 +1,50 @@
+import hmac
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.api.compare import get_manager
+from app.config.config import Config
+from app.services.snapshots import SnapshotManager
+
+router = APIRouter()
+
+
+@lru_cache
+def get_config() -> Config:
+    return Config()
+
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(None), config: Config = Depends(get_config)
+) -> None:
+    """
+    Libera os endpoints que alteram o corpus ou a versão em uso só com o header
+    X-Admin-Token igual a `admin_token`; sem `admin_token` configurado, ficam desligados.
+    """
+    if not config.admin_token:
+        raise HTTPException(status_code=403, detail="Endpoints administrativos desligados.")
+    if not hmac.compare_digest((x_admin_token or "").encode(), config.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido.")
+
+
+@router.get("/admin/snapshot", summary="Versão do corpus em uso e a publicada pelo indexador")
+def snapshot(manager: SnapshotManager = Depends(get_manager)) -> dict:
+    return {"current": manager.version, "published": manager.published()}
+
+
+@router.post(
+    "/admin/snapshot/reload",
+    summary="Carrega a versão publicada do corpus sem reiniciar",
+    description=(
+        "Monta e aquece os índices da versão publicada em segundo plano e troca de "
+        "versão de uma vez; requisições em andamento terminam na versão anterior. "
+        "Vale só para o worker que atender a chamada: os demais trocam pelo watcher "
+        "(snapshot_watch_seconds). Exige o header X-Admin-Token."
+    ),
+    dependencies=[Depends(require_admin)],
+)
+async def reload_snapshot(manager: SnapshotManager = Depends(get_manager)) -> dict:
+    reloaded = await manager.reload()
+    return {"reloaded": reloaded, "current": manager.version, "published": manager.published()}
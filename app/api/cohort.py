@@ -0,0 +1,48 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.api.compare import get_service
+from app.schema.cohort import CohortRequest
+from app.services.cohort import CohortSimilarity
+from app.services.compare_service import CompareService
+
+router = APIRouter()
+
+
+@router.post(
+    "/cohort/pairs",
+    summary="Pares de redações parecidas dentro de uma turma (todos contra todos)",
+    description=(
+        "Compara cada redação com todas as outras da mesma turma, em blocos, e devolve "
+        "em streaming (NDJSON, um par por linha) só os pares com similaridade léxica ou "
+        'semântica acima do limiar: {"a", "b", "lexical", "semantic"}. Os pares saem '
+        "na ordem em que os blocos são calculados, não por score. Com a semântica ligada, "
+        "a turma tem no máximo `cohort_semantic_max_texts` redações."
+    ),
+)
+def cohort_pairs(body: CohortRequest, svc: CompareService = Depends(get_service)):
+    if any(not t.strip() for t in body.texts):
+        raise HTTPException(status_code=422, detail="Nenhum item de 'texts' pode ser vazio.")
+    if body.ids is not None and len(body.ids) != len(body.texts):
+        raise HTTPException(status_code=422, detail="'ids' deve ter um item por texto.")
+    if body.lexical_threshold is None and body.semantic_threshold is None:
+        raise HTTPException(status_code=422, detail="Informe ao menos um limiar.")
+
+    limit = svc.config.cohort_semantic_max_texts
+    if body.semantic_threshold is not None and len(body.texts) > limit:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A similaridade semântica aceita até {limit} redações por turma.",
+        )
+
+    cohort = CohortSimilarity(svc.config, encode=svc.retriever.encode_passages)
+    pairs = cohort.pairs(
+        body.texts,
+        lexical_threshold=body.lexical_threshold,
+        semantic_threshold=body.semantic_threshold,
+        ids=body.ids,
+    )
+    lines = (json.dumps(p) + "\n" for p in pairs)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
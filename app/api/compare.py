@@ -1,23 +1,48 @@
+import traceback
 from functools import lru_cache
 
 from fastapi import APIRouter, Depends, HTTPException
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 
 from app.config.config import Config
 from app.schema.compare import (
+    CompareBatchRequest,
+    CompareBatchResponse,
     CompareMode,
     CompareRequest,
     CompareResponse,
     MatchItem,
 )
 from app.services.compare_service import CompareService
+from app.services.snapshots import SnapshotManager
+from app.utils.metrics import ERRORS, timed
 
 router = APIRouter()
 
 
 @lru_cache
+def get_manager() -> SnapshotManager:
+    return SnapshotManager(Config(), CompareService)
+
+
 def get_service() -> CompareService:
-    cfg = Config()
-    return CompareService(cfg)
+    """Serviço da versão do corpus em uso; muda quando o SnapshotManager troca de versão."""
+    return get_manager().current()
+
+
+def compare_error(endpoint: str, e: Exception) -> HTTPException:
+    """
+    Conta a falha por tipo e a converte em resposta: ValueError vira 400, falha do
+    backend vetorial vira 503 e o resto vira 500, com o traceback no log.
+    """
+    ERRORS.inc(endpoint, type(e).__name__)
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, (ResponseHandlingException, UnexpectedResponse)):
+        print(f"[{endpoint}] backend vetorial indisponível: {e}", flush=True)
+        return HTTPException(status_code=503, detail="Backend vetorial indisponível.")
+    print(f"[{endpoint}] erro ao comparar textos:\n{traceback.format_exc()}", flush=True)
+    return HTTPException(status_code=500, detail="Erro interno ao comparar textos.")
 
 
 @router.get("/health")
@@ -25,6 +50,11 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@router.get("/stats/cache", summary="Contadores de hit/miss/eviction dos caches")
+def cache_stats(svc: CompareService = Depends(get_service)) -> dict:
+    return svc.cache_stats()
+
+
 @router.post(
     "/compare",
     response_model=CompareResponse,
@@ -35,38 +65,76 @@ def health() -> dict:
         "lexical: TF-IDF\n\n"
         "semantic: Apenas embeddings densos\n\n"
         "hybrid: Combina embeddings densos e esparsos (Léxico + Semantico)\n\n"
+        "fingerprint: Winnowing de k-gramas (cópia literal, com trechos)\n\n"
         "all: Retorna todas as estratégias\n\n"
         "default: all"
     ),
 )
-def compare(body: CompareRequest, svc: CompareService = Depends(get_service)):
+async def compare(body: CompareRequest, svc: CompareService = Depends(get_service)):
     if not body.text.strip():
         raise HTTPException(status_code=422, detail="Campo 'text' não pode ser vazio.")
 
     try:
-        if body.mode == CompareMode.lexical:
-            lex = svc.compare_lexical(body.text, top_k=body.top_k)
-            return CompareResponse(mode="lexical", lexical=[MatchItem(**r) for r in lex])
-
-        if body.mode == CompareMode.semantic:
-            den = svc.compare_semantic(body.text, top_k=body.top_k)
-            return CompareResponse(mode="semantic", semantic=[MatchItem(**r) for r in den])
-
-        if body.mode == CompareMode.hybrid:
-            hyb = svc.compare_hybrid(body.text, top_k=body.top_k)
-            return CompareResponse(mode="hybrid", hybrid=[MatchItem(**r) for r in hyb])
+        res = await svc.acompare(
+            body.text,
+            body.mode,
+            body.top_k,
+            include_text=body.include_text,
+            snippet_chars=body.snippet_chars,
+        )
+    except Exception as e:
+        raise compare_error("/compare", e) from e
 
-        lex = svc.compare_lexical(body.text, top_k=body.top_k)
-        den = svc.compare_semantic(body.text, top_k=body.top_k)
-        hyb = svc.compare_hybrid(body.text, top_k=body.top_k)
+    with timed("serialize"):
         return CompareResponse(
-            mode="all",
-            lexical=[MatchItem(**r) for r in lex],
-            semantic=[MatchItem(**r) for r in den],
-            hybrid=[MatchItem(**r) for r in hyb],
+            mode=body.mode.value,
+            **{strategy: [MatchItem(**r) for r in items] for strategy, items in res.items()},
         )
 
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e)) from e
+
+@router.post(
+    "/compare/batch",
+    response_model=CompareBatchResponse,
+    response_model_exclude_none=True,
+    summary="Compara vários textos de uma vez com o corpus",
+    description=(
+        "Mesmas estratégias de /compare, mas processando todos os textos em lote: "
+        "um único produto matricial no TF-IDF, um único embed e consultas em lote no Qdrant."
+    ),
+)
+def compare_batch(body: CompareBatchRequest, svc: CompareService = Depends(get_service)):
+    if any(not t.strip() for t in body.texts):
+        raise HTTPException(status_code=422, detail="Nenhum item de 'texts' pode ser vazio.")
+
+    run_lex = body.mode in {CompareMode.lexical, CompareMode.all}
+    run_den = body.mode in {CompareMode.semantic, CompareMode.all}
+    run_hyb = body.mode in {CompareMode.hybrid, CompareMode.all}
+    run_fp = body.mode in {CompareMode.fingerprint, CompareMode.all}
+    empty = [[] for _ in body.texts]
+
+    try:
+        svc.sync_updates()
+        lex = svc.compare_lexical_batch(body.texts, top_k=body.top_k) if run_lex else empty
+        den = svc.compare_semantic_batch(body.texts, top_k=body.top_k) if run_den else empty
+        hyb = svc.compare_hybrid_batch(body.texts, top_k=body.top_k) if run_hyb else empty
+        fps = svc.compare_fingerprint_batch(body.texts, top_k=body.top_k) if run_fp else empty
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Erro interno ao comparar textos.") from e
+        raise compare_error("/compare/batch", e) from e
+
+    def items(results: list) -> list:
+        return [MatchItem(**r) for r in svc.render(results, body.include_text, body.snippet_chars)]
+
+    with timed("serialize"):
+        return CompareBatchResponse(
+            mode=body.mode.value,
+            results=[
+                CompareResponse(
+                    mode=body.mode.value,
+                    lexical=items(lex_i),
+                    semantic=items(den_i),
+                    hybrid=items(hyb_i),
+                    fingerprint=items(fp_i),
+                )
+                for lex_i, den_i, hyb_i, fp_i in zip(lex, den, hyb, fps)
+            ],
+        )
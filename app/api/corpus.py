@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.admin import require_admin
+from app.api.compare import get_service
+from app.schema.corpus import CorpusAddRequest, CorpusAddResponse, CorpusDocument
+from app.services.compare_service import CompareService
+
+# inclusões e remoções alteram o corpus de todos os workers: só com o token administrativo
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post(
+    "/corpus/documents",
+    response_model=CorpusAddResponse,
+    summary="Inclui documentos no corpus sem reiniciar o serviço",
+    description=(
+        "Os textos entram no TF-IDF (modo lexical) em milissegundos, em todos os workers. "
+        "Fingerprints e coleções vetoriais só os recebem na próxima execução do indexador. "
+        "Exige o header X-Admin-Token."
+    ),
+)
+def add_documents(body: CorpusAddRequest, svc: CompareService = Depends(get_service)):
+    if any(not t.strip() for t in body.texts):
+        raise HTTPException(status_code=422, detail="Nenhum item de 'texts' pode ser vazio.")
+
+    documents = svc.add_documents(body.texts)
+    return CorpusAddResponse(documents=[CorpusDocument(**d) for d in documents])
+
+
+@router.delete(
+    "/corpus/documents/{doc_id}",
+    response_model=CorpusDocument,
+    summary="Remove um documento do corpus sem reiniciar o serviço",
+    description="Exige o header X-Admin-Token.",
+)
+def delete_document(doc_id: str, svc: CompareService = Depends(get_service)):
+    index = svc.delete_document(doc_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Documento não encontrado.")
+    return CorpusDocument(id=doc_id, index=index)
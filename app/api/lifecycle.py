@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.api.compare import get_manager, get_service
+from app.config.config import Config
+
+router = APIRouter()
+
+
+@router.get("/ready", summary="Indica se o serviço já carregou índices e modelo")
+def ready(request: Request) -> JSONResponse:
+    state = request.app.state
+    if getattr(state, "ready", False):
+        return JSONResponse({"status": "ready"})
+    return JSONResponse(
+        {"status": "warming_up", "error": getattr(state, "warmup_error", None)}, status_code=503
+    )
+
+
+async def warm_up(app: FastAPI, config: Config) -> None:
+    """
+    Monta o CompareService (índices léxicos e modelo denso carregados em paralelo) e
+    roda uma consulta de aquecimento em cada motor. Em caso de falha, tenta de novo
+    a cada `warmup_retry_seconds`, com /ready respondendo 503 enquanto isso.
+    """
+    factory = app.dependency_overrides.get(get_service, get_service)
+    while True:
+        try:
+            svc = await asyncio.to_thread(factory)
+            await svc.awarm_up()
+        except Exception as e:
+            app.state.warmup_error = f"{type(e).__name__}: {e}"
+            print(f"[warmup] falhou ({app.state.warmup_error}); nova tentativa.", flush=True)
+            await asyncio.sleep(config.warmup_retry_seconds)
+            continue
+        app.state.warmup_error = None
+        app.state.ready = True
+        print("[warmup] serviço pronto.", flush=True)
+        return
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Dispara o aquecimento no boot sem bloquear o servidor: /health (liveness) responde
+    logo, e /ready (readiness) só vira 200 quando tudo estiver carregado. Com
+    `snapshot_watch_seconds` > 0, acompanha as versões publicadas pelo indexador e
+    troca de versão sem reiniciar (ver SnapshotManager).
+    """
+    config = Config()
+    app.state.ready = not config.warmup_on_startup
+    app.state.warmup_error = None
+    tasks = []
+    if config.warmup_on_startup:
+        tasks.append(asyncio.create_task(warm_up(app, config)))
+    # com o serviço trocado (dependency_overrides), não há versão do corpus para acompanhar
+    if config.snapshot_watch_seconds > 0 and get_service not in app.dependency_overrides:
+        tasks.append(asyncio.create_task(get_manager().watch(config.snapshot_watch_seconds)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,53 @@
+import time
+
+from fastapi import APIRouter, FastAPI, Request, Response
+
+from app.config.config import Config
+from app.utils.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_SECONDS,
+    REQUESTS,
+    server_timing,
+    track_request,
+)
+from app.utils.profiling import RequestProfiler
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def install_instrumentation(app: FastAPI, config: Config) -> None:
+    """
+    Middleware que mede cada requisição: histograma e contador por endpoint, header
+    Server-Timing com as etapas medidas (encode, qdrant_*, tfidf, render...) e, se
+    configurado, profiling por amostragem.
+    """
+    profiler = RequestProfiler(config.profile_sample_rate, config.profile_dir)
+
+    @app.middleware("http")
+    async def instrument(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        session = profiler.start()
+        status = 500
+        t0 = time.perf_counter()
+        with track_request() as timings:
+            try:
+                response = await call_next(request)
+                status = response.status_code
+            finally:
+                elapsed = time.perf_counter() - t0
+                route = request.scope.get("route")
+                endpoint = getattr(route, "path", "unmatched")
+                REQUEST_SECONDS.observe(elapsed, endpoint)
+                REQUESTS.inc(endpoint, str(status))
+                profiler.stop(session, endpoint.strip("/").replace("/", "_") or "root")
+
+        response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+        return response
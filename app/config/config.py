@@ -1,10 +1,63 @@
 class Config:
-    def __init__(self):
+    def __init__(self):  # noqa: PLR0915
+        self.vector_backend = "remote"
         self.qdrant_url = "http://qdrant:6333"
+        self.qdrant_local_path = "data/qdrant"
+        self.quantization = None
+        self.hnsw_m = 16
+        self.hnsw_ef_construct = 100
+        self.vectors_on_disk = False
+        self.search_hnsw_ef = None
+        self.search_oversampling = 2.0
+        self.search_rescore = True
         self.model_dense_name = "sentence-transformers/all-MiniLM-L6-v2"
         self.model_sparse_name = "Qdrant/bm25"
         self.dense_name = "dense"
         self.sparse_name = "sparse"
         self.qdrant_collection_hybrid = "docs_hybrid"
-        self.qdrant_collection_dense = "docs_dense"
+        self.qdrant_collection_passages = "docs_passages"
+        self.passage_words = 150
+        self.passage_stride = 100
+        self.passage_aggregation = "max"
+        self.passage_candidates = 3
+        self.passage_spans = 3
         self.data_path = "data/raw/wikipedia-PT-300.jsonl"
+        self.document_store_path = "data/index/documents"
+        self.lexical_index_path = "data/index/lexical"
+        self.lexical_shards = 1
+        self.lexical_workers = None
+        self.lexical_compact_docs = 10_000
+        self.update_journal_path = "data/index/updates.jsonl"
+        self.admin_token = None
+        self.fingerprint_index_path = "data/index/fingerprint"
+        self.fingerprint_k = 5
+        self.fingerprint_window = 4
+        self.lsh_enabled = False
+        self.minhash_index_path = "data/index/minhash"
+        self.minhash_bands = 32
+        self.minhash_rows = 4
+        self.index_batch_size = 512
+        self.embed_batch_size = 256
+        self.embed_workers = None
+        self.embedding_store_path = "data/index/embeddings"
+        self.manifest_path = "data/index/manifest.json"
+        self.delete_missing = True
+        self.index_version_path = "data/index/version.json"
+        self.cohort_block_size = 1024
+        self.cohort_max_df = 0.9
+        self.cohort_semantic_max_texts = 2_000
+        self.index_versions_path = "data/index/versions"
+        self.index_keep_versions = 2
+        self.snapshot_watch_seconds = 10.0
+        self.embed_threads = None
+        self.embed_batching = True
+        self.embed_batch_max = 32
+        self.embed_batch_wait_ms = 2.0
+        self.embedding_cache_size = 10_000
+        self.embedding_cache_ttl = None
+        self.response_cache_size = 2_000
+        self.response_cache_ttl = 3600
+        self.warmup_on_startup = True
+        self.warmup_retry_seconds = 5.0
+        self.profile_sample_rate = 0.0
+        self.profile_dir = "data/profiles"
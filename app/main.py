@@ -1,6 +1,14 @@
 from fastapi import FastAPI
 
+from app.api.admin import router as admin_router
+from app.api.cohort import router as cohort_router
 from app.api.compare import router as compare_router
+from app.api.corpus import router as corpus_router
+from app.api.lifecycle import lifespan
+from app.api.lifecycle import router as lifecycle_router
+from app.api.metrics import install_instrumentation
+from app.api.metrics import router as metrics_router
+from app.config.config import Config
 
 
 def create_app() -> FastAPI:
@@ -9,8 +17,15 @@ def create_app() -> FastAPI:
         version="0.1.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
+    app.include_router(admin_router, prefix="")
+    app.include_router(cohort_router, prefix="")
     app.include_router(compare_router, prefix="")
+    app.include_router(corpus_router, prefix="")
+    app.include_router(lifecycle_router, prefix="")
+    app.include_router(metrics_router, prefix="")
+    install_instrumentation(app, Config())
     return app
 
 
@@ -0,0 +1,19 @@
+# app/schema/cohort.py
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CohortRequest(BaseModel):
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=2, max_length=50_000, description="Redações da turma"
+    )
+    ids: Optional[List[str]] = Field(
+        None, description="Identificador de cada redação (por padrão, a posição em 'texts')"
+    )
+    lexical_threshold: Optional[float] = Field(
+        0.5, ge=0.0, le=1.0, description="Cosseno TF-IDF mínimo de um par (null desliga)"
+    )
+    semantic_threshold: Optional[float] = Field(
+        None, ge=0.0, le=1.0, description="Cosseno mínimo dos embeddings de um par (null desliga)"
+    )
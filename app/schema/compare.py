@@ -1,6 +1,6 @@
 # app/schema/compare.py
 from enum import Enum
-from typing import List, Literal, Optional
+from typing import Annotated, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -9,7 +9,8 @@ class CompareMode(str, Enum):
     lexical = "lexical"  # TF-IDF
     semantic = "semantic"  # embeddings densos
     hybrid = "hybrid"  # embeddings densos + esparsos
-    all = "all"  # léxico + dense + hybrid
+    fingerprint = "fingerprint"  # winnowing (cópia literal)
+    all = "all"  # léxico + dense + hybrid + fingerprint
 
 
 class CompareRequest(BaseModel):
@@ -22,21 +23,57 @@ class CompareRequest(BaseModel):
             "lexical: TF-IDF\n"
             "semantic: Apenas embeddings densos\n"
             "hybrid: Combina embeddings densos e esparsos (Léxico + Semantico)\n"
+            "fingerprint: Winnowing de k-gramas (cópia literal, com trechos)\n"
             "all: Retorna todas as estratégias\n"
             "default: all"
         ),
     )
+    include_text: bool = Field(True, description="Inclui o texto dos documentos encontrados")
+    snippet_chars: Optional[int] = Field(
+        None,
+        ge=20,
+        le=5000,
+        description="Devolve só um trecho deste tamanho em volta do melhor trecho casado",
+    )
+
+
+class CompareBatchRequest(BaseModel):
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=256, description="Trechos a serem comparados"
+    )
+    top_k: int = Field(5, ge=1, le=50, description="Qtde de documentos a retornar")
+    mode: CompareMode = Field(CompareMode.all, description="Estratégia de busca (ver /compare)")
+    include_text: bool = Field(True, description="Inclui o texto dos documentos encontrados")
+    snippet_chars: Optional[int] = Field(
+        None, ge=20, le=5000, description="Tamanho do trecho de texto (ver /compare)"
+    )
+
+
+class MatchSpan(BaseModel):
+    query_start: int
+    query_end: int
+    doc_start: int
+    doc_end: int
+    similarity: Optional[float] = None
 
 
 class MatchItem(BaseModel):
     id: Optional[str] = None
     index: Optional[int] = None
     similarity: float
-    text: str
+    text: Optional[str] = None
+    text_start: Optional[int] = None
+    spans: Optional[List[MatchSpan]] = None
 
 
 class CompareResponse(BaseModel):
-    mode: Literal["lexical", "semantic", "hybrid", "all"]
+    mode: Literal["lexical", "semantic", "hybrid", "fingerprint", "all"]
     lexical: List[MatchItem] = Field(default_factory=list)
     semantic: List[MatchItem] = Field(default_factory=list)
     hybrid: List[MatchItem] = Field(default_factory=list)
+    fingerprint: List[MatchItem] = Field(default_factory=list)
+
+
+class CompareBatchResponse(BaseModel):
+    mode: Literal["lexical", "semantic", "hybrid", "fingerprint", "all"]
+    results: List[CompareResponse] = Field(default_factory=list)
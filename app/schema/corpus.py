@@ -0,0 +1,19 @@
+# app/schema/corpus.py
+from typing import Annotated, List
+
+from pydantic import BaseModel, Field
+
+
+class CorpusAddRequest(BaseModel):
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=256, description="Textos a incluir no corpus"
+    )
+
+
+class CorpusDocument(BaseModel):
+    id: str
+    index: int
+
+
+class CorpusAddResponse(BaseModel):
+    documents: List[CorpusDocument] = Field(default_factory=list)
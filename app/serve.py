@@ -0,0 +1,126 @@
+# app/serve.py
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.config.config import Config
+from app.services.compare_service import CorpusIndexes
+from app.services.snapshots import resolve_snapshot
+
+RESPAWN_DELAY = 1.0
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Abre o socket de escuta no pai; os workers herdam o mesmo socket no fork."""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sockets: List[socket.socket], args: argparse.Namespace) -> None:
+    """
+    Processo filho: sobe o uvicorn nos sockets herdados. O estado por processo
+    (sessão ONNX, clientes do Qdrant, caches, thread do micro-batching) é criado
+    aqui, no aquecimento do lifespan, e não no pai.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config("app.main:app", log_level=args.log_level, timeout_keep_alive=5)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def spawn(
+    sock: socket.socket, metrics_sock: Optional[socket.socket], args: argparse.Namespace
+) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker([sock] if metrics_sock is None else [sock, metrics_sock], args)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    """
+    Serve a API com vários workers que compartilham os índices: o store de documentos
+    e os índices léxicos são carregados uma vez no pai, congelados para o GC
+    (gc.freeze) e herdados por fork. Workers que morrem são recriados. Versões do
+    corpus publicadas depois são carregadas por cada worker, sem reinício.
+    As métricas são por processo: com --metrics-port P, o worker i também atende em
+    P + i, para o Prometheus coletar cada um (o /metrics da porta principal devolve
+    só as do worker que atendeu).
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--metrics-port", type=int, default=None, help="porta do /metrics do 1º worker"
+    )
+    args = parser.parse_args()
+
+    config, corpus_sha1 = resolve_snapshot(Config())
+    indexes = CorpusIndexes.preload(config, corpus_sha1)
+    print(f"[serve] {len(indexes.texts)} documentos pré-carregados", flush=True)
+    # importa a aplicação no pai para os workers herdarem os módulos já carregados
+    import app.main  # noqa: F401, PLC0415
+
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    # um socket por slot: o worker recriado num slot herda a mesma porta de métricas
+    metrics_socks: List[Optional[socket.socket]] = [
+        bind_socket(args.host, args.metrics_port + slot) if args.metrics_port else None
+        for slot in range(args.workers)
+    ]
+    workers: Dict[int, int] = {}
+    for slot in range(args.workers):
+        workers[spawn(sock, metrics_socks[slot], args)] = slot
+    print(f"[serve] {args.workers} workers em http://{args.host}:{args.port}", flush=True)
+    if args.metrics_port:
+        last = args.metrics_port + args.workers - 1
+        print(f"[serve] métricas por worker nas portas {args.metrics_port}-{last}", flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = workers.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        print(f"[serve] worker {pid} saiu ({status}); recriando", flush=True)
+        time.sleep(RESPAWN_DELAY)
+        workers[spawn(sock, metrics_socks[slot], args)] = slot
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# app/services/cohort.py
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from app.ai.lexical.tfidf import TextSimilarity
+from app.ai.semantic.passages import split_passages
+from app.config.config import Config
+
+Encoder = Callable[[List[str]], Iterable[Any]]
+
+
+class CohortSimilarity:
+    """
+    Similaridade todos-contra-todos entre as redações de uma turma (cópia entre alunos),
+    sem passar pelo corpus. O léxico é o cosseno TF-IDF com vocabulário e IDF da própria
+    turma (termos do enunciado, presentes em quase todas, pesam pouco ou saem pelo
+    max_df); o semântico é o cosseno entre as médias dos embeddings das passagens de
+    cada redação. As matrizes n x n nunca são montadas: os produtos são feitos em blocos
+    de `cohort_block_size` x `cohort_block_size` do triângulo superior, e só os pares
+    acima do limiar saem, em streaming.
+    Uso:
+        cohort = CohortSimilarity(config, encode=retriever.encode_passages)
+        for pair in cohort.pairs(texts, lexical_threshold=0.5, semantic_threshold=0.9):
+            ...  # {"a": 0, "b": 7, "lexical": 0.81, "semantic": 0.95}
+    """
+
+    def __init__(self, config: Config, encode: Optional[Encoder] = None):
+        self.config = config
+        self.encode = encode
+
+    def lexical_matrix(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """
+        Vetores TF-IDF (L2) das redações. Termos de uma redação só não pesam em nenhum
+        par (min_df=2); com poucas redações, o max_df sobe até caber o min_df.
+        """
+        n = len(texts)
+        ts = TextSimilarity(min_df=2, max_df=max(self.config.cohort_max_df, 2 / n))
+        try:
+            return ts.fit_transform(texts)
+        except ValueError:
+            # nenhum termo em comum entre as redações
+            return sparse.csr_matrix((n, 1), dtype=np.float32)
+
+    def dense_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embedding (L2) de cada redação: média dos embeddings das suas passagens, que o
+        modelo denso recebe em lotes de `embed_batch_size` (redações longas não são
+        truncadas no limite de tokens do modelo).
+        """
+        if self.encode is None:
+            raise RuntimeError("A similaridade semântica exige um `encode` (modelo denso).")
+
+        passages: List[str] = []
+        owners: List[int] = []
+        for i, text in enumerate(texts):
+            spans = split_passages(text, self.config.passage_words, self.config.passage_stride)
+            for start, end in spans or [(0, len(text))]:
+                passages.append(text[start:end])
+                owners.append(i)
+
+        sums: Optional[np.ndarray] = None
+        step = self.config.embed_batch_size
+        for b in range(0, len(passages), step):
+            vecs = np.asarray(list(self.encode(passages[b : b + step])), dtype=np.float32)
+            vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+            if sums is None:
+                sums = np.zeros((len(texts), vecs.shape[1]), dtype=np.float32)
+            np.add.at(sums, owners[b : b + step], vecs)
+        sums /= np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        return sums
+
+    def pairs(
+        self,
+        texts: Sequence[str],
+        lexical_threshold: Optional[float] = 0.5,
+        semantic_threshold: Optional[float] = None,
+        ids: Optional[Sequence[Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pares (a, b), a < b, com similaridade léxica >= `lexical_threshold` ou semântica
+        >= `semantic_threshold` (None desliga o motor). A memória fica limitada às duas
+        matrizes de vetores e a um bloco de scores; os pares saem na ordem dos blocos,
+        não por score. `ids` troca os índices das redações nos pares.
+        Saída: {"a", "b", "lexical", "semantic"} (score None do motor desligado).
+        """
+        if lexical_threshold is None and semantic_threshold is None:
+            raise ValueError("Informe ao menos um limiar (léxico ou semântico).")
+        n = len(texts)
+        if n < 2:
+            return
+        lexical = self.lexical_matrix(texts) if lexical_threshold is not None else None
+        dense = self.dense_matrix(texts) if semantic_threshold is not None else None
+        names = list(ids) if ids is not None else list(range(n))
+
+        block = self.config.cohort_block_size
+        for i0 in range(0, n, block):
+            i1 = min(n, i0 + block)
+            for j0 in range(i0, n, block):
+                j1 = min(n, j0 + block)
+                lex = sem = None
+                hit = np.zeros((i1 - i0, j1 - j0), dtype=bool)
+                if lexical is not None:
+                    lex = (lexical[i0:i1] @ lexical[j0:j1].T).toarray()
+                    hit |= lex >= lexical_threshold
+                if dense is not None:
+                    sem = dense[i0:i1] @ dense[j0:j1].T
+                    hit |= sem >= semantic_threshold
+                if i0 == j0:
+                    hit = np.triu(hit, k=1)
+
+                for r, c in zip(*np.nonzero(hit)):
+                    yield {
+                        "a": names[i0 + r],
+                        "b": names[j0 + c],
+                        "lexical": None if lex is None else float(lex[r, c]),
+                        "semantic": None if sem is None else float(sem[r, c]),
+                    }
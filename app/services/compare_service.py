@@ -1,35 +1,509 @@
-from typing import Any, Dict, List
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.ai.lexical.fingerprint import FingerprintIndex
+from app.ai.lexical.incremental import IncrementalTextSimilarity
+from app.ai.lexical.minhash import MinHashLSH
+from app.ai.lexical.sharded import ShardedTextSimilarity
 from app.ai.lexical.tfidf import TextSimilarity
+from app.ai.semantic.indexer import doc_id
 from app.ai.semantic.retriever import Retriever
 from app.config.config import Config
-from app.utils.json_utils import load_pt_corpus_from_jsonl
+from app.schema.compare import CompareMode
+from app.utils.cache_utils import LRUCache
+from app.utils.doc_store import DocumentStore
+from app.utils.hash_utils import file_sha1, text_sha1
+from app.utils.journal import UpdateJournal
+from app.utils.json_utils import iter_pt_corpus_from_jsonl, read_json
+from app.utils.metrics import timed
+
+WARMUP_TEXT = "Texto de aquecimento para carregar o modelo e os índices antes do tráfego."
+
+# índices pré-carregados por CorpusIndexes.preload(), por (corpus, artefato de documentos)
+_PRELOADED: Dict[Tuple[str, str], "CorpusIndexes"] = {}
+
+
+def _preload_key(config: Config) -> Tuple[str, str]:
+    return config.data_path, config.document_store_path
+
+
+class CorpusIndexes:
+    """
+    Parte somente leitura do serviço: store de documentos, índices léxicos e o mapa
+    de ids do Qdrant. Carregada uma vez no processo pai antes do fork (app/serve.py)
+    e compartilhada pelos workers: arrays mapeados via page cache e objetos Python
+    via copy-on-write. Inclusões e remoções feitas com a API rodando passam por um
+    journal e cada processo as aplica por cima (ver sync_updates).
+    """
+
+    def __init__(self, config: Config, corpus_sha1: Optional[str] = None):
+        """`corpus_sha1` é o da versão publicada; sem ele, vale o do JSONL em `data_path`."""
+        self.config = config
+        self.corpus_sha1 = corpus_sha1 or file_sha1(self.config.data_path)
+        self.texts = self._load_documents()
+        if not self.texts:
+            raise RuntimeError(f"Nenhum texto encontrado em {self.config.data_path}")
+
+        self.tfidf = IncrementalTextSimilarity(self._load_lexical())
+        self.fingerprint = self._load_index(
+            FingerprintIndex,
+            self.config.fingerprint_index_path,
+            "de fingerprints",
+            k=self.config.fingerprint_k,
+            window=self.config.fingerprint_window,
+        )
+        self.minhash: Optional[MinHashLSH] = (
+            self._load_index(
+                MinHashLSH,
+                self.config.minhash_index_path,
+                "MinHash",
+                bands=self.config.minhash_bands,
+                rows=self.config.minhash_rows,
+            )
+            if self.config.lsh_enabled
+            else None
+        )
+        self.parent_index = self._build_parent_index()
+
+        self.journal = UpdateJournal(self.config.update_journal_path)
+        self._update_lock = threading.Lock()
+        self.sync_updates()
+
+    @classmethod
+    def preload(cls, config: Config, corpus_sha1: Optional[str] = None) -> "CorpusIndexes":
+        """Carrega os índices e os registra para os CompareService criados depois (pós-fork)."""
+        indexes = cls(config, corpus_sha1)
+        _PRELOADED[_preload_key(config)] = indexes
+        return indexes
+
+    def _load_documents(self) -> DocumentStore:
+        """
+        Carrega o store de documentos (mmap) gravado pelo indexador; se faltar ou
+        estiver velho, monta o store em memória lendo o JSONL em streaming.
+        """
+        try:
+            return DocumentStore.load(self.config.document_store_path, corpus_sha1=self.corpus_sha1)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Artefato de documentos indisponível: {e}", flush=True)
+
+        store = DocumentStore()
+        store.fit(iter_pt_corpus_from_jsonl(self.config.data_path))
+        return store
+
+    def _load_index(self, cls: type, path: str, name: str, **params: Any) -> Any:
+        """
+        Carrega o artefato gravado pelo indexador; se faltar ou estiver velho,
+        treina o índice em memória a partir do corpus.
+        """
+        try:
+            index = cls.load(path, corpus_sha1=self.corpus_sha1)
+            if index.n_docs == len(self.texts):
+                return index
+            print(f"Artefato {name} com quantidade de docs divergente.", flush=True)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Artefato {name} indisponível: {e}", flush=True)
+
+        print(f"Treinando índice {name} em memória...", flush=True)
+        index = cls(**params)
+        index.fit(self.texts)
+        return index
+
+    def _load_lexical(self) -> TextSimilarity:
+        """TF-IDF monolítico ou, com `lexical_shards` > 1, particionado em faixas."""
+        if self.config.lexical_shards <= 1:
+            return self._load_index(TextSimilarity, self.config.lexical_index_path, "léxico")
+
+        index = self._load_index(
+            ShardedTextSimilarity,
+            self.config.lexical_index_path,
+            "léxico",
+            n_shards=self.config.lexical_shards,
+        )
+        index.workers = self.config.lexical_workers or index.n_shards
+        return index
+
+    def _build_parent_index(self) -> Dict[str, int]:
+        """
+        Mapa id do Qdrant -> índice no corpus, para resolver os documentos das buscas
+        vetoriais. Usa os ids gravados no artefato léxico (vazios nos documentos
+        removidos antes de uma compactação) ou os recalcula do texto.
+        """
+        ids = self.tfidf.doc_ids
+        if len(ids) != len(self.texts):
+            ids = [doc_id(t.strip()) for t in self.texts]
+        return {str(_id): i for i, _id in enumerate(ids) if _id}
+
+    def sync_updates(self) -> int:
+        """
+        Aplica, na ordem do journal, as inclusões e remoções gravadas (por qualquer
+        worker) desde a última leitura; registros de outro corpus são ignorados.
+        Inclusões entram no store de documentos, no TF-IDF e no mapa de ids. Reaplicar
+        um registro não muda nada (ex.: depois de uma compactação, ver scripts/compact.py).
+        Saída: quantas alterações foram aplicadas.
+        """
+        with self._update_lock:
+            applied = 0
+            added: Dict[str, str] = {}
+            for record in self.journal.read_new():
+                if record.get("corpus") != self.corpus_sha1:
+                    continue
+                if record["op"] == "add":
+                    if record["id"] not in added and not self._is_live(record["id"]):
+                        added[record["id"]] = record["text"]
+                    continue
+                applied += self._append(added)
+                added = {}
+                idx = self.parent_index.get(record["id"])
+                if idx is not None:
+                    applied += self.tfidf.delete([idx])
+            applied += self._append(added)
+        return applied
+
+    def _is_live(self, _id: str) -> bool:
+        idx = self.parent_index.get(_id)
+        return idx is not None and not self.tfidf.is_deleted(idx)
+
+    def _append(self, added: Dict[str, str]) -> int:
+        if not added:
+            return 0
+        texts = list(added.values())
+        self.texts.append(texts)
+        for _id, idx in zip(added, self.tfidf.add(texts)):
+            self.parent_index[_id] = idx
+        return len(texts)
+
+    def add_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Grava as inclusões no journal e as aplica neste processo.
+        Saída: id e índice de cada texto (um texto já presente mantém o índice que tinha).
+        """
+        ids = [doc_id(t.strip()) for t in texts]
+        self.journal.append(
+            [
+                {"op": "add", "corpus": self.corpus_sha1, "id": _id, "text": text}
+                for _id, text in zip(ids, texts)
+            ]
+        )
+        self.sync_updates()
+        return [{"id": _id, "index": self.parent_index[_id]} for _id in ids]
+
+    def delete_document(self, _id: str) -> Optional[int]:
+        """
+        Grava a remoção no journal e a aplica neste processo.
+        Saída: índice do documento removido, ou None se ele não existe (ou já foi removido).
+        """
+        self.sync_updates()
+        if not self._is_live(_id):
+            return None
+        self.journal.append([{"op": "delete", "corpus": self.corpus_sha1, "id": _id}])
+        self.sync_updates()
+        return self.parent_index[_id]
 
 
 class CompareService:
-    """Orquestra as buscas léxicas (TF-IDF) e semânticas"""
+    """Orquestra as buscas léxicas (TF-IDF e fingerprints) e semânticas"""
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        indexes: Optional[CorpusIndexes] = None,
+        retriever: Optional[Retriever] = None,
+        corpus_sha1: Optional[str] = None,
+    ):
+        """
+        Monta o serviço. Sem `indexes`, reaproveita os pré-carregados para o mesmo
+        corpus ou os carrega enquanto o modelo denso sobe numa thread. Com `retriever`
+        (troca de versão), o modelo e os clientes dele são reaproveitados.
+        """
         self.config = config
 
-        self._corpus_texts: List[str] = load_pt_corpus_from_jsonl(self.config.data_path)
-        if not self._corpus_texts:
-            raise RuntimeError(f"Nenhum texto encontrado em {self.config.data_path}")
+        if retriever is not None:
+            self._retriever = retriever.with_config(config)
+            indexes = indexes or self._load_indexes(config, corpus_sha1)
+        else:
+            # o modelo denso (sessão ONNX) carrega numa thread enquanto os índices léxicos sobem
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pending = pool.submit(Retriever, self.config)
+                indexes = indexes or self._load_indexes(config, corpus_sha1)
+                self._retriever = pending.result()
+
+        self._indexes = indexes
+        self._corpus_sha1 = indexes.corpus_sha1
+        self._corpus_texts = indexes.texts
+        self._tfidf = indexes.tfidf
+        self._fingerprint = indexes.fingerprint
+        self._minhash = indexes.minhash
+        self._parent_index = indexes.parent_index
+
+        self._response_cache = LRUCache(
+            maxsize=self.config.response_cache_size, ttl=self.config.response_cache_ttl
+        )
+        self._version = self._corpus_sha1
+        self._version_mtime: Optional[int] = None
+
+    @staticmethod
+    def _load_indexes(config: Config, corpus_sha1: Optional[str]) -> CorpusIndexes:
+        """
+        Índices pré-carregados antes do fork para o mesmo corpus ou, numa versão
+        carregada depois (troca de versão), índices próprios deste processo.
+        """
+        return _PRELOADED.get(_preload_key(config)) or CorpusIndexes(config, corpus_sha1)
+
+    def release(self) -> None:
+        """
+        Tira os índices deste serviço do registro de pré-carregados, para que sejam
+        liberados quando as requisições em andamento terminarem (troca de versão).
+        """
+        key = _preload_key(self.config)
+        if _PRELOADED.get(key) is self._indexes:
+            del _PRELOADED[key]
+
+    @property
+    def retriever(self) -> Retriever:
+        return self._retriever
 
-        self._tfidf = TextSimilarity()
-        self._tfidf.fit(self._corpus_texts)
+    def _vector_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve o índice no corpus dos ids devolvidos pelo Qdrant e ajusta os offsets
+        das passagens (indexadas sobre o texto sem espaços nas pontas) ao corpus.
+        Documentos removidos pela API saem do resultado.
+        """
+        out = []
+        for r in results:
+            idx = self._parent_index.get(str(r["id"]))
+            if idx is None:
+                out.append(r)
+                continue
+            if self._tfidf.is_deleted(idx):
+                continue
+            if r.get("spans") is None:
+                out.append({**r, "index": idx})
+                continue
+            text = self._corpus_texts[idx]
+            lead = len(text) - len(text.lstrip())
+            spans = [
+                {**sp, "doc_start": sp["doc_start"] + lead, "doc_end": sp["doc_end"] + lead}
+                for sp in r["spans"]
+            ]
+            out.append({**r, "index": idx, "spans": spans})
+        return out
 
-        self._retriever = Retriever(self.config)
+    def render(
+        self,
+        results: List[Dict[str, Any]],
+        include_text: bool = True,
+        snippet_chars: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Anexa o texto dos documentos aos resultados: o documento inteiro, só um trecho
+        de `snippet_chars` caracteres em volta do melhor trecho casado (`text_start`
+        indica onde ele começa) ou nada, com `include_text=False`.
+        """
+        if not include_text:
+            return results
+
+        out = []
+        with timed("render"):
+            for r in results:
+                idx = r.get("index")
+                if idx is None:
+                    out.append(r)
+                    continue
+                text = self._corpus_texts[idx]
+                if snippet_chars is None:
+                    out.append({**r, "text": text})
+                    continue
+                start = self._snippet_start(text, r.get("spans"), snippet_chars)
+                out.append({**r, "text": text[start : start + snippet_chars], "text_start": start})
+        return out
+
+    @staticmethod
+    def _snippet_start(text: str, spans: Optional[List[Dict[str, Any]]], size: int) -> int:
+        """
+        Início da janela de `size` caracteres centrada no melhor trecho casado (maior
+        similaridade e, no empate, o mais longo); sem trechos, o início do documento.
+        """
+        if not spans:
+            return 0
+        best = max(
+            spans, key=lambda sp: (sp.get("similarity") or 0.0, sp["doc_end"] - sp["doc_start"])
+        )
+        center = (best["doc_start"] + best["doc_end"]) // 2
+        return max(0, min(center - size // 2, len(text) - size))
 
     def compare_lexical(self, text: str, top_k: int) -> List[Dict[str, Any]]:
-        ranked = self._tfidf.rank(text, top_k=top_k)
-        return [
-            {"index": idx, "similarity": similarity, "text": self._corpus_texts[idx]}
-            for idx, similarity in ranked
-        ]
+        candidates = None
+        if self._minhash is not None:
+            with timed("minhash"):
+                candidates = self._minhash.candidates(text)
+        with timed("tfidf"):
+            ranked = self._tfidf.rank(text, top_k=top_k, candidates=candidates)
+        return self._lexical_results(ranked)
+
+    def compare_lexical_batch(self, texts: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Ranking léxico de vários textos num único produto matricial. Com o pré-filtro
+        MinHash ligado, cada texto é ranqueado só nos seus candidatos, como em
+        compare_lexical, para que /compare e /compare/batch devolvam o mesmo resultado.
+        """
+        if self._minhash is not None:
+            return [self.compare_lexical(text, top_k) for text in texts]
+        with timed("tfidf"):
+            ranked = self._tfidf.rank_many(texts, top_k)
+        return [self._lexical_results(r) for r in ranked]
+
+    @staticmethod
+    def _lexical_results(ranked: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        return [{"index": idx, "similarity": similarity} for idx, similarity in ranked]
+
+    def compare_fingerprint(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+        with timed("fingerprint"):
+            results = self._fingerprint.search(text, top_k=top_k)
+        return [r for r in results if not self._tfidf.is_deleted(r["index"])]
+
+    def compare_fingerprint_batch(self, texts: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        return [self.compare_fingerprint(text, top_k) for text in texts]
 
     def compare_semantic(self, text: str, top_k: int) -> List[Dict[str, Any]]:
-        return self._retriever.search_dense_only(text, top_k=top_k)
+        return self._vector_results(self._retriever.search_dense_only(text, top_k=top_k))
 
     def compare_hybrid(self, text: str, top_k: int) -> List[Dict[str, Any]]:
-        return self._retriever.search_hybrid(query=text, top_k=top_k)
+        return self._vector_results(self._retriever.search_hybrid(query=text, top_k=top_k))
+
+    def compare_semantic_batch(self, texts: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        return [
+            self._vector_results(r)
+            for r in self._retriever.search_dense_only_batch(texts, top_k=top_k)
+        ]
+
+    def compare_hybrid_batch(self, texts: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        return [
+            self._vector_results(r)
+            for r in self._retriever.search_hybrid_batch(queries=texts, top_k=top_k)
+        ]
+
+    def sync_updates(self) -> None:
+        """Aplica as alterações novas do journal; se houver alguma, limpa o cache de respostas."""
+        if self._indexes.sync_updates():
+            self._response_cache.clear()
+
+    def add_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Inclui documentos no corpus (ver CorpusIndexes.add_documents)."""
+        added = self._indexes.add_documents(texts)
+        self._response_cache.clear()
+        return added
+
+    def delete_document(self, _id: str) -> Optional[int]:
+        """Remove um documento do corpus (ver CorpusIndexes.delete_document)."""
+        idx = self._indexes.delete_document(_id)
+        self._response_cache.clear()
+        return idx
+
+    def corpus_version(self) -> str:
+        """
+        Versão do corpus publicada pelo indexador em `index_version_path`. O arquivo só
+        é relido quando seu mtime muda; ao trocar de versão, o cache de respostas é limpo.
+        """
+        try:
+            mtime = os.stat(self.config.index_version_path).st_mtime_ns
+        except OSError:
+            return self._version
+        if mtime != self._version_mtime:
+            published = read_json(self.config.index_version_path) or {}
+            version = published.get("version") or self._version
+            if version != self._version:
+                self._response_cache.clear()
+            self._version, self._version_mtime = version, mtime
+        return self._version
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores de hit/miss/eviction dos caches de embedding e de resposta."""
+        return {
+            "embedding": self._retriever.embedding_cache.stats(),
+            "response": self._response_cache.stats(),
+        }
+
+    async def awarm_up(self) -> None:
+        """
+        Consulta de aquecimento em cada motor: primeira inferência da sessão ONNX,
+        páginas dos índices mapeados em memória e conexão com o Qdrant.
+        """
+        await asyncio.to_thread(self._retriever.encode_queries, [WARMUP_TEXT])
+        await asyncio.to_thread(self.compare_lexical, WARMUP_TEXT, 1)
+        await asyncio.to_thread(self.compare_fingerprint, WARMUP_TEXT, 1)
+        await self._retriever.async_client.get_collections()
+
+    async def acompare(
+        self,
+        text: str,
+        mode: CompareMode,
+        top_k: int,
+        include_text: bool = True,
+        snippet_chars: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Executa as estratégias pedidas em `mode` de forma concorrente. O TF-IDF roda
+        num thread pool enquanto as consultas vão ao Qdrant, e os embeddings (janelas
+        da query para semantic e texto inteiro para hybrid) saem de um único lote.
+        Respostas ficam em cache, sem texto, por (hash do texto, mode, top_k, versão
+        do corpus), e o cache é limpo quando chegam alterações pelo journal (aplicadas
+        numa thread, fora do event loop); o texto é anexado por render() conforme
+        `include_text`/`snippet_chars`.
+        Saída: {"lexical": [...], "semantic": [...], "hybrid": [...]} (só os pedidos).
+        """
+        await asyncio.to_thread(self.sync_updates)
+        key = (text_sha1(text), mode.value, top_k, self.corpus_version())
+        out = self._response_cache.get(key)
+        if out is None:
+            out = await self._acompare(text, mode, top_k)
+            self._response_cache.set(key, out)
+        return {
+            strategy: self.render(items, include_text, snippet_chars)
+            for strategy, items in out.items()
+        }
+
+    async def _acompare(
+        self, text: str, mode: CompareMode, top_k: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+
+        jobs = []
+        if mode in {CompareMode.lexical, CompareMode.all}:
+            jobs.append(self._acompare_lexical(text, top_k))
+        if mode in {CompareMode.fingerprint, CompareMode.all}:
+            jobs.append(self._acompare_fingerprint(text, top_k))
+        if mode in {CompareMode.semantic, CompareMode.hybrid, CompareMode.all}:
+            jobs.append(self._acompare_vectors(text, mode, top_k))
+
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for part in await asyncio.gather(*jobs):
+            out.update(part)
+        return out
+
+    async def _acompare_lexical(self, text: str, top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        return {"lexical": await asyncio.to_thread(self.compare_lexical, text, top_k)}
+
+    async def _acompare_fingerprint(self, text: str, top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        return {"fingerprint": await asyncio.to_thread(self.compare_fingerprint, text, top_k)}
+
+    async def _acompare_vectors(
+        self, text: str, mode: CompareMode, top_k: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        semantic = mode in {CompareMode.semantic, CompareMode.all}
+        hybrid = mode in {CompareMode.hybrid, CompareMode.all}
+
+        windows = self._retriever.query_windows(text) if semantic else []
+        texts = [text[s:e] for s, e in windows] + ([text] if hybrid else [])
+        vecs = await asyncio.to_thread(self._retriever.encode_queries, texts)
+
+        searches = {}
+        if semantic:
+            searches["semantic"] = self._retriever.asearch_dense_only(
+                windows, vecs[: len(windows)], top_k=top_k
+            )
+        if hybrid:
+            searches["hybrid"] = self._retriever.asearch_hybrid(text, vecs[-1], top_k=top_k)
+        found = await asyncio.gather(*searches.values())
+        return {name: self._vector_results(r) for name, r in zip(searches, found)}
@@ -0,0 +1,133 @@
+# app/services/snapshots.py
+import asyncio
+import copy
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config.config import Config
+from app.utils.json_utils import read_json
+
+# sufixo das coleções do Qdrant de cada versão; o nome sem sufixo vira alias da publicada
+COLLECTION_VERSION = "{name}__{version}"
+# versão com o journal incorporado (scripts/compact.py): usa as coleções da versão de origem
+COMPACTED_VERSION = "{version}+{stamp}"
+
+
+def collections_version(version: str) -> str:
+    """Versão dona das coleções do Qdrant: a própria ou, numa compactada, a de origem."""
+    return version.split("+", 1)[0]
+
+
+def version_dir(config: Config, version: str) -> str:
+    """Diretório dos artefatos (documentos e índices léxicos) de uma versão."""
+    return os.path.join(config.index_versions_path, version)
+
+
+def snapshot_config(config: Config, version: str) -> Config:
+    """Cópia da config apontando para os artefatos e as coleções da versão."""
+    cfg = copy.copy(config)
+    root = version_dir(config, version)
+    cfg.document_store_path = os.path.join(root, "documents")
+    cfg.lexical_index_path = os.path.join(root, "lexical")
+    cfg.fingerprint_index_path = os.path.join(root, "fingerprint")
+    cfg.minhash_index_path = os.path.join(root, "minhash")
+    cfg.qdrant_collection_hybrid = COLLECTION_VERSION.format(
+        name=config.qdrant_collection_hybrid, version=collections_version(version)
+    )
+    cfg.qdrant_collection_passages = COLLECTION_VERSION.format(
+        name=config.qdrant_collection_passages, version=collections_version(version)
+    )
+    return cfg
+
+
+def read_published(config: Config) -> Dict[str, Any]:
+    """Registro da versão publicada pelo indexador (vazio se nada foi publicado)."""
+    return read_json(config.index_version_path) or {}
+
+
+def resolve_snapshot(
+    config: Config, published: Optional[Dict[str, Any]] = None
+) -> Tuple[Config, Optional[str]]:
+    """
+    Config e sha1 do corpus da versão publicada. Sem versão publicada, ou com o
+    layout antigo (artefatos direto em data/index), devolve a própria config e None.
+    """
+    published = read_published(config) if published is None else published
+    version = published.get("version")
+    if not version or not os.path.isdir(version_dir(config, version)):
+        return config, None
+    return snapshot_config(config, version), published.get("corpus_sha1")
+
+
+class SnapshotManager:
+    """
+    Mantém o CompareService da versão publicada do corpus e o troca sem reiniciar:
+    reload() monta o serviço da nova versão em segundo plano (reaproveitando modelo,
+    micro-batching e clientes do Qdrant), aquece e só então o publica com uma única
+    atribuição. Requisições em andamento terminam no serviço que já tinham em mãos;
+    o antigo é liberado quando a última delas acaba. Os índices da nova versão são
+    carregados por cada worker, sem o compartilhamento do pré-carregamento antes do fork.
+    Uso:
+        manager = SnapshotManager(Config(), CompareService)
+        svc = manager.current()
+        await manager.reload()  # True se trocou de versão
+    """
+
+    def __init__(self, config: Config, factory: Callable[..., Any]):
+        self.config = config
+        self._factory = factory
+        self._service: Optional[Any] = None
+        self.version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._reloading = asyncio.Lock()
+
+    def current(self) -> Any:
+        """Serviço da versão em uso; na primeira chamada, carrega a versão publicada."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    published = read_published(self.config)
+                    cfg, corpus_sha1 = resolve_snapshot(self.config, published)
+                    self._service = self._factory(cfg, corpus_sha1=corpus_sha1)
+                    self.version = published.get("version")
+        return self._service
+
+    def published(self) -> Optional[str]:
+        return read_published(self.config).get("version")
+
+    async def reload(self) -> bool:
+        """
+        Carrega a versão publicada, se for outra que não a em uso. Em caso de falha,
+        o serviço atual continua respondendo. Saída: se a versão foi trocada.
+        """
+        async with self._reloading:
+            published = read_published(self.config)
+            version = published.get("version")
+            old = self._service
+            if old is None or not version or version == self.version:
+                return False
+
+            print(f"[snapshot] carregando a versão {version}...", flush=True)
+            try:
+                cfg, corpus_sha1 = resolve_snapshot(self.config, published)
+                svc = await asyncio.to_thread(
+                    self._factory, cfg, retriever=old.retriever, corpus_sha1=corpus_sha1
+                )
+                await svc.awarm_up()
+            except Exception as e:
+                print(
+                    f"[snapshot] falha ao carregar {version}: {type(e).__name__}: {e}", flush=True
+                )
+                return False
+
+            self._service, self.version = svc, version
+            old.release()
+            print(f"[snapshot] versão {version} em uso", flush=True)
+            return True
+
+    async def watch(self, interval: float) -> None:
+        """Confere a versão publicada a cada `interval` segundos e troca quando ela muda."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.reload()
@@ -0,0 +1,76 @@
+# app/utils/artifact_utils.py
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from app.utils.json_utils import read_json
+
+META_FILE = "meta.json"
+
+
+@contextmanager
+def staging_dir(path: str) -> Iterator[str]:
+    """
+    Fornece um diretório temporário para escrever um artefato. Ao sair sem erro,
+    ele substitui `path`, para que leitores nunca vejam um artefato pela metade.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """Grava cada array como `<nome>.npy` dentro de `path`."""
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), arr)
+
+
+def load_arrays(path: str, names: Iterable[str], mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Carrega os arrays `<nome>.npy`; com `mmap=True` eles são mapeados em memória."""
+    mmap_mode = "r" if mmap else None
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in names}
+
+
+def write_json(path: str, obj: Any) -> None:
+    """Grava `obj` como JSON (UTF-8, sem escapar acentos)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+
+
+def read_meta(path: str) -> Optional[Dict[str, Any]]:
+    """Lê o meta.json de um artefato. Retorna None se não existir ou for inválido."""
+    return read_json(os.path.join(path, META_FILE))
+
+
+def check_meta(
+    path: str, kind: str, version: int, corpus_sha1: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Valida o meta.json de um artefato e o retorna.
+    Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado.
+    """
+    meta = read_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"Artefato {kind} não encontrado em {path}")
+    if meta.get("version") != version:
+        raise ValueError(
+            f"Versão do artefato {kind} incompatível: {meta.get('version')} (esperado {version})"
+        )
+    if corpus_sha1 is not None and meta.get("corpus_sha1") != corpus_sha1:
+        raise ValueError(f"Artefato {kind} desatualizado em relação ao corpus.")
+    return meta
@@ -0,0 +1,74 @@
+# app/utils/cache_utils.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU limitado, com TTL opcional e contadores de hit/miss/eviction.
+    Thread-safe, pois é compartilhado entre o event loop e o thread pool.
+    Uso:
+        cache = LRUCache(maxsize=1000, ttl=60)
+        cache.set("k", 1)
+        cache.get("k")  # 1
+        cache.stats()   # {"hits": 1, "misses": 0, ...}
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor de `key` (e o marca como recente) ou `default`."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and self.ttl is not None and item[1] < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                item = _MISSING
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Guarda `value`, descartando o item menos recente se o cache estiver cheio."""
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove todos os itens, contando-os como evictions."""
+        with self._lock:
+            self.evictions += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores do cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
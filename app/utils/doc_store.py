@@ -0,0 +1,118 @@
+# app/utils/doc_store.py
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.utils.artifact_utils import (
+    META_FILE,
+    check_meta,
+    load_arrays,
+    read_meta,
+    save_arrays,
+    staging_dir,
+    write_json,
+)
+
+ARTIFACT_VERSION = 1
+ARRAY_FILES = ("data", "offsets")
+
+
+class DocumentStore:
+    """
+    Textos do corpus num único buffer UTF-8 mais um array de offsets (em bytes).
+    Carregado com mmap, o buffer fica no page cache e é compartilhado entre os
+    workers; cada texto só vira `str` quando é pedido. Documentos incluídos com a
+    API rodando (append) ficam numa lista em memória depois dos do buffer.
+    Uso:
+        store = DocumentStore()
+        store.fit(textos)
+        store.save("data/index/documents", corpus_sha1="...")
+        store = DocumentStore.load("data/index/documents", corpus_sha1="...")
+        store[42]  # texto do documento 42
+    """
+
+    def __init__(self):
+        self._data: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._appended: List[str] = []
+
+    @property
+    def n_docs(self) -> int:
+        """Quantidade de documentos guardados."""
+        stored = 0 if self._offsets is None else self._offsets.size - 1
+        return stored + len(self._appended)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def __getitem__(self, i: int) -> str:
+        n = self.n_docs
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"Documento {i} fora do intervalo (0..{n - 1})")
+        stored = n - len(self._appended)
+        if i >= stored:
+            return self._appended[i - stored]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.n_docs):
+            yield self[i]
+
+    def fit(self, texts: Iterable[str]) -> None:
+        """Concatena os textos (consumidos em streaming) num buffer UTF-8 com offsets."""
+        buffer = bytearray()
+        offsets = [0]
+        for text in texts:
+            buffer += text.encode("utf-8")
+            offsets.append(len(buffer))
+        self._data = np.frombuffer(bytes(buffer), dtype=np.uint8)
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._appended = []
+
+    def append(self, texts: List[str]) -> int:
+        """Inclui textos depois dos existentes. Saída: o índice do primeiro."""
+        first = self.n_docs
+        self._appended.extend(texts)
+        return first
+
+    def save(self, path: str, corpus_sha1: str) -> None:
+        """Grava o buffer e os offsets (incluídos os textos do append) em `path`."""
+        if self._offsets is None:
+            raise RuntimeError("Chame fit(corpus) antes de save().")
+
+        data, offsets = self._data, self._offsets
+        if self._appended:
+            extra = [t.encode("utf-8") for t in self._appended]
+            data = np.concatenate([data, np.frombuffer(b"".join(extra), dtype=np.uint8)])
+            lengths = np.cumsum([len(b) for b in extra], dtype=np.int64)
+            offsets = np.concatenate([offsets, offsets[-1] + lengths])
+        with staging_dir(path) as tmp_path:
+            save_arrays(tmp_path, {"data": data, "offsets": offsets})
+            write_json(
+                os.path.join(tmp_path, META_FILE),
+                {"version": ARTIFACT_VERSION, "corpus_sha1": corpus_sha1, "n_docs": self.n_docs},
+            )
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[Dict[str, Any]]:
+        """Lê o meta.json de um artefato. Retorna None se não existir ou for inválido."""
+        return read_meta(path)
+
+    @classmethod
+    def load(
+        cls, path: str, corpus_sha1: Optional[str] = None, mmap: bool = True
+    ) -> "DocumentStore":
+        """
+        Carrega um store gravado por save(), com os arrays mapeados em memória.
+        Levanta FileNotFoundError se não existir e ValueError se estiver desatualizado.
+        """
+        check_meta(path, "de documentos", ARTIFACT_VERSION, corpus_sha1)
+        arrays = load_arrays(path, ARRAY_FILES, mmap=mmap)
+        store = cls()
+        store._data = arrays["data"]
+        store._offsets = arrays["offsets"]
+        return store
@@ -0,0 +1,21 @@
+# app/utils/hash_utils.py
+import hashlib
+
+
+def file_sha1(path: str, chunk_size: int = 1 << 20) -> str:
+    """Calcula o hash SHA1 do conteúdo de um arquivo, lendo em blocos."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza espaços em branco para que reenvios do mesmo texto tenham o mesmo hash."""
+    return " ".join(text.split())
+
+
+def text_sha1(text: str) -> str:
+    """Calcula o hash SHA1 do texto normalizado."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
@@ -0,0 +1,89 @@
+# app/utils/journal.py
+import fcntl
+import json
+import os
+from typing import Any, Dict, List
+
+
+class UpdateJournal:
+    """
+    Log append-only (JSONL) de alterações no corpus, compartilhado pelos workers:
+    cada gravação é um único write com lock exclusivo, e cada processo lê só as
+    linhas completas acrescentadas desde a sua última leitura. Como todos aplicam
+    as alterações na ordem do arquivo, os workers chegam ao mesmo estado.
+    Uso:
+        journal = UpdateJournal("data/index/updates.jsonl")
+        journal.append([{"op": "add", "text": "..."}])
+        journal.read_new()  # registros ainda não lidos por este processo
+        journal.truncate(journal.offset)  # depois de compactar (scripts/compact.py)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._inode = None
+
+    @property
+    def offset(self) -> int:
+        """Posição (em bytes) até onde este processo já leu o journal."""
+        return self._offset
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """Acrescenta os registros de uma vez e força a escrita em disco."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # truncate() pode ter trocado o arquivo enquanto o lock era esperado
+                if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                    continue
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view) :]
+                os.fsync(fd)
+                return
+            finally:
+                os.close(fd)
+
+    def truncate(self, offset: int) -> None:
+        """
+        Descarta os registros até `offset` (já incorporados numa versão compactada) e
+        mantém os gravados depois dele. O arquivo é trocado por um novo sob o lock das
+        gravações; os leitores percebem a troca e recomeçam do início do novo arquivo.
+        """
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(offset)
+            tail = f.read()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as out:
+                out.write(tail)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.path)
+        self._offset, self._inode = 0, None
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        """
+        Registros gravados desde a última leitura. Só um os.stat quando nada mudou;
+        se o arquivo foi trocado (truncate) ou encolheu, a leitura recomeça do início.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._inode, self._offset = st.st_ino, 0
+        if st.st_size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        complete = data.rfind(b"\n") + 1
+        self._offset += complete
+        return [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
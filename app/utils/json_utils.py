@@ -1,20 +1,23 @@
 # app/utils/json_utils.py
 import json
 import os
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 
-def load_pt_corpus_from_jsonl(path: str) -> List[str]:
-    """Carrega uma lista de textos a partir de um arquivo .jsonl com chave 'text'."""
-    texts: List[str] = []
+def iter_pt_corpus_from_jsonl(path: str) -> Iterator[str]:
+    """Gera os textos (sem alteração) de um arquivo .jsonl com chave 'text', em streaming."""
     with open(path, "r", encoding="utf-8") as f:
         for line in f:
             if line.strip():
                 obj = json.loads(line)
                 txt = obj.get("text")
                 if isinstance(txt, str) and txt.strip():
-                    texts.append(txt)
-    return texts
+                    yield txt
+
+
+def load_pt_corpus_from_jsonl(path: str) -> List[str]:
+    """Carrega uma lista de textos a partir de um arquivo .jsonl com chave 'text'."""
+    return list(iter_pt_corpus_from_jsonl(path))
 
 
 def iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
@@ -31,3 +34,21 @@ def iter_jsonl(path: str) -> Iterable[Dict[str, Any]]:
             if not text:
                 continue
             yield {"id": o.get("id"), "text": text}
+
+
+def read_json(path: str) -> Optional[Dict[str, Any]]:
+    """Lê um arquivo JSON. Retorna None se não existir ou for inválido."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_atomic(path: str, obj: Dict[str, Any]) -> None:
+    """Grava um JSON num arquivo temporário e o renomeia, para leitores nunca verem meia escrita."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,168 @@
+# app/utils/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Contador monotônico por combinação de labels (formato Prometheus)."""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histograma cumulativo por combinação de labels, com soma e contagem."""
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Registra uma observação; a série guarda [contagem por bucket..., +Inf, soma]."""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else int(sum(series[:-1]))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, n in zip((*self.buckets, "+Inf"), series[:-1]):
+                    cumulative += n
+                    le = _labels(self.label_names, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                names = _labels(self.label_names, labels)
+                lines.append(f"{self.name}_sum{names} {series[-1]}")
+                lines.append(f"{self.name}_count{names} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro das métricas do processo, exportadas em texto para o Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, doc: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, doc, labels))
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "plagiarism_stage_seconds", "Tempo gasto em cada etapa de uma comparação.", ("stage",)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "plagiarism_request_seconds", "Tempo total das requisições HTTP.", ("endpoint",)
+)
+REQUESTS = REGISTRY.counter(
+    "plagiarism_requests_total", "Requisições HTTP por endpoint e status.", ("endpoint", "status")
+)
+ERRORS = REGISTRY.counter(
+    "plagiarism_errors_total", "Falhas ao comparar textos, por tipo de erro.", ("endpoint", "error")
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Mede uma etapa: alimenta o histograma `plagiarism_stage_seconds` e, dentro de
+    uma requisição, soma a duração no Server-Timing dela. Etapas repetidas (ex.: uma
+    consulta por estratégia) acumulam.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def track_request() -> Iterator[Dict[str, float]]:
+    """
+    Abre o acumulador de etapas da requisição atual. O dict é compartilhado com as
+    tasks e threads (asyncio.to_thread) criadas dentro dela, que copiam o contexto.
+    """
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Monta o header Server-Timing (durações em ms) a partir das etapas medidas."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
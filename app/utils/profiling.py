@@ -0,0 +1,53 @@
+# app/utils/profiling.py
+import os
+import random
+import time
+from typing import Any, Optional
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # dependência opcional
+    Profiler = None
+
+
+class RequestProfiler:
+    """
+    Perfila por amostragem (pyinstrument, se instalado) uma fração `sample_rate`
+    das requisições e grava um HTML por requisição em `out_dir`.
+    Uso:
+        profiler = RequestProfiler(sample_rate=0.01, out_dir="data/profiles")
+        session = profiler.start()
+        ...  # requisição
+        profiler.stop(session, "compare")
+    """
+
+    def __init__(self, sample_rate: float, out_dir: str, interval: float = 0.001):
+        self.sample_rate = sample_rate
+        self.out_dir = out_dir
+        self.interval = interval
+        if sample_rate > 0 and Profiler is None:
+            print("pyinstrument não instalado: profiling de requisições desligado.", flush=True)
+            self.sample_rate = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self) -> Optional[Any]:
+        """Inicia uma sessão para esta requisição, se ela cair na amostra."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        session = Profiler(interval=self.interval, async_mode="enabled")
+        session.start()
+        return session
+
+    def stop(self, session: Optional[Any], name: str) -> Optional[str]:
+        """Encerra a sessão e grava o relatório. Saída: caminho do HTML (ou None)."""
+        if session is None:
+            return None
+        session.stop()
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"{int(time.time() * 1000)}-{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(session.output_html())
+        return path
@@ -0,0 +1,160 @@
+# benchmarks/corpus.py
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+ONSETS = [
+    "",
+    "b",
+    "c",
+    "d",
+    "f",
+    "g",
+    "j",
+    "l",
+    "m",
+    "n",
+    "p",
+    "r",
+    "s",
+    "t",
+    "v",
+    "ch",
+    "lh",
+    "nh",
+]
+NUCLEI = ["a", "e", "i", "o", "u", "ã", "é", "ê", "ó", "ão", "ei", "ou"]
+CODAS = ["", "", "", "s", "r", "l", "m", "n"]
+STOPWORDS = ["de", "a", "o", "que", "e", "do", "da", "em", "um", "para", "com", "não", "uma", "os"]
+RECENT_DOCS = 1000
+DUPLICATE_MUTATION = 0.1
+ZIPF_S = 1.0
+
+
+def make_vocabulary(size: int, seed: int = 42) -> List[str]:
+    """Palavras sintéticas com sílabas do português, sem repetição; as stopwords vêm primeiro."""
+    rng = random.Random(seed)
+    words = list(STOPWORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(
+            rng.choice(ONSETS) + rng.choice(NUCLEI) + rng.choice(CODAS)
+            for _ in range(rng.choice((1, 2, 2, 3, 3, 4)))
+        )
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class CorpusGenerator:
+    """
+    Gera redações "parecidas com português": palavras sorteadas por uma lei de Zipf
+    (as mais frequentes são stopwords), frases com pontuação e uma fração de
+    quase-duplicatas de documentos recentes, para que fingerprints e MinHash
+    tenham o que encontrar.
+    Uso:
+        gen = CorpusGenerator(seed=42)
+        gen.documents(1000)   # iterador de {"id", "text"}
+        gen.queries(textos, 200)
+    """
+
+    def __init__(
+        self,
+        vocabulary_size: int = 50_000,
+        words: Tuple[int, int] = (80, 400),
+        duplicate_rate: float = 0.05,
+        seed: int = 42,
+    ):
+        self.vocabulary = np.asarray(make_vocabulary(vocabulary_size, seed), dtype=object)
+        self.words = words
+        self.duplicate_rate = duplicate_rate
+        ranks = np.arange(1, vocabulary_size + 1, dtype=np.float64)
+        self._cdf = np.cumsum(ranks**-ZIPF_S)
+        self._cdf /= self._cdf[-1]
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+
+    def text(self, n_words: int) -> str:
+        """Um texto novo com `n_words` palavras em frases de 8 a 25 palavras."""
+        ranks = np.searchsorted(self._cdf, self._rng.random(n_words))
+        tokens = self.vocabulary[ranks].tolist()
+        sentences, pos = [], 0
+        while pos < n_words:
+            size = int(self._rng.integers(8, 26))
+            sentence = tokens[pos : pos + size]
+            sentences.append(sentence[0].capitalize() + " " + " ".join(sentence[1:]) + ".")
+            pos += size
+        return " ".join(sentences)
+
+    def mutate(self, text: str, rate: float) -> str:
+        """Troca uma fração `rate` das palavras por outras do vocabulário (paráfrase grosseira)."""
+        words = text.split()
+        swap = np.flatnonzero(self._rng.random(len(words)) < rate)
+        for i, rank in zip(swap, self._rng.integers(0, self.vocabulary.size, swap.size)):
+            words[i] = self.vocabulary[rank]
+        return " ".join(words)
+
+    def documents(self, n_docs: int) -> Iterator[Dict[str, Any]]:
+        """Gera `n_docs` documentos em streaming, sem guardar o corpus em memória."""
+        recent: List[str] = []
+        for i in range(n_docs):
+            if recent and self._rng.random() < self.duplicate_rate:
+                text = self.mutate(
+                    recent[int(self._rng.integers(0, len(recent)))], DUPLICATE_MUTATION
+                )
+            else:
+                text = self.text(int(self._rng.integers(self.words[0], self.words[1] + 1)))
+            recent.append(text)
+            if len(recent) > RECENT_DOCS:
+                recent.pop(0)
+            yield {"id": f"bench-{i}", "text": text}
+
+    def queries(self, texts: Any, n_queries: int) -> List[str]:
+        """
+        Consultas em três grupos iguais: trecho copiado de um documento, trecho
+        parafraseado (30% das palavras trocadas) e texto novo, sem origem no corpus.
+        """
+        out = []
+        for i in range(n_queries):
+            kind = i % 3
+            if kind == 2 or not len(texts):
+                out.append(self.text(int(self._rng.integers(60, 200))))
+                continue
+            words = texts[int(self._rng.integers(0, len(texts)))].split()
+            size = int(self._rng.integers(40, 160))
+            start = int(self._rng.integers(0, max(1, len(words) - size)))
+            excerpt = " ".join(words[start : start + size])
+            out.append(excerpt if kind == 0 else self.mutate(excerpt, 0.3))
+        return out
+
+
+def write_corpus(path: str, n_docs: int, seed: int = 42) -> int:
+    """Grava um corpus sintético em JSONL (mesmo formato de data/raw). Saída: bytes gravados."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for doc in CorpusGenerator(seed=seed).documents(n_docs):
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def main():
+    """Gera um corpus sintético em JSONL para os benchmarks."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="data/bench/corpus.jsonl")
+    args = parser.parse_args()
+
+    size = write_corpus(args.output, args.docs, args.seed)
+    print(f"[corpus] {args.docs} docs em {args.output} ({size / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
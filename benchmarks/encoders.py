@@ -0,0 +1,50 @@
+# benchmarks/encoders.py
+import re
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+from fastembed import SparseEmbedding
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class HashingEncoder:
+    """
+    Substituto determinístico do TextEmbedding para benchmarks sem baixar modelos:
+    bag-of-words com feature hashing (crc32) em `dim` posições, com sinal e
+    normalizado (L2). Não mede qualidade semântica, só o custo do resto do pipeline.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, dim: int = 384, **kwargs):
+        self.model_name = model_name
+        self.dim = dim
+
+    def embed(self, documents: Iterable[str], **kwargs) -> Iterator[np.ndarray]:
+        for text in documents:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for token in _tokens(text):
+                h = zlib.crc32(token.encode("utf-8"))
+                vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+            norm = np.linalg.norm(vec)
+            yield vec / norm if norm else vec
+
+
+class HashingSparseEncoder:
+    """Substituto do SparseTextEmbedding: contagem de termos com ids crc32 (31 bits)."""
+
+    def __init__(self, model_name: Optional[str] = None, **kwargs):
+        self.model_name = model_name
+
+    @staticmethod
+    def embed(documents: Iterable[str], **kwargs) -> Iterator[SparseEmbedding]:
+        for text in documents:
+            ids = np.asarray(
+                [zlib.crc32(t.encode("utf-8")) & 0x7FFFFFFF for t in _tokens(text)], dtype=np.int32
+            )
+            indices, counts = np.unique(ids, return_counts=True)
+            yield SparseEmbedding(values=counts.astype(np.float32), indices=indices)
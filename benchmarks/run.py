@@ -0,0 +1,407 @@
+# benchmarks/run.py
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+import numpy as np
+
+from app.ai.lexical.sharded import ShardedTextSimilarity
+from app.ai.lexical.tfidf import TextSimilarity
+from app.ai.semantic.indexer import Indexer, doc_id
+from app.ai.semantic.manifest import IndexManifest
+from app.config.config import Config
+from app.schema.compare import CompareMode, CompareRequest
+from app.services.compare_service import CompareService
+from app.utils.doc_store import DocumentStore
+from app.utils.hash_utils import file_sha1
+from app.utils.json_utils import iter_pt_corpus_from_jsonl
+from benchmarks.corpus import CorpusGenerator, write_corpus
+from benchmarks.encoders import HashingEncoder, HashingSparseEncoder
+from scripts.indexer import (
+    build_document_store,
+    build_fingerprint_index,
+    build_lexical_index,
+    build_minhash_index,
+    index_collections,
+)
+
+REPORT_VERSION = 1
+SIZES = {"k": 1_000, "m": 1_000_000}
+VECTOR_MODES = {CompareMode.semantic, CompareMode.hybrid, CompareMode.all}
+# hybrid (e all) calculam o vetor esparso da query com o modelo BM25 do fastembed
+SPARSE_MODEL_MODES = {CompareMode.hybrid, CompareMode.all}
+WARMUP_QUERIES = 5
+
+
+def parse_size(value: str) -> int:
+    """Converte tamanhos como "1k", "100k" ou "1m" em número de documentos."""
+    value = value.strip().lower()
+    if value[-1:] in SIZES:
+        return int(float(value[:-1]) * SIZES[value[-1]])
+    return int(value)
+
+
+def rss_mb() -> float:
+    """Memória residente atual do processo (MB); sem /proc, o pico."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (MB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def disk_mb(path: str) -> float:
+    """Tamanho em disco de um arquivo ou diretório (MB)."""
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 2**20
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 2**20
+
+
+@contextmanager
+def timed(report: Dict[str, Any], name: str) -> Iterator[Dict[str, Any]]:
+    """Mede tempo e variação de memória residente de uma etapa e guarda em `report[name]`."""
+    stage: Dict[str, Any] = {}
+    rss0, t0 = rss_mb(), time.perf_counter()
+    yield stage
+    stage.update(
+        seconds=round(time.perf_counter() - t0, 4),
+        rss_delta_mb=round(rss_mb() - rss0, 1),
+        peak_rss_mb=round(peak_rss_mb(), 1),
+    )
+    report[name] = stage
+    print(f"[build] {name}: {stage['seconds']:.2f}s rss_delta={stage['rss_delta_mb']}MB")
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Resumo das latências (em segundos) em milissegundos: média, p50, p95, p99 e máximo."""
+    if not latencies:
+        return {"n": 0}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def bench_config(run_dir: str, corpus_path: str, backend: str, encoder: str) -> Config:
+    """Config com todos os artefatos dentro de `run_dir` e sem caches de resposta/embedding."""
+    cfg = Config()
+    cfg.data_path = corpus_path
+    cfg.vector_backend = backend
+    cfg.qdrant_local_path = os.path.join(run_dir, "qdrant")
+    cfg.document_store_path = os.path.join(run_dir, "index", "documents")
+    cfg.lexical_index_path = os.path.join(run_dir, "index", "lexical")
+    cfg.fingerprint_index_path = os.path.join(run_dir, "index", "fingerprint")
+    cfg.minhash_index_path = os.path.join(run_dir, "index", "minhash")
+    cfg.embedding_store_path = os.path.join(run_dir, "index", "embeddings")
+    cfg.manifest_path = os.path.join(run_dir, "index", "manifest.json")
+    cfg.index_version_path = os.path.join(run_dir, "index", "version.json")
+    cfg.update_journal_path = os.path.join(run_dir, "index", "updates.jsonl")
+    cfg.response_cache_size = 0
+    cfg.embedding_cache_size = 0
+    if backend == "remote":
+        cfg.qdrant_collection_hybrid = f"bench_{cfg.qdrant_collection_hybrid}"
+        cfg.qdrant_collection_passages = f"bench_{cfg.qdrant_collection_passages}"
+    if encoder == "hashing":
+        # nomes próprios para o store de embeddings não misturar vetores dos modelos reais
+        cfg.model_dense_name = "benchmarks/hashing-384"
+        cfg.model_sparse_name = "benchmarks/hashing-sparse"
+    return cfg
+
+
+def build_lexical(cfg: Config, corpus_sha1: str, report: Dict[str, Any]) -> DocumentStore:
+    """
+    Monta o store de documentos e os índices léxicos com os builders do
+    scripts/indexer.py (o que o indexador grava) e mede cada etapa.
+    Saída: o store recarregado (mmap).
+    """
+    ids = [doc_id(text.strip()) for text in iter_pt_corpus_from_jsonl(cfg.data_path)]
+    with timed(report, "documents_fit") as stage:
+        build_document_store(cfg, ids, corpus_sha1)
+        stage["disk_mb"] = round(disk_mb(cfg.document_store_path), 1)
+    with timed(report, "documents_load"):
+        store = DocumentStore.load(cfg.document_store_path, corpus_sha1=corpus_sha1)
+
+    # o fit inclui gravar o artefato, como no indexador
+    with timed(report, "tfidf_fit") as stage:
+        build_lexical_index(cfg, store, ids, corpus_sha1)
+        stage["disk_mb"] = round(disk_mb(cfg.lexical_index_path), 1)
+    lexical = ShardedTextSimilarity if cfg.lexical_shards > 1 else TextSimilarity
+    with timed(report, "tfidf_load"):
+        lexical.load(cfg.lexical_index_path, corpus_sha1=corpus_sha1)
+
+    with timed(report, "fingerprint_fit") as stage:
+        build_fingerprint_index(cfg, store, ids, corpus_sha1)
+        stage["disk_mb"] = round(disk_mb(cfg.fingerprint_index_path), 1)
+
+    if cfg.lsh_enabled:
+        with timed(report, "minhash_fit") as stage:
+            build_minhash_index(cfg, store, ids, corpus_sha1)
+            stage["disk_mb"] = round(disk_mb(cfg.minhash_index_path), 1)
+    return store
+
+
+def build_vectors(cfg: Config, encoder: str, report: Dict[str, Any]) -> None:
+    """Indexa as duas coleções com o pipeline do scripts/indexer.py, do zero."""
+    idx = Indexer(cfg)
+    if encoder == "hashing":
+        idx._dense_encoder = HashingEncoder(cfg.model_dense_name)
+        idx._sparse_encoder = HashingSparseEncoder(cfg.model_sparse_name)
+    for name in (cfg.qdrant_collection_hybrid, cfg.qdrant_collection_passages):
+        if idx.client.collection_exists(name):
+            idx.client.delete_collection(name)
+    idx.ensure_collection_hybrid(cfg.qdrant_collection_hybrid, idx.dense_dim())
+    idx.ensure_collection_passages(cfg.qdrant_collection_passages, idx.dense_dim())
+
+    with timed(report, "vectors_index") as stage:
+        index_collections(cfg, idx, IndexManifest.load(cfg.manifest_path))
+        stage["points"] = {
+            "hybrid": idx.count(cfg.qdrant_collection_hybrid),
+            "passages": idx.count(cfg.qdrant_collection_passages),
+        }
+    # no modo local o storage aceita um único cliente: libera para o serviço
+    idx.client.close()
+
+
+def make_service(cfg: Config, encoder: str, report: Dict[str, Any]) -> CompareService:
+    """Sobe o CompareService sobre os artefatos gravados (mede o startup da API)."""
+    with timed(report, "service_startup"):
+        if encoder == "hashing":
+            with mock.patch("app.ai.semantic.retriever.TextEmbedding", HashingEncoder):
+                return CompareService(cfg)
+        return CompareService(cfg)
+
+
+async def measure_mode(
+    svc: CompareService, queries: List[str], mode: CompareMode, top_k: int, concurrency: int
+) -> Dict[str, Any]:
+    """
+    Latência sequencial (uma consulta por vez) e vazão com `concurrency` consultas
+    simultâneas no mesmo event loop, como numa instância da API.
+    """
+    for q in queries[:WARMUP_QUERIES]:
+        await svc.acompare(q, mode, top_k, include_text=False)
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        await svc.acompare(q, mode, top_k, include_text=False)
+        latencies.append(time.perf_counter() - t0)
+
+    sem = asyncio.Semaphore(concurrency)
+    concurrent: List[float] = []
+
+    async def one(q: str) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await svc.acompare(q, mode, top_k, include_text=False)
+            concurrent.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - t0
+    return {
+        "sequential": summarize(latencies),
+        "concurrent": {
+            **summarize(concurrent),
+            "concurrency": concurrency,
+            "qps": round(len(queries) / wall, 2) if wall else None,
+        },
+    }
+
+
+def load_replay(path: str) -> List[CompareRequest]:
+    """Lê um log de requisições em JSONL (um corpo de POST /compare por linha)."""
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                requests.append(CompareRequest.model_validate_json(line))
+    return requests
+
+
+async def replay(svc: CompareService, requests: List[CompareRequest]) -> Dict[str, Any]:
+    """Reexecuta o log na ordem gravada, o mais rápido possível; latências agrupadas por mode."""
+    by_mode: Dict[str, List[float]] = {}
+    t0 = time.perf_counter()
+    for r in requests:
+        t = time.perf_counter()
+        await svc.acompare(r.text, r.mode, r.top_k, r.include_text, r.snippet_chars)
+        by_mode.setdefault(r.mode.value, []).append(time.perf_counter() - t)
+    wall = time.perf_counter() - t0
+    return {
+        "requests": len(requests),
+        "qps": round(len(requests) / wall, 2) if wall else None,
+        "modes": {mode: summarize(lat) for mode, lat in by_mode.items()},
+    }
+
+
+def unavailable(mode: CompareMode, encoder: str, vectors: bool) -> Optional[str]:
+    """Motivo para não medir `mode` nesta execução, ou None se ele pode rodar."""
+    if mode in VECTOR_MODES and not vectors:
+        return "coleções vetoriais não foram montadas"
+    if mode in SPARSE_MODEL_MODES and encoder == "hashing":
+        return "precisa do modelo esparso (--encoder fastembed)"
+    return None
+
+
+def select_modes(names: List[str], encoder: str, vectors: bool) -> List[CompareMode]:
+    """Modes medidos: sem coleções não há busca vetorial; o encoder de hashing não faz hybrid."""
+    modes = []
+    for mode in map(CompareMode, names):
+        reason = unavailable(mode, encoder, vectors)
+        if reason:
+            print(f"[query] {mode.value} ignorado: {reason}")
+        else:
+            modes.append(mode)
+    return modes
+
+
+def compare_reports(baseline: Dict[str, Any], report: Dict[str, Any]) -> None:
+    """Imprime a razão atual/baseline das etapas de build e do p95 de cada mode."""
+    print("\nmétrica                           baseline      atual   razão")
+    rows = [
+        (
+            f"build.{name}.seconds",
+            stage.get("seconds"),
+            report["build"].get(name, {}).get("seconds"),
+        )
+        for name, stage in baseline.get("build", {}).items()
+    ]
+    rows += [
+        (
+            f"query.{mode}.p95_ms",
+            res["sequential"].get("p95_ms"),
+            report["queries"].get(mode, {}).get("sequential", {}).get("p95_ms"),
+        )
+        for mode, res in baseline.get("queries", {}).items()
+    ]
+    for name, old, new in rows:
+        if old and new is not None:
+            print(f"{name:32s} {old:10.3f} {new:10.3f} {new / old:7.2f}x")
+
+
+def git_commit() -> Optional[str]:
+    """Commit atual do repositório, para identificar o relatório."""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--docs", type=parse_size, default="1k", help="ex.: 1k, 100k, 1m")
+    parser.add_argument("--corpus", help="JSONL existente (senão, gera um sintético)")
+    parser.add_argument("--workdir", default="data/bench")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=[m.value for m in CompareMode],
+        choices=[m.value for m in CompareMode],
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend", choices=["local", "remote"], default="local")
+    parser.add_argument("--encoder", choices=["hashing", "fastembed"], default="hashing")
+    parser.add_argument("--skip-vectors", action="store_true", help="só os índices léxicos")
+    parser.add_argument("--lsh", action="store_true", help="liga o pré-filtro MinHash-LSH")
+    parser.add_argument("--lexical-shards", type=int, default=1, help="faixas do TF-IDF")
+    parser.add_argument("--replay", help="log JSONL de requisições POST /compare")
+    parser.add_argument("--baseline", help="relatório JSON anterior para comparar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON com o relatório")
+    return parser.parse_args()
+
+
+def main():
+    """Benchmark de build dos índices e de latência/vazão por CompareMode."""
+    args = parse_args()
+    report: Dict[str, Any] = {
+        "version": REPORT_VERSION,
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in {"output", "baseline"}},
+        "build": {},
+        "queries": {},
+    }
+
+    corpus_path = args.corpus or os.path.join(args.workdir, f"corpus-{args.docs}-{args.seed}.jsonl")
+    if not os.path.exists(corpus_path):
+        with timed(report["build"], "corpus_generate"):
+            write_corpus(corpus_path, args.docs, args.seed)
+    run_dir = os.path.join(args.workdir, "run")
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+    cfg = bench_config(run_dir, corpus_path, args.backend, args.encoder)
+    cfg.lsh_enabled = args.lsh
+    cfg.lexical_shards = args.lexical_shards
+    corpus_sha1 = file_sha1(corpus_path)
+    store = build_lexical(cfg, corpus_sha1, report["build"])
+    report["corpus"] = {
+        "path": corpus_path,
+        "docs": len(store),
+        "sha1": corpus_sha1,
+        "mb": round(disk_mb(corpus_path), 1),
+    }
+    if not args.skip_vectors:
+        build_vectors(cfg, args.encoder, report["build"])
+
+    svc = make_service(cfg, args.encoder, report["build"])
+    queries = CorpusGenerator(seed=args.seed + 1).queries(store, args.queries)
+    for mode in select_modes(args.modes, args.encoder, not args.skip_vectors):
+        result = asyncio.run(measure_mode(svc, queries, mode, args.top_k, args.concurrency))
+        report["queries"][mode.value] = result
+        seq, conc = result["sequential"], result["concurrent"]
+        print(
+            f"[query] {mode.value:11s} p50={seq['p50_ms']:.2f}ms p95={seq['p95_ms']:.2f}ms "
+            f"p99={seq['p99_ms']:.2f}ms qps(c={args.concurrency})={conc['qps']}"
+        )
+    if args.replay:
+        requests = load_replay(args.replay)
+        runnable = [
+            r for r in requests if not unavailable(r.mode, args.encoder, not args.skip_vectors)
+        ]
+        report["replay"] = asyncio.run(replay(svc, runnable))
+        report["replay"]["skipped"] = len(requests) - len(runnable)
+        print(f"[replay] {report['replay']['requests']} requisições qps={report['replay']['qps']}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[report] gravado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import json
+import time
+
+from app.ai.semantic.indexer import Indexer
+from app.config.config import Config
+from app.services.cohort import CohortSimilarity
+from app.utils.json_utils import iter_jsonl
+
+
+def main():
+    """
+    Pares de redações parecidas dentro de uma turma (todos contra todos), gravados em
+    JSONL à medida que saem dos blocos: {"a", "b", "lexical", "semantic"}.
+    A entrada é um JSONL com "text" e, opcionalmente, "id" por linha.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("input", help="JSONL com as redações da turma")
+    parser.add_argument("--output", required=True, help="JSONL com os pares encontrados")
+    parser.add_argument("--lexical-threshold", type=float, default=0.5)
+    parser.add_argument(
+        "--semantic-threshold", type=float, default=None, help="liga a similaridade semântica"
+    )
+    parser.add_argument("--no-lexical", action="store_true", help="desliga o TF-IDF")
+    parser.add_argument("--block-size", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = Config()
+    if args.block_size:
+        cfg.cohort_block_size = args.block_size
+    rows = list(iter_jsonl(args.input))
+    texts = [r["text"] for r in rows]
+    ids = [r["id"] if r["id"] is not None else i for i, r in enumerate(rows)]
+
+    # embeddings das passagens saem do cache em disco do indexador quando já calculados
+    idx = Indexer(cfg) if args.semantic_threshold is not None else None
+    cohort = CohortSimilarity(
+        cfg,
+        encode=lambda batch: idx.embed_dense(batch, batch_size=cfg.embed_batch_size),
+    )
+
+    t0 = time.perf_counter()
+    n_pairs = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for pair in cohort.pairs(
+            texts,
+            lexical_threshold=None if args.no_lexical else args.lexical_threshold,
+            semantic_threshold=args.semantic_threshold,
+            ids=ids,
+        ):
+            f.write(json.dumps(pair, ensure_ascii=False) + "\n")
+            n_pairs += 1
+    print(
+        f"[cohort] redações={len(texts)} pares={n_pairs} "
+        f"tempo={time.perf_counter() - t0:.1f}s -> {args.output}",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
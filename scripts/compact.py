@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from qdrant_client import models
+
+from app.ai.semantic.indexer import Indexer, doc_id
+from app.ai.semantic.manifest import IndexManifest
+from app.config.config import Config
+from app.services.compare_service import CorpusIndexes
+from app.services.snapshots import (
+    COMPACTED_VERSION,
+    collections_version,
+    read_published,
+    resolve_snapshot,
+    snapshot_config,
+)
+from app.utils.doc_store import DocumentStore
+from app.utils.hash_utils import file_sha1
+from app.utils.json_utils import iter_pt_corpus_from_jsonl
+from scripts.indexer import (
+    build_document_store,
+    build_fingerprint_index,
+    build_lexical_index,
+    build_minhash_index,
+    prune_versions,
+    publish_version,
+)
+
+
+def drop_deleted_points(cfg: Config, idx: Indexer, ids: List[str]) -> None:
+    """
+    Apaga das coleções da versão os documentos removidos pela API e as passagens deles.
+    O manifesto dessas coleções deixa de bater com a contagem do Qdrant e é ignorado
+    na próxima indexação.
+    """
+    if not ids:
+        return
+    idx.delete(cfg.qdrant_collection_hybrid, ids)
+    idx.client.delete(
+        collection_name=cfg.qdrant_collection_passages,
+        points_selector=models.FilterSelector(
+            filter=models.Filter(
+                must=[models.FieldCondition(key="parent_id", match=models.MatchAny(any=ids))]
+            )
+        ),
+    )
+    print(f"[compact] {len(ids)} documentos removidos das coleções")
+
+
+def write_back_corpus(path: str, deleted: Set[str], added: List[Dict[str, str]]) -> None:
+    """
+    Incorpora as alterações no JSONL do corpus, fonte do indexador: tira as linhas dos
+    documentos removidos e acrescenta as inclusões que ainda não estão nele (ex.: numa
+    compactação interrompida). As demais linhas ficam como estão; o arquivo novo é
+    gravado ao lado e renomeado.
+    """
+    pending = {d["id"]: d for d in added}
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(path, "r", encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+        for line in f:
+            try:
+                text = (json.loads(line).get("text") or "").strip()
+            except ValueError:
+                text = ""
+            _id = doc_id(text) if text else None
+            if _id in deleted:
+                continue
+            pending.pop(_id, None)
+            out.write(line if line.endswith("\n") else line + "\n")
+        out.writelines(json.dumps(d, ensure_ascii=False) + "\n" for d in pending.values())
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    print(f"[compact] {path}: {len(pending)} incluídos, {len(deleted)} removidos")
+
+
+def compact(cfg: Config, idx: Indexer, force: bool = False) -> Optional[str]:
+    """
+    Incorpora o journal da versão publicada numa nova versão, uma vez só para todos os
+    workers. As alterações são gravadas no JSONL do corpus (a próxima execução do
+    indexador parte dele e as mantém) e documentos, TF-IDF (termos novos passam a
+    contar), fingerprints e MinHash são retreinados a partir dele. A nova versão usa as
+    coleções do Qdrant da de origem (os removidos são apagados delas) e o corpus dela,
+    então os registros do journal continuam valendo; os workers a carregam pelo
+    SnapshotManager e só então o journal é truncado, mantendo o que foi gravado durante
+    a compactação.
+    Saída: a versão publicada, ou None se o journal tem menos de `lexical_compact_docs`
+    alterações (sem `force`).
+    """
+    published = read_published(cfg)
+    vcfg, corpus_sha1 = resolve_snapshot(cfg, published)
+    if vcfg is cfg:
+        raise RuntimeError("A compactação exige uma versão publicada pelo indexador.")
+
+    indexes = CorpusIndexes(vcfg, corpus_sha1)
+    tfidf = indexes.tfidf
+    changes = tfidf.n_delta + tfidf.n_deleted
+    if not changes or (changes < cfg.lexical_compact_docs and not force):
+        print(f"[compact] {changes} alterações no journal, nada a compactar")
+        return None
+
+    version = COMPACTED_VERSION.format(
+        version=collections_version(published["version"]), stamp=int(time.time())
+    )
+    ncfg = snapshot_config(cfg, version)
+    n_base = len(indexes.texts) - tfidf.n_delta
+    deleted = {_id for _id, i in indexes.parent_index.items() if tfidf.is_deleted(i)}
+    added = [
+        {"id": _id, "text": indexes.texts[i]}
+        for _id, i in sorted(indexes.parent_index.items(), key=lambda item: item[1])
+        if i >= n_base and not tfidf.is_deleted(i)
+    ]
+    print(f"[compact] versão {version}: {len(added)} incluídos, {len(deleted)} removidos")
+    write_back_corpus(cfg.data_path, deleted, added)
+
+    # os demais artefatos leem o corpus do store novo, mapeado em memória
+    ids = [doc_id(text.strip()) for text in iter_pt_corpus_from_jsonl(cfg.data_path)]
+    build_document_store(ncfg, ids, indexes.corpus_sha1)
+    texts = DocumentStore.load(ncfg.document_store_path, corpus_sha1=indexes.corpus_sha1)
+    build_lexical_index(ncfg, texts, ids, indexes.corpus_sha1)
+    build_fingerprint_index(ncfg, texts, ids, indexes.corpus_sha1)
+    if cfg.lsh_enabled:
+        build_minhash_index(ncfg, texts, ids, indexes.corpus_sha1)
+
+    drop_deleted_points(vcfg, idx, sorted(deleted))
+    publish_version(cfg, idx, version, indexes.corpus_sha1, data_sha1=file_sha1(cfg.data_path))
+    indexes.journal.truncate(indexes.journal.offset)
+    prune_versions(cfg, idx, IndexManifest.load(cfg.manifest_path))
+    return version
+
+
+def main():
+    """
+    Compacta as inclusões e remoções feitas pela API (journal) numa nova versão do
+    corpus. Rode periodicamente (ex.: cron), num único processo.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--force", action="store_true", help="compacta mesmo abaixo de lexical_compact_docs"
+    )
+    args = parser.parse_args()
+
+    cfg = Config()
+    compact(cfg, Indexer(cfg), force=args.force)
+
+
+if __name__ == "__main__":
+    main()
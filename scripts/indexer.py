@@ -1,61 +1,407 @@
+import os
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from qdrant_client import models
+
+from app.ai.lexical.fingerprint import FingerprintIndex
+from app.ai.lexical.minhash import MinHashLSH
+from app.ai.lexical.sharded import ShardedTextSimilarity
+from app.ai.lexical.tfidf import TextSimilarity
 from app.ai.semantic.indexer import Indexer
+from app.ai.semantic.manifest import IndexManifest
 from app.config.config import Config
+from app.services.snapshots import (
+    COLLECTION_VERSION,
+    collections_version,
+    read_published,
+    snapshot_config,
+    version_dir,
+)
+from app.utils.doc_store import DocumentStore
+from app.utils.hash_utils import file_sha1
+from app.utils.json_utils import iter_pt_corpus_from_jsonl, write_json_atomic
 
 
-def main():
-    """Orquestra a criação/validação das coleções e a indexação do corpus."""
-    cfg = Config()
-    idx = Indexer(cfg)
+def build_document_store(cfg: Config, ids: List[str], corpus_sha1: str) -> None:
+    """Grava os textos do corpus no store de documentos (mmap), se estiver desatualizado."""
+    meta = DocumentStore.read_meta(cfg.document_store_path) or {}
+    if meta.get("corpus_sha1") == corpus_sha1 and meta.get("n_docs") == len(ids):
+        print(f"[documents] artefato atualizado em {cfg.document_store_path}")
+        return
+
+    store = DocumentStore()
+    store.fit(iter_pt_corpus_from_jsonl(cfg.data_path))
+    store.save(cfg.document_store_path, corpus_sha1=corpus_sha1)
+    print(f"[documents] artefato gravado em {cfg.document_store_path} docs={store.n_docs}")
+
+
+def build_lexical_index(
+    cfg: Config, texts: Sequence[str], ids: List[str], corpus_sha1: str
+) -> None:
+    """
+    Treina o TF-IDF e grava o artefato em disco, se o existente estiver desatualizado
+    ou particionado com outra quantidade de faixas (`lexical_shards`).
+    """
+    meta = TextSimilarity.read_meta(cfg.lexical_index_path) or {}
+    shards = cfg.lexical_shards if cfg.lexical_shards > 1 else None
+    if (
+        meta.get("corpus_sha1") == corpus_sha1
+        and meta.get("n_docs") == len(ids)
+        and meta.get("n_shards") == shards
+    ):
+        print(f"[lexical] artefato atualizado em {cfg.lexical_index_path}")
+        return
+
+    ts = ShardedTextSimilarity(n_shards=shards) if shards else TextSimilarity()
+    ts.fit(texts)
+    ts.save(cfg.lexical_index_path, corpus_sha1=corpus_sha1, doc_ids=ids)
+    print(f"[lexical] artefato gravado em {cfg.lexical_index_path} docs={ts.n_docs}")
+
+
+def build_fingerprint_index(
+    cfg: Config, texts: Sequence[str], ids: List[str], corpus_sha1: str
+) -> None:
+    """Monta o índice de fingerprints (winnowing) e grava em disco, se estiver desatualizado."""
+    meta = FingerprintIndex.read_meta(cfg.fingerprint_index_path) or {}
+    if (
+        meta.get("corpus_sha1") == corpus_sha1
+        and meta.get("n_docs") == len(ids)
+        and (meta.get("k"), meta.get("window")) == (cfg.fingerprint_k, cfg.fingerprint_window)
+    ):
+        print(f"[fingerprint] artefato atualizado em {cfg.fingerprint_index_path}")
+        return
+
+    fp = FingerprintIndex(k=cfg.fingerprint_k, window=cfg.fingerprint_window)
+    fp.fit(texts)
+    fp.save(cfg.fingerprint_index_path, corpus_sha1=corpus_sha1)
+    print(f"[fingerprint] artefato gravado em {cfg.fingerprint_index_path} docs={fp.n_docs}")
+
+
+def build_minhash_index(
+    cfg: Config, texts: Sequence[str], ids: List[str], corpus_sha1: str
+) -> None:
+    """Calcula as assinaturas MinHash e os buckets LSH e grava em disco, se desatualizados."""
+    meta = MinHashLSH.read_meta(cfg.minhash_index_path) or {}
+    if (
+        meta.get("corpus_sha1") == corpus_sha1
+        and meta.get("n_docs") == len(ids)
+        and (meta.get("bands"), meta.get("rows")) == (cfg.minhash_bands, cfg.minhash_rows)
+    ):
+        print(f"[minhash] artefato atualizado em {cfg.minhash_index_path}")
+        return
+
+    lsh = MinHashLSH(bands=cfg.minhash_bands, rows=cfg.minhash_rows)
+    lsh.fit(texts)
+    lsh.save(cfg.minhash_index_path, corpus_sha1=corpus_sha1)
+    print(f"[minhash] artefato gravado em {cfg.minhash_index_path} docs={lsh.n_docs}")
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa as linhas do JSONL em lotes de tamanho fixo, sem materializar o arquivo."""
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def collections(cfg: Config) -> Dict[str, str]:
+    """Coleções alimentadas pelo indexador, por rótulo."""
+    return {"hybrid": cfg.qdrant_collection_hybrid, "passages": cfg.qdrant_collection_passages}
+
+
+def existing_hashes(
+    idx: Indexer, collection: str, ids: List[str], known: Optional[Dict[str, str]]
+) -> Dict[str, str]:
+    """Hashes já indexados: do manifesto local quando confiável, senão do Qdrant."""
+    if known is None:
+        return idx.fetch_existing_hashes(collection, ids)
+    return {i: known[i] for i in ids if i in known}
+
+
+def prepare_batch(
+    cfg: Config,
+    idx: Indexer,
+    rows: List[Dict[str, Any]],
+    known: Dict[str, Optional[Dict[str, str]]],
+) -> Dict[str, Any]:
+    """
+    Calcula ids e hashes de um lote, compara com o que já está indexado e embeda
+    só o que mudou. Os textos dos documentos e das passagens vão num único lote
+    ao modelo denso, então cada texto é embedado uma vez.
+    """
+    names = collections(cfg)
+    docs = []
+    for d in rows:
+        docs.append(
+            {"id": idx.stable_id(d), "text": d["text"], "content_sha1": idx.content_sha1(d["text"])}
+        )
+    existing = existing_hashes(idx, names["hybrid"], [d["id"] for d in docs], known["hybrid"])
+    docs_up = [d for d in docs if existing.get(d["id"]) != d["content_sha1"]]
+
+    passages = idx.build_passages(docs)
+    existing_p = existing_hashes(
+        idx, names["passages"], [p["id"] for p in passages], known["passages"]
+    )
+    passages_up = [p for p in passages if existing_p.get(p["id"]) != p["content_sha1"]]
+
+    dense = idx.embed_dense(
+        [d["text"] for d in docs_up] + [p["text"] for p in passages_up],
+        batch_size=cfg.embed_batch_size,
+        parallel=cfg.embed_workers,
+    )
+    sparse = idx.embed_sparse(
+        [d["text"] for d in docs_up], batch_size=cfg.embed_batch_size, parallel=cfg.embed_workers
+    )
+    return {
+        "ids": [d["id"] for d in docs],
+        "seen": {
+            "hybrid": {d["id"]: d["content_sha1"] for d in docs},
+            "passages": {p["id"]: p["content_sha1"] for p in passages},
+        },
+        "hybrid": (
+            idx.build_vectors_hybrid(dense[: len(docs_up)], sparse),
+            idx.build_payloads(docs_up),
+            [d["id"] for d in docs_up],
+        ),
+        "passages": (
+            idx.build_vectors_dense(dense[len(docs_up) :]),
+            idx.build_passage_payloads(passages_up),
+            [p["id"] for p in passages_up],
+        ),
+    }
+
+
+def upload_batch(cfg: Config, idx: Indexer, prepared: Dict[str, Any]) -> None:
+    """Envia os vetores de um lote já embedado às duas coleções."""
+    for key, collection in collections(cfg).items():
+        vectors, payloads, ids = prepared[key]
+        if ids:
+            idx.upsert(collection, vectors, payloads, ids, parallel=1)
+
+
+def remove_missing(
+    idx: Indexer, collection: str, seen: Dict[str, str], known: Optional[Dict[str, str]]
+) -> int:
+    """
+    Remove os pontos cujas linhas sumiram do JSONL. Sem manifesto confiável, os ids
+    existentes vêm de um scroll na coleção (sem payload nem vetores).
+    """
+    previous = known if known is not None else idx.iter_point_ids(collection)
+    stale = [i for i in previous if i not in seen]
+    if stale:
+        idx.delete(collection, stale)
+    return len(stale)
+
+
+def index_collections(cfg: Config, idx: Indexer, manifest: IndexManifest) -> List[str]:
+    """
+    Pipeline em streaming: lê, faz o hash, compara e embeda um lote enquanto o lote
+    anterior é enviado ao Qdrant numa thread. No máximo dois lotes ficam em memória.
+    A comparação usa o manifesto local quando a contagem da coleção bate com ele
+    (coleção vazia, como a de uma versão nova, dispensa a comparação).
+    Saída: ids de todos os documentos, na ordem do JSONL.
+    """
+    names = collections(cfg)
+    counts = {key: idx.count(name) for key, name in names.items()}
+    known = {
+        key: manifest.points(name, counts[key]) if counts[key] else {}
+        for key, name in names.items()
+    }
+    for key, points in known.items():
+        print(f"[{key}] manifesto={'ok' if points is not None else 'verificando no Qdrant'}")
+
+    ids: List[str] = []
+    seen: Dict[str, Dict[str, str]] = {key: {} for key in names}
+    upserted = dict.fromkeys(names, 0)
+    pending: Optional[Future] = None
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        for rows in iter_batches(idx.iter_jsonl(cfg.data_path), cfg.index_batch_size):
+            prepared = prepare_batch(cfg, idx, rows, known)
+            ids.extend(prepared["ids"])
+            for key in names:
+                seen[key].update(prepared["seen"][key])
+                upserted[key] += len(prepared[key][2])
+
+            if pending is not None:
+                pending.result()
+            pending = uploader.submit(upload_batch, cfg, idx, prepared)
+            print(f"[stream] docs={len(ids)}", flush=True)
+        if pending is not None:
+            pending.result()
+
+    for key, name in names.items():
+        removed = (
+            remove_missing(idx, name, seen[key], known[key]) if cfg.delete_missing and ids else 0
+        )
+        total = idx.count(name)
+        manifest.update(name, seen[key], count=total)
+        print(
+            f"[{key}] sem_mudanca={len(seen[key]) - upserted[key]} upsert={upserted[key]} "
+            f"removidos={removed} total={total}"
+        )
+    manifest.save()
+    print(
+        f"[embeddings] cache={idx.embed_stats['cached']} calculados={idx.embed_stats['computed']}"
+    )
+    return ids
+
+
+def next_version(cfg: Config, data_sha1: str) -> Tuple[str, str]:
+    """
+    Versão a indexar e o sha1 que identifica o corpus dela (artefatos e journal): a
+    publicada, se reflete o mesmo JSONL (atualizada no lugar), ou uma nova, com
+    coleções e artefatos próprios ao lado dos da versão em uso. Uma versão compactada
+    reflete o JSONL regravado pela compactação e mantém o corpus da de origem, para o
+    journal continuar valendo.
+    """
+    published = read_published(cfg)
+    version = published.get("version")
+    if (
+        version
+        and published.get("data_sha1", published.get("corpus_sha1")) == data_sha1
+        and os.path.isdir(version_dir(cfg, version))
+    ):
+        return version, published["corpus_sha1"]
+    return f"{data_sha1[:12]}-{int(time.time())}", data_sha1
+
+
+def switch_aliases(idx: Indexer, targets: Dict[str, str]) -> None:
+    """
+    Aponta cada alias (nome público) para a coleção indicada, todos numa única
+    operação atômica do Qdrant. Uma coleção real com o nome do alias (layout
+    antigo, sem versões) é apagada antes.
+    """
+    aliases = {a.alias_name for a in idx.client.get_aliases().aliases}
+    ops: List[Any] = []
+    for alias, collection in targets.items():
+        if alias in aliases:
+            ops.append(
+                models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias))
+            )
+        elif idx.collection_exists(alias):
+            print(f"Coleção {alias} substituída pelo alias de {collection}", flush=True)
+            idx.client.delete_collection(alias)
+        ops.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)
+            )
+        )
+    idx.client.update_collection_aliases(change_aliases_operations=ops)
+
+
+def drop_collection(idx: Indexer, name: str) -> None:
+    """Apaga a coleção, se existir."""
+    if idx.collection_exists(name):
+        idx.client.delete_collection(name)
+        print(f"Coleção apagada: {name}", flush=True)
+
+
+def publish_version(
+    cfg: Config, idx: Indexer, version: str, corpus_sha1: str, data_sha1: Optional[str] = None
+) -> None:
+    """
+    Aponta os aliases das coleções (os nomes de `cfg`) para as da versão e publica a
+    versão; a API a carrega em segundo plano e troca sem reiniciar (ver SnapshotManager).
+    O registro guarda o sha1 do JSONL que a versão reflete (`data_sha1`, o próprio corpus
+    se omitido) e as versões anteriores, da mais nova para a mais velha.
+    """
+    vcfg = snapshot_config(cfg, version)
+    switch_aliases(idx, {collections(cfg)[key]: name for key, name in collections(vcfg).items()})
+
+    published = read_published(cfg)
+    history = [v for v in [published.get("version"), *published.get("history", [])] if v]
+    write_json_atomic(
+        cfg.index_version_path,
+        {
+            "version": version,
+            "corpus_sha1": corpus_sha1,
+            "data_sha1": data_sha1 or corpus_sha1,
+            "collections": collections(vcfg),
+            "history": [v for v in dict.fromkeys(history) if v != version],
+        },
+    )
+    print(f"[version] publicada {version}")
+
+
+def prune_versions(cfg: Config, idx: Indexer, manifest: IndexManifest) -> None:
+    """
+    Apaga coleções e artefatos das versões além das `index_keep_versions` mais novas
+    publicadas (a em uso e as anteriores, que workers ainda podem estar drenando),
+    inclusive os restos de execuções interrompidas. Coleções usadas por uma versão
+    compactada mantida ficam, mesmo que a versão de origem saia.
+    """
+    published = read_published(cfg)
+    versions = [published.get("version"), *published.get("history", [])]
+    keep = set(versions[: max(1, cfg.index_keep_versions)])
+    keep_collections = {collections_version(v) for v in keep if v}
+
+    for public in collections(cfg).values():
+        prefix = COLLECTION_VERSION.format(name=public, version="")
+        for c in idx.client.get_collections().collections:
+            if c.name.startswith(prefix) and c.name[len(prefix) :] not in keep_collections:
+                drop_collection(idx, c.name)
+                manifest.forget(c.name)
+    manifest.save()
+
+    if os.path.isdir(cfg.index_versions_path):
+        for version in os.listdir(cfg.index_versions_path):
+            if version not in keep:
+                shutil.rmtree(version_dir(cfg, version), ignore_errors=True)
+                print(f"[version] removida {version}")
+
+
+def index_corpus(cfg: Config, idx: Indexer) -> Optional[str]:
+    """
+    Indexa o corpus numa versão: coleções do Qdrant e artefatos léxicos próprios,
+    montados ao lado dos da versão em uso, que só é trocada no fim (aliases e
+    version.json). Com o JSONL igual ao publicado, a versão publicada é atualizada.
+    Saída: a versão publicada, ou None se o JSONL está vazio.
+    """
+    data_sha1 = file_sha1(cfg.data_path)
+    version, corpus_sha1 = next_version(cfg, data_sha1)
+    vcfg = snapshot_config(cfg, version)
 
     print(
         f"""
-        QDRANT_URL={cfg.qdrant_url}
-        | HYBRID={cfg.qdrant_collection_hybrid}
-        | DENSE={cfg.qdrant_collection_dense}
+        BACKEND={cfg.vector_backend}
+        | QDRANT={cfg.qdrant_url if cfg.vector_backend == "remote" else cfg.qdrant_local_path}
+        | VERSION={version}
+        | HYBRID={vcfg.qdrant_collection_hybrid}
+        | PASSAGES={vcfg.qdrant_collection_passages}
+        | ARTIFACTS={version_dir(cfg, version)}
         """
     )
 
     d_dim = idx.dense_dim()
-    idx.ensure_collection_hybrid(cfg.qdrant_collection_hybrid, d_dim)
-    idx.ensure_collection_dense_only(cfg.qdrant_collection_dense, d_dim)
+    idx.ensure_collection_hybrid(vcfg.qdrant_collection_hybrid, d_dim)
+    idx.ensure_collection_passages(vcfg.qdrant_collection_passages, d_dim)
 
-    rows = list(idx.iter_jsonl(cfg.data_path))
-    if not rows:
+    manifest = IndexManifest.load(cfg.manifest_path)
+    ids = index_collections(vcfg, idx, manifest)
+    if not ids:
         print(f"Nenhum dado encontrado em {cfg.data_path}")
-        return
+        return None
 
-    base_docs = []
-    for d in rows:
-        _id = idx.stable_id(d)
-        _hash = idx.content_sha1(d["text"])
-        base_docs.append({"id": _id, "text": d["text"], "content_sha1": _hash})
-
-    ids = [b["id"] for b in base_docs]
-
-    existing_hash_h = idx.fetch_existing_hashes(cfg.qdrant_collection_hybrid, ids)
-    to_upsert_h = [b for b in base_docs if existing_hash_h.get(str(b["id"])) != b["content_sha1"]]
-    print(f"[hybrid] sem_mudanca={len(base_docs) - len(to_upsert_h)} upsert={len(to_upsert_h)}")
-    if to_upsert_h:
-        upsert_ids = [r["id"] for r in to_upsert_h]
-        payloads = idx.build_payloads(to_upsert_h)
-        documents_hybrid = idx.build_documents_hybrid(to_upsert_h)
-        idx.upsert(
-            cfg.qdrant_collection_hybrid,
-            documents_hybrid,
-            payloads,
-            upsert_ids,
-        )
-    print(f"[hybrid] total={idx.count(cfg.qdrant_collection_hybrid)}")
-
-    existing_hash_d = idx.fetch_existing_hashes(cfg.qdrant_collection_dense, ids)
-    to_upsert_d = [b for b in base_docs if existing_hash_d.get(str(b["id"])) != b["content_sha1"]]
-    print(f"[dense] sem_mudanca={len(base_docs) - len(to_upsert_d)} upsert={len(to_upsert_d)}")
-    if to_upsert_d:
-        upsert_ids = [r["id"] for r in to_upsert_d]
-        payloads = idx.build_payloads(to_upsert_d)
-        documents_dense = idx.build_documents_dense(to_upsert_d)
-        idx.upsert(cfg.qdrant_collection_dense, documents_dense, payloads, upsert_ids)
-    print(f"[dense] total={idx.count(cfg.qdrant_collection_dense)}")
+    # os artefatos léxicos leem o corpus do store mapeado em memória, sem materializá-lo
+    build_document_store(vcfg, ids, corpus_sha1)
+    texts = DocumentStore.load(vcfg.document_store_path, corpus_sha1=corpus_sha1)
+    build_lexical_index(vcfg, texts, ids, corpus_sha1)
+    build_fingerprint_index(vcfg, texts, ids, corpus_sha1)
+    if cfg.lsh_enabled:
+        build_minhash_index(vcfg, texts, ids, corpus_sha1)
+
+    publish_version(cfg, idx, version, corpus_sha1, data_sha1=data_sha1)
+    prune_versions(cfg, idx, manifest)
+    return version
+
+
+def main():
+    """Indexa o corpus do JSONL numa versão publicada (ver index_corpus)."""
+    cfg = Config()
+    index_corpus(cfg, Indexer(cfg))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.ai.lexical.minhash import MinHashLSH
+from app.ai.lexical.tfidf import TextSimilarity
+from app.config.config import Config
+from app.utils.json_utils import load_pt_corpus_from_jsonl
+
+SETTINGS = [(8, 16), (16, 8), (32, 4), (64, 2), (20, 5)]
+
+
+def make_queries(
+    texts: List[str], n_queries: int, mutation: float, seed: int
+) -> List[Tuple[int, str]]:
+    """Gera quase-duplicatas: documentos do corpus com uma fração das palavras trocada."""
+    rng = random.Random(seed)
+    queries = []
+    for i in rng.sample(range(len(texts)), min(n_queries, len(texts))):
+        words = texts[i].split()
+        noisy = [w if rng.random() >= mutation else rng.choice(words[::7] or words) for w in words]
+        queries.append((i, " ".join(noisy)))
+    return queries
+
+
+def evaluate(
+    ts: TextSimilarity,
+    lsh: MinHashLSH,
+    queries: List[Tuple[int, str]],
+    top_k: int,
+) -> Dict[str, Any]:
+    """Compara o ranking exato (varredura completa) com o ranking restrito aos candidatos LSH."""
+    hits_source, recall_sum, n_candidates = 0, 0.0, 0
+    full_time, lsh_time = 0.0, 0.0
+    for source, query in queries:
+        t0 = time.perf_counter()
+        exact = ts.rank(query, top_k=top_k)
+        t1 = time.perf_counter()
+        candidates = lsh.candidates(query)
+        approx = ts.rank(query, top_k=top_k, candidates=candidates)
+        t2 = time.perf_counter()
+
+        full_time += t1 - t0
+        lsh_time += t2 - t1
+        n_candidates += candidates.size
+        exact_ids = {i for i, _ in exact}
+        recall_sum += len(exact_ids & {i for i, _ in approx}) / max(1, len(exact_ids))
+        hits_source += int(source in candidates)
+
+    n = max(1, len(queries))
+    return {
+        "bands": lsh.bands,
+        "rows": lsh.rows,
+        "recall_at_k": recall_sum / n,
+        "source_recall": hits_source / n,
+        "avg_candidates": n_candidates / n,
+        "full_scan_ms": 1000 * full_time / n,
+        "lsh_ms": 1000 * lsh_time / n,
+    }
+
+
+def main():
+    """Relatório de recall x latência do pré-filtro MinHash-LSH em diferentes bandas/linhas."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--mutation", type=float, default=0.1)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    cfg = Config()
+    texts = load_pt_corpus_from_jsonl(cfg.data_path)
+    ts = TextSimilarity()
+    ts.fit(texts)
+    queries = make_queries(texts, args.queries, args.mutation, args.seed)
+
+    rows = []
+    print("bands rows  recall@k  fonte  candidatos  full_ms  lsh_ms  build_s")
+    for bands, n_rows in SETTINGS:
+        lsh = MinHashLSH(bands=bands, rows=n_rows)
+        t0 = time.perf_counter()
+        lsh.fit(texts)
+        build_s = time.perf_counter() - t0
+        result = {**evaluate(ts, lsh, queries, args.top_k), "build_s": build_s}
+        rows.append(result)
+        print(
+            f"{bands:5d} {n_rows:4d} {result['recall_at_k']:9.3f} {result['source_recall']:6.3f}"
+            f" {result['avg_candidates']:11.1f} {result['full_scan_ms']:8.2f}"
+            f" {result['lsh_ms']:7.2f} {result['build_s']:8.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"queries": len(queries), "mutation": args.mutation, "results": rows}, f)
+
+
+if __name__ == "__main__":
+    main()
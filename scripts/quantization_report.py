@@ -0,0 +1,159 @@
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from app.ai.semantic.backend import create_client, quantization_config
+from app.config.config import Config
+
+# (rótulo, quantização, oversampling, rescore)
+SETTINGS: List[Tuple[str, Optional[str], float, bool]] = [
+    ("float32", None, 1.0, False),
+    ("int8", "scalar", 1.0, False),
+    ("int8+rescore", "scalar", 1.5, True),
+    ("binary", "binary", 1.0, False),
+    ("binary+rescore x2", "binary", 2.0, True),
+    ("binary+rescore x4", "binary", 4.0, True),
+]
+BYTES_PER_DIM = {None: 4.0, "scalar": 1.0, "binary": 1 / 8}
+VECTOR = "dense"
+
+
+def make_vectors(n: int, dim: int, n_queries: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Vetores sintéticos normalizados em torno de centróides, imitando tópicos do corpus."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 50), dim)).astype(np.float32)
+    docs = centers[rng.integers(0, centers.shape[0], n)] + 0.5 * rng.normal(size=(n, dim))
+    queries = docs[rng.integers(0, n, n_queries)] + 0.3 * rng.normal(size=(n_queries, dim))
+    docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return docs.astype(np.float32), queries.astype(np.float32)
+
+
+def exact_top_k(docs: np.ndarray, queries: np.ndarray, top_k: int) -> List[set]:
+    """Ranking exato (cosseno por força bruta), usado como gabarito do recall."""
+    scores = queries @ docs.T
+    best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    return [set(row.tolist()) for row in best]
+
+
+def build_collection(
+    client: QdrantClient, name: str, docs: np.ndarray, quantization: Optional[str], cfg: Config
+) -> float:
+    """Cria a coleção, envia os vetores e espera o HNSW ficar pronto. Saída: segundos."""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    t0 = time.perf_counter()
+    client.create_collection(
+        collection_name=name,
+        vectors_config={
+            VECTOR: models.VectorParams(
+                size=docs.shape[1], distance=models.Distance.COSINE, on_disk=cfg.vectors_on_disk
+            )
+        },
+        hnsw_config=models.HnswConfigDiff(m=cfg.hnsw_m, ef_construct=cfg.hnsw_ef_construct),
+        quantization_config=quantization_config(quantization),
+    )
+    client.upload_collection(
+        collection_name=name,
+        vectors={VECTOR: docs},
+        ids=list(range(docs.shape[0])),
+        batch_size=512,
+    )
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    return time.perf_counter() - t0
+
+
+def evaluate(
+    client: QdrantClient,
+    name: str,
+    queries: np.ndarray,
+    truth: List[set],
+    params: models.SearchParams,
+) -> Dict[str, float]:
+    """Recall@k contra o gabarito (k = tamanho de cada conjunto) e latências por consulta."""
+    top_k = len(truth[0])
+    latencies, recall = [], 0.0
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        res = client.query_points(
+            collection_name=name, query=q.tolist(), using=VECTOR, limit=top_k, search_params=params
+        )
+        latencies.append(1000 * (time.perf_counter() - t0))
+        recall += len(expected & {int(p.id) for p in res.points}) / top_k
+    return {
+        "recall_at_k": recall / len(truth),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    """Relatório de recall@k x memória x latência dos vetores densos quantizados."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    cfg = Config()
+    if cfg.vector_backend != "remote":
+        print("Aviso: o modo local ignora quantização e HNSW; use o servidor Qdrant.")
+    client = create_client(cfg)
+    docs, queries = make_vectors(args.vectors, args.dim, args.queries, args.seed)
+    truth = exact_top_k(docs, queries, args.top_k)
+
+    built: Dict[Optional[str], Tuple[str, float]] = {}
+    rows: List[Dict[str, Any]] = []
+    print("config               recall@k  ram_mb  p50_ms  p95_ms  build_s")
+    try:
+        for label, quantization, oversampling, rescore in SETTINGS:
+            if quantization not in built:
+                name = f"bench_quant_{quantization or 'float'}"
+                built[quantization] = (
+                    name,
+                    build_collection(client, name, docs, quantization, cfg),
+                )
+            name, build_s = built[quantization]
+
+            params = models.SearchParams(
+                hnsw_ef=cfg.search_hnsw_ef,
+                quantization=models.QuantizationSearchParams(
+                    ignore=quantization is None, rescore=rescore, oversampling=oversampling
+                ),
+            )
+            # com os originais em disco, só os vetores quantizados ocupam RAM
+            ram_dims = BYTES_PER_DIM[quantization] if quantization is not None else 0.0
+            if quantization is None or not cfg.vectors_on_disk:
+                ram_dims += BYTES_PER_DIM[None]
+            result = {
+                "config": label,
+                **evaluate(client, name, queries, truth, params),
+                "ram_mb": docs.shape[0] * docs.shape[1] * ram_dims / 2**20,
+                "build_s": build_s,
+            }
+            rows.append(result)
+            print(
+                f"{label:20s} {result['recall_at_k']:9.3f} {result['ram_mb']:7.1f}"
+                f" {result['p50_ms']:7.2f} {result['p95_ms']:7.2f} {build_s:8.1f}"
+            )
+    finally:
+        for name, _ in built.values():
+            client.delete_collection(name)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"vectors": args.vectors, "dim": args.dim, "top_k": args.top_k, "results": rows}, f
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 # tests/test_app.py
-from unittest.mock import patch
+import json
+import time
+from unittest.mock import AsyncMock, Mock
 
 from fastapi.testclient import TestClient
+from qdrant_client.http.exceptions import ResponseHandlingException
 
-from app.main import app
+from app.api.admin import get_config
+from app.api.compare import get_manager, get_service
+from app.config.config import Config
+from app.main import app, create_app
+from app.utils.metrics import ERRORS
 
 client = TestClient(app)
 
@@ -14,17 +21,201 @@ def test_health_check():
     assert r.json() == {"status": "ok"}
 
 
-def test_compare_endpoint():
-    with patch("app.api.compare.CompareService") as MockCls:
-        MockCls.return_value.compare.return_value = {
-            "mode": "all",
-            "matches": [{"similarity": 0.9, "text": "teste"}],
-        }
+def test_compare_endpoint(mock_compare_service):
+    mock_compare_service.acompare = AsyncMock(return_value={})
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
         r = client.post("/compare", json={"text": "teste"})
-        assert r.status_code == 200
-        assert "mode" in r.json()
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    assert "mode" in r.json()
+
+
+def test_compare_validation(mock_compare_service):
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        r = client.post("/compare", json={"text": ""})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 422
 
 
-def test_compare_validation():
-    r = client.post("/compare", json={"text": ""})
+def test_compare_batch_endpoint(mock_compare_service):
+    mock_compare_service.compare_lexical_batch.return_value = [
+        [{"index": 0, "similarity": 0.9, "text": "teste"}],
+        [{"index": 1, "similarity": 0.7, "text": "outro"}],
+    ]
+    mock_compare_service.render.side_effect = lambda results, *args: results
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        r = client.post("/compare/batch", json={"texts": ["a", "b"], "mode": "lexical"})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [item["lexical"][0]["index"] for item in results] == [0, 1]
+    assert "serialize;dur=" in r.headers["Server-Timing"]
+    mock_compare_service.compare_semantic_batch.assert_not_called()
+
+
+def test_compare_batch_validation(mock_compare_service):
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        r = client.post("/compare/batch", json={"texts": []})
+    finally:
+        app.dependency_overrides.clear()
     assert r.status_code == 422
+
+
+def test_metrics_and_server_timing(mock_compare_service):
+    """Testa o Server-Timing da resposta e a exportação em /metrics"""
+    mock_compare_service.acompare = AsyncMock(return_value={"lexical": []})
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        r = client.post("/compare", json={"text": "teste", "mode": "lexical"})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    assert "serialize;dur=" in r.headers["Server-Timing"]
+    assert "total;dur=" in r.headers["Server-Timing"]
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'plagiarism_requests_total{endpoint="/compare",status="200"}' in metrics.text
+    assert 'plagiarism_stage_seconds_count{stage="serialize"}' in metrics.text
+
+
+def test_compare_backend_unavailable(mock_compare_service):
+    """Testa que falhas do Qdrant viram 503 e são contadas por tipo"""
+    mock_compare_service.acompare = AsyncMock(
+        side_effect=ResponseHandlingException(ConnectionError("recusada"))
+    )
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        r = client.post("/compare", json={"text": "teste"})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 503
+    assert ERRORS.value("/compare", "ResponseHandlingException") >= 1
+
+
+def test_ready_before_warmup():
+    """Testa que /ready responde 503 enquanto o aquecimento não terminou"""
+    # app novo: o estado do `app` compartilhado depende dos testes que rodaram antes
+    r = TestClient(create_app()).get("/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "warming_up"
+
+
+def test_ready_after_warmup(mock_compare_service):
+    """Testa que o lifespan aquece o serviço e libera o /ready, sem montar o SnapshotManager"""
+    mock_compare_service.awarm_up = AsyncMock()
+    get_manager.cache_clear()
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    try:
+        with TestClient(app) as c:
+            for _ in range(100):
+                r = c.get("/ready")
+                if r.status_code == 200:
+                    break
+                time.sleep(0.01)
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    mock_compare_service.awarm_up.assert_awaited_once()
+    assert get_manager.cache_info().currsize == 0
+
+
+def _admin_config(token="segredo") -> Config:
+    cfg = Config()
+    cfg.admin_token = token
+    return cfg
+
+
+def test_corpus_endpoints(mock_compare_service):
+    mock_compare_service.add_documents.return_value = [{"id": "abc", "index": 300}]
+    mock_compare_service.delete_document.side_effect = [300, None]
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    app.dependency_overrides[get_config] = _admin_config
+    headers = {"X-Admin-Token": "segredo"}
+    try:
+        added = client.post("/corpus/documents", json={"texts": ["nova redação"]}, headers=headers)
+        deleted = client.delete("/corpus/documents/abc", headers=headers)
+        missing = client.delete("/corpus/documents/abc", headers=headers)
+        invalid = client.post("/corpus/documents", json={"texts": ["  "]}, headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+    assert added.json() == {"documents": [{"id": "abc", "index": 300}]}
+    assert deleted.json() == {"id": "abc", "index": 300}
+    assert missing.status_code == 404
+    assert invalid.status_code == 422
+
+
+def test_admin_snapshot_endpoints():
+    manager = Mock(version="v1")
+    manager.published.return_value = "v2"
+    manager.reload = AsyncMock(return_value=True)
+    app.dependency_overrides[get_manager] = lambda: manager
+    app.dependency_overrides[get_config] = _admin_config
+    try:
+        status = client.get("/admin/snapshot")
+        reloaded = client.post("/admin/snapshot/reload", headers={"X-Admin-Token": "segredo"})
+    finally:
+        app.dependency_overrides.clear()
+    assert status.json() == {"current": "v1", "published": "v2"}
+    assert reloaded.json()["reloaded"] is True
+    manager.reload.assert_awaited_once()
+
+
+def test_admin_endpoints_require_token(mock_compare_service):
+    """Testa os endpoints administrativos desligados sem token e recusados com token errado"""
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    app.dependency_overrides[get_manager] = Mock
+    try:
+        app.dependency_overrides[get_config] = lambda: _admin_config(None)
+        disabled = client.delete("/corpus/documents/abc", headers={"X-Admin-Token": ""})
+        app.dependency_overrides[get_config] = _admin_config
+        missing = client.post("/corpus/documents", json={"texts": ["nova redação"]})
+        wrong = client.post("/admin/snapshot/reload", headers={"X-Admin-Token": "outro"})
+    finally:
+        app.dependency_overrides.clear()
+    assert disabled.status_code == 403
+    assert missing.status_code == wrong.status_code == 401
+    mock_compare_service.add_documents.assert_not_called()
+    mock_compare_service.delete_document.assert_not_called()
+
+
+def test_cohort_pairs_endpoint(mock_compare_service):
+    mock_compare_service.config = Config()
+    mock_compare_service.config.cohort_semantic_max_texts = 3
+    mock_compare_service.retriever.encode_passages.side_effect = lambda batch: [
+        [1.0, 0.0] if "desmatamento" in t else [0.0, 1.0] for t in batch
+    ]
+    app.dependency_overrides[get_service] = lambda: mock_compare_service
+    texts = ["o desmatamento ameaça o clima", "o desmatamento ameaça o clima do país", "futebol"]
+    try:
+        r = client.post("/cohort/pairs", json={"texts": texts, "ids": ["a", "b", "c"]})
+        semantic = client.post(
+            "/cohort/pairs",
+            json={"texts": texts, "lexical_threshold": None, "semantic_threshold": 0.9},
+        )
+        too_many = client.post(
+            "/cohort/pairs", json={"texts": [*texts, "outra"], "semantic_threshold": 0.9}
+        )
+        bad_ids = client.post("/cohort/pairs", json={"texts": texts, "ids": ["a"]})
+        no_threshold = client.post(
+            "/cohort/pairs", json={"texts": texts, "lexical_threshold": None}
+        )
+    finally:
+        app.dependency_overrides.clear()
+    assert r.headers["content-type"] == "application/x-ndjson"
+    pairs = [json.loads(line) for line in r.text.splitlines()]
+    assert [(p["a"], p["b"]) for p in pairs] == [("a", "b")]
+    pairs = [json.loads(line) for line in semantic.text.splitlines()]
+    assert [(p["a"], p["b"], p["semantic"]) for p in pairs] == [(0, 1, 1.0)]
+    mock_compare_service.retriever.encode_passages.assert_called()
+    mock_compare_service.retriever.encode_queries.assert_not_called()
+    assert too_many.status_code == 422
+    assert bad_ids.status_code == 422
+    assert no_threshold.status_code == 422
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from qdrant_client import models
+
+from app.ai.semantic.backend import (
+    ThreadedAsyncClient,
+    create_async_client,
+    create_client,
+    quantization_config,
+    search_params,
+)
+from app.ai.semantic.indexer import Indexer
+from app.ai.semantic.retriever import Retriever
+from app.config.config import Config
+from app.utils.cache_utils import LRUCache
+
+VECTORS = {"gato": [1.0, 0.0], "cachorro": [0.0, 1.0], "gato manso": [0.9, 0.1]}
+
+
+def _local_config() -> Config:
+    cfg = Config()
+    cfg.vector_backend = "local"
+    cfg.qdrant_local_path = ":memory:"
+    cfg.passage_words = 2
+    cfg.passage_stride = 2
+    return cfg
+
+
+def _indexed_retriever() -> Retriever:
+    """Retriever sobre o backend local em memória, com passagens já indexadas"""
+    cfg = _local_config()
+    idx = Indexer(cfg)
+    idx.ensure_collection_passages(cfg.qdrant_collection_passages, dense_size=2)
+    docs = [
+        {"id": "a", "text": "gato cachorro", "content_sha1": "x"},
+        {"id": "b", "text": "cachorro", "content_sha1": "y"},
+    ]
+    passages = idx.build_passages(docs)
+    idx.upsert(
+        cfg.qdrant_collection_passages,
+        idx.build_vectors_dense([VECTORS.get(p["text"], [0.7, 0.7]) for p in passages]),
+        idx.build_passage_payloads(passages),
+        [p["id"] for p in passages],
+    )
+
+    r = Retriever.__new__(Retriever)
+    r.config = cfg
+    r.dense_name = cfg.dense_name
+    r.client = idx.client
+    r.async_client = create_async_client(cfg, idx.client)
+    r.embedding_cache = LRUCache(maxsize=10)
+    r.enc = Mock()
+    r.batcher = None
+    r.enc.embed.side_effect = lambda texts: [np.array(VECTORS[t]) for t in texts]
+    return r
+
+
+def test_create_client_rejects_unknown_backend():
+    """Testa que um backend desconhecido é recusado"""
+    cfg = Config()
+    cfg.vector_backend = "faiss"
+    with pytest.raises(ValueError, match="vector_backend"):
+        create_client(cfg)
+
+
+def test_local_backend_uses_threaded_async_client():
+    """Testa que o modo local reaproveita o cliente síncrono no lado assíncrono"""
+    cfg = _local_config()
+    client = create_client(cfg)
+
+    async_client = create_async_client(cfg, client)
+
+    assert isinstance(async_client, ThreadedAsyncClient)
+    assert asyncio.run(async_client.get_collections()).collections == []
+
+
+def test_local_backend_passage_search():
+    """Testa a busca por passagens de ponta a ponta no backend local"""
+    r = _indexed_retriever()
+
+    results = r.search_dense_only("gato manso", top_k=2)
+
+    assert [x["id"] for x in results] == ["a", "b"]
+    assert results[0]["spans"][0]["doc_start"] == 0
+
+
+def test_local_backend_async_passage_search():
+    """Testa a busca assíncrona por passagens no backend local"""
+    r = _indexed_retriever()
+    windows = r.query_windows("cachorro")
+
+    results = asyncio.run(r.asearch_dense_only(windows, r.encode_queries(["cachorro"]), top_k=1))
+
+    assert results[0]["id"] == "b"
+    assert results[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_quantization_config_kinds():
+    """Testa a quantização escalar, binária e sem quantização"""
+    assert quantization_config(None) is None
+    assert quantization_config("scalar").scalar.type == models.ScalarType.INT8
+    assert quantization_config("binary").binary.always_ram is True
+    with pytest.raises(ValueError, match="quantization"):
+        quantization_config("pq")
+
+
+def test_search_params_oversampling_and_rescore():
+    """Testa que a busca usa oversampling + rescoring só quando há quantização"""
+    cfg = Config()
+    assert search_params(cfg) is None
+
+    cfg.quantization = "binary"
+    cfg.search_oversampling = 3.0
+    params = search_params(cfg)
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == 3.0
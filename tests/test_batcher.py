@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.ai.semantic.batcher import EmbeddingBatcher
+
+
+class _Model:
+    """Modelo falso: o "vetor" é o tamanho do texto, e os lotes ficam registrados"""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def encode(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [len(t) for t in texts]
+
+
+def test_batcher_coalesces_concurrent_requests():
+    """Testa que pedidos concorrentes viram poucos lotes e cada um recebe seus vetores"""
+    model = _Model(delay=0.01)
+    batcher = EmbeddingBatcher(model.encode, max_batch=64, max_wait=0.05)
+    texts = [["a" * i, "b" * (i + 1)] for i in range(16)]
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(batcher.embed, texts))
+    finally:
+        batcher.close()
+
+    assert results == [[len(a), len(b)] for a, b in texts]
+    assert len(model.batches) < len(texts)
+    assert sum(len(b) for b in model.batches) == 32
+
+
+def test_batcher_respects_max_batch():
+    """Testa que nenhum lote passa de max_batch, salvo um pedido maior que ele"""
+    model = _Model()
+    batcher = EmbeddingBatcher(model.encode, max_batch=4, max_wait=0.02)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(batcher.embed, [["x", "y"]] * 8))
+        assert batcher.embed(["a"] * 10) == [1] * 10
+    finally:
+        batcher.close()
+
+    assert all(len(b) <= 4 for b in model.batches[:-1])
+    assert len(model.batches[-1]) == 10
+
+
+def test_batcher_propagates_errors():
+    """Testa que uma falha do modelo chega a todos os pedidos do lote"""
+
+    def broken(texts):
+        raise RuntimeError("onnx falhou")
+
+    batcher = EmbeddingBatcher(broken, max_wait=0.0)
+    try:
+        with pytest.raises(RuntimeError, match="onnx falhou"):
+            batcher.embed(["a"])
+        assert batcher.embed([]) == []
+    finally:
+        batcher.close()
+    with pytest.raises(RuntimeError, match="encerrado"):
+        batcher.embed(["a"])
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.run import parse_size, summarize
+
+
+def test_corpus_generator_is_deterministic():
+    """Testa que a mesma seed gera o mesmo corpus"""
+    first = [d["text"] for d in CorpusGenerator(seed=7).documents(20)]
+    second = [d["text"] for d in CorpusGenerator(seed=7).documents(20)]
+    assert first == second
+    assert all(len(t.split()) >= 80 for t in first)
+
+
+def test_corpus_queries_copy_from_corpus():
+    """Testa que o primeiro grupo de consultas é um trecho literal de um documento"""
+    gen = CorpusGenerator(seed=7)
+    texts = [d["text"] for d in gen.documents(5)]
+    queries = gen.queries(texts, 3)
+    assert len(queries) == 3
+    assert any(queries[0] in t for t in texts)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"), [("1k", 1_000), ("100K", 100_000), ("1m", 1_000_000), ("250", 250)]
+)
+def test_parse_size(value, expected):
+    """Testa a conversão dos tamanhos de corpus"""
+    assert parse_size(value) == expected
+
+
+def test_summarize_percentiles():
+    """Testa o resumo das latências em milissegundos"""
+    stats = summarize([i / 1000 for i in range(1, 101)])
+    assert stats["n"] == 100
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["max_ms"] == pytest.approx(100.0)
+    assert summarize([]) == {"n": 0}
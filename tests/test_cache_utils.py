@@ -0,0 +1,23 @@
+from app.utils.cache_utils import LRUCache
+
+
+def test_lru_eviction_and_counters():
+    """Testa descarte do menos recente e contadores"""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2}
+
+
+def test_ttl_expiration():
+    """Testa expiração por TTL"""
+    cache = LRUCache(maxsize=10, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
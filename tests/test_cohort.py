@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from app.config.config import Config
+from app.services.cohort import CohortSimilarity
+
+ESSAYS = [
+    "A educação pública precisa de investimento em professores e escolas",
+    "A educação pública precisa de investimento em professores e escolas bem equipadas",
+    "O desmatamento da Amazônia ameaça o clima e a biodiversidade do país",
+    "O desmatamento da Amazônia ameaça o clima e a biodiversidade",
+    "Redes sociais mudaram a forma como os jovens se informam",
+    "A tecnologia na escola ajuda os alunos quando há professores preparados",
+    "Mobilidade urbana exige transporte público de qualidade nas cidades",
+]
+
+
+def _config(block_size: int) -> Config:
+    cfg = Config()
+    cfg.cohort_block_size = block_size
+    cfg.passage_words = 4
+    cfg.passage_stride = 4
+    return cfg
+
+
+def _encode(batch):
+    """Embedding falso: contagem de letras do alfabeto"""
+    return [np.array([t.lower().count(c) for c in "abcdefghijklmnopqrstuvwxyz"]) for t in batch]
+
+
+def test_blocked_pairs_match_full_matrix():
+    """Testa que os blocos devolvem exatamente os pares da matriz completa acima do limiar"""
+    cohort = CohortSimilarity(_config(block_size=2))
+    full = cohort.lexical_matrix(ESSAYS)
+    full = (full @ full.T).toarray()
+    expected = {
+        (a, b) for a in range(len(ESSAYS)) for b in range(a + 1, len(ESSAYS)) if full[a, b] >= 0.3
+    }
+
+    pairs = list(cohort.pairs(ESSAYS, lexical_threshold=0.3))
+    assert {(p["a"], p["b"]) for p in pairs} == expected
+    assert {(0, 1), (2, 3)} <= expected
+    for p in pairs:
+        assert p["lexical"] == pytest.approx(full[p["a"], p["b"]])
+        assert p["semantic"] is None
+
+
+def test_semantic_pairs_average_passages():
+    """Testa os embeddings por média das passagens, os limiares combinados e os ids"""
+    ids = [f"aluno-{i}" for i in range(len(ESSAYS))]
+    cohort = CohortSimilarity(_config(block_size=3), encode=_encode)
+    dense = cohort.dense_matrix(ESSAYS)
+    np.testing.assert_allclose(np.linalg.norm(dense, axis=1), 1.0, rtol=1e-5)
+
+    pairs = list(cohort.pairs(ESSAYS, lexical_threshold=0.9, semantic_threshold=0.99, ids=ids))
+    by_pair = {(p["a"], p["b"]): p for p in pairs}
+    assert ("aluno-2", "aluno-3") in by_pair
+    for (a, b), p in by_pair.items():
+        assert p["lexical"] >= 0.9 or p["semantic"] >= 0.99
+        assert ids.index(a) < ids.index(b)
+
+
+def test_pairs_edge_cases():
+    """Testa limiares desligados, turma pequena e redações sem termos em comum"""
+    cohort = CohortSimilarity(_config(block_size=4))
+    with pytest.raises(ValueError, match="limiar"):
+        list(cohort.pairs(ESSAYS, lexical_threshold=None, semantic_threshold=None))
+    with pytest.raises(RuntimeError):
+        list(cohort.pairs(ESSAYS, semantic_threshold=0.5))
+    assert list(cohort.pairs(ESSAYS[:1])) == []
+    assert [(p["a"], p["b"]) for p in cohort.pairs(ESSAYS[:2], lexical_threshold=0.5)] == [(0, 1)]
+    assert list(cohort.pairs(["gato preto", "cachorro branco"], lexical_threshold=0.0)) == [
+        {"a": 0, "b": 1, "lexical": 0.0, "semantic": None}
+    ]
@@ -1,7 +1,16 @@
-from unittest.mock import Mock
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from app.config.config import Config
+from app.schema.compare import CompareMode
+from app.services.compare_service import CompareService, CorpusIndexes
+from app.services.snapshots import snapshot_config
+from app.utils.cache_utils import LRUCache
+from app.utils.json_utils import write_json_atomic
+
 
 @pytest.fixture
 def mock_service():
@@ -50,3 +59,205 @@ def test_compare_all_modes(mock_service):
     assert "lexical" in result
     assert "semantic" in result
     assert "hybrid" in result
+
+
+def _bare_service(tmp_path) -> CompareService:
+    """CompareService sem corpus/modelos, com caches reais"""
+    svc = CompareService.__new__(CompareService)
+    svc.config = Mock(index_version_path=str(tmp_path / "version.json"))
+    svc._corpus_texts = ["teste"]
+    svc._response_cache = LRUCache(maxsize=10)
+    svc._version = "v1"
+    svc._version_mtime = None
+    svc._tfidf = Mock()
+    svc._tfidf.rank.return_value = [(0, 0.9)]
+    svc._tfidf.is_deleted.return_value = False
+    svc._indexes = Mock()
+    svc._indexes.sync_updates.return_value = 0
+    svc._minhash = None
+    svc._fingerprint = Mock()
+    svc._fingerprint.search.return_value = [{"index": 0, "similarity": 1.0, "spans": []}]
+    svc._parent_index = {"doc-0": 0}
+    svc._retriever = Mock()
+    return svc
+
+
+def test_acompare_all_embeds_query_once(tmp_path):
+    """Testa que o modo all calcula janelas e texto inteiro num único lote de embeddings"""
+    svc = _bare_service(tmp_path)
+    svc._retriever.query_windows.return_value = [(0, 5)]
+    svc._retriever.encode_queries.return_value = [[0.1, 0.2], [0.3, 0.4]]
+    svc._retriever.asearch_dense_only = AsyncMock(return_value=[{"id": "d", "similarity": 0.8}])
+    svc._retriever.asearch_hybrid = AsyncMock(return_value=[{"id": "d", "similarity": 0.7}])
+
+    result = asyncio.run(svc.acompare("texto", CompareMode.all, top_k=3))
+
+    assert set(result) == {"lexical", "semantic", "hybrid", "fingerprint"}
+    svc._retriever.encode_queries.assert_called_once_with(["texto", "texto"])
+    svc._retriever.asearch_dense_only.assert_awaited_once_with([(0, 5)], [[0.1, 0.2]], top_k=3)
+    svc._retriever.asearch_hybrid.assert_awaited_once_with("texto", [0.3, 0.4], top_k=3)
+
+
+def test_acompare_lexical_skips_embedding(tmp_path):
+    """Testa que o modo lexical não chama o modelo denso"""
+    svc = _bare_service(tmp_path)
+
+    result = asyncio.run(svc.acompare("texto", CompareMode.lexical, top_k=3))
+
+    assert result == {"lexical": [{"index": 0, "similarity": 0.9, "text": "teste"}]}
+    svc._retriever.encode_query.assert_not_called()
+    svc._retriever.encode_queries.assert_not_called()
+
+
+def test_lexical_batch_applies_minhash_prefilter(tmp_path):
+    """Testa que o lote usa os candidatos do MinHash de cada texto, como o /compare"""
+    svc = _bare_service(tmp_path)
+    svc._minhash = Mock()
+    svc._minhash.candidates.side_effect = lambda text: f"candidatos de {text}"
+
+    batch = svc.compare_lexical_batch(["a", "b"], top_k=3)
+
+    assert batch == [svc.compare_lexical("a", 3), svc.compare_lexical("b", 3)]
+    svc._tfidf.rank_many.assert_not_called()
+    svc._tfidf.rank.assert_any_call("b", top_k=3, candidates="candidatos de b")
+
+
+def test_acompare_response_cache_invalidated_by_new_version(tmp_path):
+    """Testa o cache de respostas e sua invalidação quando o indexador publica"""
+    svc = _bare_service(tmp_path)
+
+    asyncio.run(svc.acompare("texto", CompareMode.lexical, top_k=3))
+    asyncio.run(svc.acompare("  texto ", CompareMode.lexical, top_k=3))
+    assert svc._tfidf.rank.call_count == 1
+    assert svc._response_cache.stats()["hits"] == 1
+
+    write_json_atomic(svc.config.index_version_path, {"version": "v2"})
+    asyncio.run(svc.acompare("texto", CompareMode.lexical, top_k=3))
+    assert svc._tfidf.rank.call_count == 2
+    assert svc.corpus_version() == "v2"
+
+
+def test_vector_results_resolve_parent(tmp_path):
+    """Testa que o resultado vetorial recebe o índice do documento pai e offsets do corpus"""
+    svc = _bare_service(tmp_path)
+    svc._corpus_texts = ["  teste completo"]
+    span = {"query_start": 0, "query_end": 5, "doc_start": 0, "doc_end": 5, "similarity": 0.8}
+    results = [
+        {"id": "doc-0", "similarity": 0.8, "spans": [span]},
+        {"id": "outro", "similarity": 0.5, "spans": []},
+    ]
+
+    out = svc._vector_results(results)
+
+    assert out[0]["index"] == 0
+    assert (out[0]["spans"][0]["doc_start"], out[0]["spans"][0]["doc_end"]) == (2, 7)
+    assert out[1] == results[1]
+    assert svc._vector_results([{"id": "doc-0", "similarity": 0.7}]) == [
+        {"id": "doc-0", "similarity": 0.7, "index": 0}
+    ]
+
+
+def test_render_text_options(tmp_path):
+    """Testa texto completo, sem texto e trecho em volta do melhor trecho casado"""
+    svc = _bare_service(tmp_path)
+    svc._corpus_texts = ["0123456789" * 10]
+    spans = [
+        {"query_start": 0, "query_end": 1, "doc_start": 10, "doc_end": 12, "similarity": 0.2},
+        {"query_start": 0, "query_end": 1, "doc_start": 60, "doc_end": 70, "similarity": 0.9},
+    ]
+    results = [{"index": 0, "similarity": 0.9, "spans": spans}, {"id": "x", "similarity": 0.1}]
+
+    assert svc.render(results)[0]["text"] == svc._corpus_texts[0]
+    assert svc.render(results, include_text=False) == results
+
+    snippet = svc.render(results, snippet_chars=20)
+    assert snippet[0]["text_start"] == 55
+    assert snippet[0]["text"] == svc._corpus_texts[0][55:75]
+    assert "text" not in snippet[1]
+    assert svc.render([{"index": 0, "similarity": 0.5}], snippet_chars=20)[0]["text_start"] == 0
+
+
+def test_acompare_caches_without_text(tmp_path):
+    """Testa que o cache guarda o resultado sem texto e cada pedido recebe o seu formato"""
+    svc = _bare_service(tmp_path)
+
+    full = asyncio.run(svc.acompare("texto", CompareMode.lexical, top_k=3))
+    slim = asyncio.run(svc.acompare("texto", CompareMode.lexical, top_k=3, include_text=False))
+
+    assert full["lexical"][0]["text"] == "teste"
+    assert slim == {"lexical": [{"index": 0, "similarity": 0.9}]}
+    assert svc._tfidf.rank.call_count == 1
+
+
+def _corpus_config(tmp_path, texts) -> Config:
+    """Config com um corpus JSONL pequeno e todos os artefatos dentro de `tmp_path`"""
+    cfg = Config()
+    cfg.data_path = str(tmp_path / "corpus.jsonl")
+    for attr in (
+        "document_store_path",
+        "lexical_index_path",
+        "fingerprint_index_path",
+        "update_journal_path",
+    ):
+        setattr(cfg, attr, str(tmp_path / attr))
+    with open(cfg.data_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"text": t}) + "\n" for t in texts)
+    return cfg
+
+
+def test_preloaded_indexes_are_shared(tmp_path, monkeypatch):
+    """Testa que serviços criados após o preload reaproveitam os mesmos índices e os liberam"""
+    preloaded = {}
+    monkeypatch.setattr("app.services.compare_service._PRELOADED", preloaded)
+    topics = ["meio ambiente", "escola pública", "tecnologia"]
+    texts = [f"redação sobre {topics[i % 3]} e {topics[(i + 1) % 3]}" for i in range(6)]
+    cfg = _corpus_config(tmp_path, texts)
+
+    indexes = CorpusIndexes.preload(cfg)
+    with patch("app.services.compare_service.Retriever"):
+        first, second = CompareService(cfg), CompareService(cfg)
+
+    assert first._tfidf is second._tfidf is indexes.tfidf
+    assert first._corpus_texts is indexes.texts
+    assert list(indexes.texts) == texts
+
+    first.release()
+    assert not preloaded
+
+
+def test_new_version_reuses_retriever(tmp_path):
+    """Testa que o serviço de outra versão carrega seus índices e reaproveita o modelo"""
+    topics = ["meio ambiente", "escola pública", "tecnologia"]
+    texts = [f"redação sobre {topics[i % 3]} e {topics[(i + 1) % 3]}" for i in range(6)]
+    cfg = _corpus_config(tmp_path, texts)
+    with patch("app.services.compare_service.Retriever"):
+        first = CompareService(cfg)
+
+    vcfg = snapshot_config(cfg, "v2")
+    second = CompareService(vcfg, retriever=first.retriever, corpus_sha1=first._corpus_sha1)
+    first.retriever.with_config.assert_called_once_with(vcfg)
+    assert second.retriever is first.retriever.with_config.return_value
+    assert second._tfidf is not first._tfidf
+    assert list(second._corpus_texts) == texts
+
+
+def test_corpus_updates_reach_every_process(tmp_path):
+    """Testa inclusão e remoção pelo journal, aplicadas igualmente por dois workers"""
+    texts = ["redação sobre meio ambiente", "redação sobre escola pública", "tecnologia na escola"]
+    cfg = _corpus_config(tmp_path, texts)
+    first, second = CorpusIndexes(cfg), CorpusIndexes(cfg)
+
+    added = first.add_documents(["vulcões e terremotos no Brasil", texts[0]])
+    assert [d["index"] for d in added] == [3, 0]
+    assert second.sync_updates() == 1
+    assert second.texts[3] == "vulcões e terremotos no Brasil"
+    assert second.parent_index[added[0]["id"]] == 3
+
+    assert second.delete_document(added[1]["id"]) == 0
+    assert second.delete_document(added[1]["id"]) is None
+    assert first.sync_updates() == 1
+    assert first.tfidf.is_deleted(0)
+
+    restarted = CorpusIndexes(cfg)
+    assert len(restarted.texts) == 4
+    assert restarted.tfidf.is_deleted(0)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.utils.doc_store import DocumentStore
+
+TEXTS = ["  primeiro documento", "ação e coração", "", "último 🙂"]
+
+
+def test_doc_store_roundtrip(tmp_path):
+    """Testa que os textos voltam iguais após save/load com mmap"""
+    store = DocumentStore()
+    store.fit(iter(TEXTS))
+    store.save(str(tmp_path / "docs"), corpus_sha1="abc")
+
+    loaded = DocumentStore.load(str(tmp_path / "docs"), corpus_sha1="abc")
+    assert isinstance(loaded._data, np.memmap)
+    assert len(loaded) == len(TEXTS)
+    assert list(loaded) == TEXTS
+    assert loaded[-1] == "último 🙂"
+
+
+def test_doc_store_index_error():
+    """Testa que índices fora do intervalo levantam IndexError"""
+    store = DocumentStore()
+    store.fit(["a"])
+    with pytest.raises(IndexError):
+        store[1]
+
+
+def test_doc_store_stale_artifact(tmp_path):
+    """Testa que um store de outro corpus é recusado"""
+    store = DocumentStore()
+    store.fit(TEXTS)
+    store.save(str(tmp_path / "docs"), corpus_sha1="abc")
+
+    with pytest.raises(ValueError, match="desatualizado"):
+        DocumentStore.load(str(tmp_path / "docs"), corpus_sha1="outro")
+
+
+def test_doc_store_append(tmp_path):
+    """Testa textos incluídos depois do load, lidos e gravados junto com os do buffer"""
+    store = DocumentStore()
+    store.fit(TEXTS)
+    store.save(str(tmp_path / "docs"), corpus_sha1="abc")
+    loaded = DocumentStore.load(str(tmp_path / "docs"), corpus_sha1="abc")
+
+    assert loaded.append(["novo texto", "mais um"]) == len(TEXTS)
+    assert len(loaded) == len(TEXTS) + 2
+    assert loaded[len(TEXTS)] == "novo texto"
+
+    loaded.save(str(tmp_path / "docs2"), corpus_sha1="abc")
+    assert list(DocumentStore.load(str(tmp_path / "docs2"))) == [*TEXTS, "novo texto", "mais um"]
@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.ai.semantic.embedding_store import (
+    DATA_FILE,
+    INDEX_FILE,
+    EmbeddingStore,
+    pack_sparse,
+    unpack_sparse,
+)
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def test_store_roundtrip_and_persistence(tmp_path):
+    """Testa gravação, leitura e reabertura do store"""
+    store = EmbeddingStore(str(tmp_path), MODEL)
+    store.put_many(["a", "b"], [np.array([1.0, 2.0]), np.array([3.0, 4.0, 5.0])])
+
+    assert len(store) == 2
+    got = store.get_many(["b", "x", "a"])
+    assert got[1] is None
+    assert got[0].tolist() == [3.0, 4.0, 5.0]
+    assert got[2].tolist() == [1.0, 2.0]
+
+    reopened = EmbeddingStore(str(tmp_path), MODEL)
+    assert "a" in reopened
+    assert reopened.get_many(["a"])[0].tolist() == [1.0, 2.0]
+
+
+def test_store_skips_existing_keys(tmp_path):
+    """Testa que uma chave já guardada não é regravada"""
+    store = EmbeddingStore(str(tmp_path), MODEL)
+    store.put_many(["a"], [np.array([1.0])])
+    store.put_many(["a", "b"], [np.array([9.0]), np.array([2.0])])
+
+    assert [v.tolist() for v in store.get_many(["a", "b"])] == [[1.0], [2.0]]
+    assert (tmp_path / "sentence-transformers_all-MiniLM-L6-v2" / DATA_FILE).stat().st_size == 8
+
+
+def test_store_ignores_truncated_entries(tmp_path):
+    """Testa que entradas do índice sem o vetor completo no disco são descartadas"""
+    store = EmbeddingStore(str(tmp_path), MODEL)
+    store.put_many(["a"], [np.array([1.0])])
+    with open(store.path + "/" + INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write("b\t1\t4\n")
+
+    reopened = EmbeddingStore(str(tmp_path), MODEL)
+    assert "b" not in reopened
+    reopened.put_many(["c"], [np.array([7.0])])
+    assert reopened.get_many(["c"])[0].tolist() == [7.0]
+
+
+def test_pack_sparse_roundtrip():
+    """Testa que índices grandes sobrevivem ao empacotamento em float32"""
+    indices, values = unpack_sparse(pack_sparse(np.array([3, 2**31 - 5]), np.array([0.5, 1.5])))
+
+    assert indices.tolist() == [3, 2**31 - 5]
+    assert values.tolist() == [0.5, 1.5]
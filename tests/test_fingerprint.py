@@ -0,0 +1,54 @@
+import pytest
+
+from app.ai.lexical.fingerprint import FingerprintIndex
+
+CORPUS = [
+    "A fotossíntese é o processo pelo qual as plantas convertem luz solar em energia química "
+    "armazenada na glicose, liberando oxigênio para a atmosfera.",
+    "O futebol chegou ao Brasil no fim do século dezenove e rapidamente se tornou o esporte "
+    "mais popular do país, presente em todas as regiões.",
+]
+
+
+@pytest.fixture
+def index():
+    fp = FingerprintIndex(k=3, window=2)
+    fp.fit(CORPUS)
+    return fp
+
+
+def test_search_finds_copied_passage_with_spans(index):
+    """Testa que um trecho copiado é encontrado com os trechos em comum"""
+    copied = "convertem luz solar em energia química armazenada na glicose"
+    query = f"Na minha redação escrevi que as plantas {copied}, o que é importante."
+
+    results = index.search(query, top_k=2)
+
+    assert results[0]["index"] == 0
+    span = results[0]["spans"][0]
+    assert copied in query[span["query_start"] : span["query_end"]]
+    assert CORPUS[0][span["doc_start"] : span["doc_end"]] in query
+
+
+def test_search_ignores_accents_and_case(index):
+    """Testa normalização de acentos e caixa"""
+    results = index.search("O FUTEBOL chegou ao BRASIL no fim do seculo dezenove", top_k=1)
+    assert results[0]["index"] == 1
+    assert results[0]["similarity"] == 1.0
+
+
+def test_search_without_overlap(index):
+    """Testa query curta ou sem trechos em comum"""
+    assert index.search("oi") == []
+    assert index.search("um texto completamente original sobre outro tema") == []
+
+
+def test_save_and_load_roundtrip(index, tmp_path):
+    """Testa que o índice carregado responde igual ao treinado"""
+    path = str(tmp_path / "fingerprint")
+    index.save(path, corpus_sha1="abc")
+
+    loaded = FingerprintIndex.load(path, corpus_sha1="abc")
+    query = "plantas convertem luz solar em energia química"
+    assert loaded.search(query) == index.search(query)
+    assert (loaded.k, loaded.window, loaded.n_docs) == (3, 2, 2)
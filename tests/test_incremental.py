@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.ai.lexical.incremental import IncrementalTextSimilarity
+from app.ai.lexical.tfidf import TextSimilarity
+
+CORPUS = [
+    "O sol é uma estrela no centro do sistema solar",
+    "A lua orbita a terra e reflete a luz do sol",
+    "Plantas fazem fotossíntese usando a luz do sol",
+    "O futebol é o esporte mais popular do Brasil",
+]
+NEW = [
+    "A seleção de futebol do Brasil venceu a copa",
+    "Vulcões expelem lava e cinzas na atmosfera",
+]
+PARAMS = {"min_df": 1, "max_df": 1.0, "max_features": None}
+
+
+@pytest.fixture
+def inc():
+    ts = TextSimilarity(**PARAMS)
+    ts.fit(CORPUS)
+    return IncrementalTextSimilarity(ts)
+
+
+def ids(ranked):
+    return [i for i, _ in ranked]
+
+
+def test_add_makes_documents_searchable(inc):
+    """Testa que documentos incluídos entram no ranking com os próximos índices"""
+    assert inc.add(NEW) == [4, 5]
+    assert inc.n_docs == 6
+    assert inc.n_delta == 2
+    assert ids(inc.rank("futebol no Brasil", top_k=2)) == [4, 3]
+    assert [ids(r) for r in inc.rank_many(["futebol no Brasil"], top_k=2)] == [[4, 3]]
+
+
+def test_delete_hides_documents(inc):
+    """Testa que removidos somem do ranking, da base e do delta, sem encolher o top-k"""
+    inc.add(NEW)
+    assert inc.delete([3, 4]) == 2
+    assert inc.delete([3]) == 0
+    assert inc.is_deleted(3)
+    assert not inc.is_deleted(99)
+
+    ranked = inc.rank("futebol no Brasil luz do sol", top_k=3)
+    assert 3 not in ids(ranked)
+    assert 4 not in ids(ranked)
+    assert len(ranked) == 3
+    assert ids(inc.rank_many(["futebol no Brasil luz do sol"], top_k=3)[0]) == ids(ranked)
+    with pytest.raises(IndexError):
+        inc.delete([10])
+
+
+def test_candidates_always_include_added(inc):
+    """Testa que o pré-filtro (que só cobre o corpus indexado) não esconde os incluídos"""
+    inc.add(NEW)
+    ranked = inc.rank("futebol no Brasil", top_k=3, candidates=np.array([1], dtype=np.int64))
+    assert ids(ranked) == [4]
+
+
+def test_deletes_do_not_grow_selection(inc, monkeypatch):
+    """Testa que os removidos saem antes do top-k, sem pedir mais resultados à base"""
+    inc.add(NEW)
+    inc.delete([0, 1, 2, 4])
+    base = inc._state.base
+    calls = []
+    rank = base.rank
+    monkeypatch.setattr(base, "rank", lambda q, k, **kw: calls.append(k) or rank(q, k, **kw))
+
+    assert ids(inc.rank("luz do sol e futebol", top_k=1)) == [3]
+    assert calls == [1]
+    assert [ids(r) for r in inc.rank_many(["luz do sol e futebol"], top_k=2)] == [[3]]
@@ -0,0 +1,48 @@
+from app.utils.journal import UpdateJournal
+
+
+def test_journal_reads_only_new_records(tmp_path):
+    """Testa que cada leitor vê cada registro uma vez, na ordem de gravação"""
+    path = str(tmp_path / "index" / "updates.jsonl")
+    writer, reader = UpdateJournal(path), UpdateJournal(path)
+    assert reader.read_new() == []
+
+    writer.append([{"op": "add", "text": "ação"}, {"op": "delete", "id": "x"}])
+    assert reader.read_new() == [{"op": "add", "text": "ação"}, {"op": "delete", "id": "x"}]
+    assert reader.read_new() == []
+
+    writer.append([{"op": "add", "text": "b"}])
+    assert reader.read_new() == [{"op": "add", "text": "b"}]
+
+
+def test_journal_skips_partial_line_and_restarts_when_recreated(tmp_path):
+    """Testa linha ainda incompleta e arquivo recriado menor"""
+    path = tmp_path / "updates.jsonl"
+    reader = UpdateJournal(str(path))
+    path.write_text('{"op": "add"}\n{"op": "del', encoding="utf-8")
+    assert reader.read_new() == [{"op": "add"}]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('ete"}\n')
+    assert reader.read_new() == [{"op": "delete"}]
+
+    path.write_text('{"op": "x"}\n', encoding="utf-8")
+    assert reader.read_new() == [{"op": "x"}]
+
+
+def test_journal_truncate_keeps_later_records(tmp_path):
+    """Testa que o truncate descarta só o que já foi lido e que os leitores recomeçam"""
+    path = str(tmp_path / "updates.jsonl")
+    writer, reader, compactor = UpdateJournal(path), UpdateJournal(path), UpdateJournal(path)
+    writer.append([{"op": "add", "text": "a"}])
+    assert reader.read_new() == compactor.read_new() == [{"op": "add", "text": "a"}]
+
+    writer.append([{"op": "add", "text": "b"}])
+    compactor.truncate(compactor.offset)
+    writer.append([{"op": "add", "text": "c"}])
+
+    assert reader.read_new() == [{"op": "add", "text": "b"}, {"op": "add", "text": "c"}]
+    assert UpdateJournal(path).read_new() == [
+        {"op": "add", "text": "b"},
+        {"op": "add", "text": "c"},
+    ]
@@ -0,0 +1,33 @@
+from app.ai.semantic.manifest import IndexManifest
+from app.utils.json_utils import write_json_atomic
+
+
+def test_manifest_roundtrip(tmp_path):
+    """Testa gravação e leitura do manifesto"""
+    path = str(tmp_path / "manifest.json")
+    manifest = IndexManifest.load(path)
+    assert manifest.points("docs", count=0) is None
+
+    manifest.update("docs", {"a": "sha-a", "b": "sha-b"}, count=2)
+    manifest.save()
+
+    assert IndexManifest.load(path).points("docs", count=2) == {"a": "sha-a", "b": "sha-b"}
+
+
+def test_manifest_untrusted_when_count_differs(tmp_path):
+    """Testa que o manifesto é ignorado se a coleção mudou fora do indexador"""
+    path = str(tmp_path / "manifest.json")
+    manifest = IndexManifest(path)
+    manifest.update("docs", {"a": "sha-a"}, count=1)
+    manifest.save()
+
+    assert IndexManifest.load(path).points("docs", count=0) is None
+    assert IndexManifest.load(path).points("outra", count=1) is None
+
+
+def test_manifest_other_version_starts_empty(tmp_path):
+    """Testa que um manifesto de outra versão é descartado"""
+    path = str(tmp_path / "manifest.json")
+    write_json_atomic(path, {"version": 0, "collections": {"docs": {"count": 1, "points": {}}}})
+
+    assert IndexManifest.load(path).points("docs", count=1) is None
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.utils.metrics import Counter, Histogram, server_timing, timed, track_request
+
+
+def test_histogram_render_is_cumulative():
+    """Testa que os buckets do histograma são cumulativos, com soma e contagem"""
+    hist = Histogram("t_seconds", "teste", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, "tfidf")
+
+    lines = hist.render()
+    assert 't_seconds_bucket{stage="tfidf",le="0.1"} 1.0' in lines
+    assert 't_seconds_bucket{stage="tfidf",le="1.0"} 2.0' in lines
+    assert 't_seconds_bucket{stage="tfidf",le="+Inf"} 3.0' in lines
+    assert 't_seconds_count{stage="tfidf"} 3.0' in lines
+    assert hist.count("tfidf") == 3
+
+
+def test_counter_by_labels():
+    """Testa o contador separado por labels"""
+    counter = Counter("t_total", "teste", ("status",))
+    counter.inc("200")
+    counter.inc("200")
+    counter.inc("500")
+    assert counter.value("200") == 2
+    assert 't_total{status="500"} 1.0' in counter.render()
+
+
+def test_timed_accumulates_across_threads():
+    """Testa que etapas medidas em threads e tasks entram nos tempos da requisição"""
+
+    def stage() -> None:
+        with timed("encode"):
+            pass
+
+    async def request() -> None:
+        await asyncio.gather(asyncio.to_thread(stage), asyncio.to_thread(stage))
+
+    with track_request() as timings:
+        asyncio.run(request())
+        with timed("tfidf"):
+            pass
+    assert set(timings) == {"encode", "tfidf"}
+
+    with timed("fora"):
+        pass
+    assert "fora" not in timings
+
+
+def test_server_timing_header():
+    """Testa o formato do header Server-Timing em milissegundos"""
+    assert server_timing({"encode": 0.0125, "total": 0.02}) == "encode;dur=12.50, total;dur=20.00"
@@ -0,0 +1,32 @@
+from app.ai.lexical.minhash import MinHashLSH
+
+CORPUS = [
+    "A fotossíntese é o processo pelo qual as plantas convertem luz solar em energia química "
+    "armazenada na glicose, liberando oxigênio para a atmosfera durante o dia.",
+    "O futebol chegou ao Brasil no fim do século dezenove e rapidamente se tornou o esporte "
+    "mais popular do país, presente em todas as regiões e classes sociais.",
+    "curto",
+]
+
+
+def test_candidates_find_near_duplicate():
+    """Testa que uma quase-duplicata colide com o original"""
+    lsh = MinHashLSH(bands=32, rows=2)
+    lsh.fit(CORPUS)
+
+    near_dup = CORPUS[1].replace("rapidamente", "logo")
+    assert lsh.candidates(near_dup).tolist() == [1]
+    assert lsh.candidates("um texto completamente original sobre outro tema").size == 0
+    assert lsh.candidates("oi").size == 0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Testa que o índice carregado gera os mesmos candidatos"""
+    lsh = MinHashLSH(bands=16, rows=2)
+    lsh.fit(CORPUS)
+    path = str(tmp_path / "minhash")
+    lsh.save(path, corpus_sha1="abc")
+
+    loaded = MinHashLSH.load(path, corpus_sha1="abc")
+    assert (loaded.bands, loaded.rows, loaded.n_docs) == (16, 2, 3)
+    assert loaded.candidates(CORPUS[0]).tolist() == lsh.candidates(CORPUS[0]).tolist() == [0]
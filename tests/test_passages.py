@@ -0,0 +1,16 @@
+from app.ai.semantic.passages import split_passages
+
+
+def test_split_passages_overlap():
+    """Testa janelas sobrepostas com offsets de caracteres"""
+    text = "a b c d e f g h"
+    spans = split_passages(text, size=3, stride=2)
+
+    assert spans == [(0, 5), (4, 9), (8, 13), (12, 15)]
+    assert text[spans[1][0] : spans[1][1]] == "c d e"
+
+
+def test_split_passages_short_and_empty():
+    """Testa texto menor que uma janela e texto vazio"""
+    assert split_passages("  um texto curto ", size=10, stride=5) == [(2, 16)]
+    assert split_passages("   ", size=10, stride=5) == []
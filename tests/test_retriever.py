@@ -0,0 +1,99 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from qdrant_client import models
+from qdrant_client.http.models import QueryResponse
+
+from app.ai.semantic.retriever import Retriever
+from app.utils.cache_utils import LRUCache
+
+
+def _retriever() -> Retriever:
+    r = Retriever.__new__(Retriever)
+    r.dense_name = "dense"
+    return r
+
+
+def test_hybrid_results_use_local_cosine():
+    """Testa que o score RRF é trocado pelo cosine com os vetores da fusão"""
+    fused = [
+        models.ScoredPoint(
+            id=1, version=0, score=0.9, payload={"text": "a"}, vector={"dense": [0.0, 1.0]}
+        ),
+        models.ScoredPoint(
+            id=2, version=0, score=0.5, payload={"text": "b"}, vector={"dense": [2.0, 0.0]}
+        ),
+    ]
+    results = _retriever()._hybrid_results(fused, [1.0, 0.0])
+
+    assert [r["id"] for r in results] == [2, 1]
+    assert results[0]["similarity"] == 1.0
+    assert results[1]["similarity"] == 0.0
+
+
+def test_hybrid_results_empty():
+    """Testa fusão sem pontos"""
+    assert _retriever()._hybrid_results([], [1.0, 0.0]) == []
+
+
+def _passage_retriever(aggregation: str = "max") -> Retriever:
+    r = _retriever()
+    r.config = Mock(passage_aggregation=aggregation, passage_spans=2)
+    return r
+
+
+def _passage(pid: int, parent: str, start: int, score: float) -> models.ScoredPoint:
+    return models.ScoredPoint(
+        id=pid,
+        version=0,
+        score=score,
+        payload={"parent_id": parent, "start": start, "end": start + 10, "text": f"p{pid}"},
+    )
+
+
+def _responses() -> list:
+    return [
+        QueryResponse(points=[_passage(1, "A", 0, 0.6), _passage(3, "B", 0, 0.7)]),
+        QueryResponse(points=[_passage(1, "A", 0, 0.9), _passage(2, "A", 20, 0.5)]),
+    ]
+
+
+def test_passage_results_max_per_parent():
+    """Testa a agregação por documento pai pelo maior score entre passagens e janelas"""
+    results = _passage_retriever()._passage_results([(0, 10), (5, 15)], _responses(), top_k=5)
+
+    assert [r["id"] for r in results] == ["A", "B"]
+    assert results[0]["similarity"] == 0.9
+    assert "text" not in results[0]
+    assert results[0]["spans"][0] == {
+        "query_start": 5,
+        "query_end": 15,
+        "doc_start": 0,
+        "doc_end": 10,
+        "similarity": 0.9,
+    }
+    assert len(results[0]["spans"]) == 2
+
+
+def test_passage_results_sum_and_top_k():
+    """Testa a agregação por soma e o corte em top_k"""
+    results = _passage_retriever("sum")._passage_results([(0, 10), (5, 15)], _responses(), top_k=1)
+
+    assert len(results) == 1
+    assert results[0]["id"] == "A"
+    assert results[0]["similarity"] == pytest.approx(1.4)
+
+
+def test_encode_queries_dedupes_batch():
+    """Testa que textos repetidos no lote são embedados uma única vez"""
+    r = _retriever()
+    r.embedding_cache = LRUCache(maxsize=10)
+    r.enc = Mock()
+    r.batcher = None
+    r.enc.embed.return_value = [np.array([1.0]), np.array([2.0])]
+
+    vecs = r.encode_queries(["a", "b", " a "])
+
+    r.enc.embed.assert_called_once_with(["a", "b"])
+    assert vecs == [[1.0], [2.0], [1.0]]
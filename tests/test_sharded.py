@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from app.ai.lexical.sharded import ShardedTextSimilarity
+from app.ai.lexical.tfidf import TextSimilarity
+
+CORPUS = [
+    "O sol é uma estrela no centro do sistema solar",
+    "A lua orbita a terra e reflete a luz do sol",
+    "Plantas fazem fotossíntese usando a luz do sol",
+    "O futebol é o esporte mais popular do Brasil",
+    "A seleção brasileira de futebol venceu cinco copas",
+    "Rios da Amazônia levam água e sedimentos ao oceano",
+    "A terra gira em torno do sol em um ano",
+]
+QUERIES = ["luz do sol", "futebol no Brasil", "água dos rios", "a terra e a lua"]
+PARAMS = {"min_df": 1, "max_df": 1.0, "max_features": None}
+
+
+@pytest.fixture
+def monolithic():
+    ts = TextSimilarity(**PARAMS)
+    ts.fit(CORPUS)
+    return ts
+
+
+@pytest.fixture
+def sharded():
+    ts = ShardedTextSimilarity(n_shards=3, **PARAMS)
+    ts.fit(CORPUS)
+    return ts
+
+
+def ids(ranked):
+    return [i for i, _ in ranked]
+
+
+def test_vocabulary_and_idf_match_monolithic(monolithic, sharded):
+    """Testa que o fit por faixas gera o mesmo vocabulário e IDF globais"""
+    assert sharded.vectorizer.vocabulary_ == monolithic.vectorizer.vocabulary_
+    np.testing.assert_allclose(sharded.vectorizer.idf_, monolithic.vectorizer.idf_)
+    assert sharded.n_docs == len(CORPUS)
+
+
+def test_max_features_matches_monolithic():
+    """Testa o corte por max_features com contagens somadas entre faixas"""
+    mono = TextSimilarity(min_df=1, max_df=1.0, max_features=10)
+    mono.fit(CORPUS)
+    shard = ShardedTextSimilarity(n_shards=2, min_df=1, max_df=1.0, max_features=10)
+    shard.fit(CORPUS)
+    assert shard.vectorizer.vocabulary_ == mono.vectorizer.vocabulary_
+
+
+def test_rank_matches_monolithic(monolithic, sharded):
+    """Testa que o merge dos top-k das faixas dá o mesmo ranking"""
+    for query in QUERIES:
+        expected = monolithic.rank(query, top_k=4)
+        got = sharded.rank(query, top_k=4)
+        assert ids(got) == ids(expected)
+        np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], rtol=1e-5)
+
+
+def test_rank_with_candidates(monolithic, sharded):
+    """Testa candidatos distribuídos entre faixas (e faixas sem candidatos)"""
+    candidates = np.array([1, 2, 6])
+    assert ids(sharded.rank("luz do sol", 5, candidates)) == ids(
+        monolithic.rank("luz do sol", 5, candidates)
+    )
+    assert sharded.rank("luz do sol", 5, np.array([], dtype=np.int64)) == []
+
+
+def test_rank_many_matches_rank(sharded):
+    """Testa que a versão em lote ranqueia igual à unitária"""
+    batch = sharded.rank_many(QUERIES, top_k=3)
+    assert [ids(r) for r in batch] == [ids(sharded.rank(q, top_k=3)) for q in QUERIES]
+
+
+def test_save_and_load_roundtrip(sharded, tmp_path):
+    """Testa que o artefato particionado recarregado ranqueia igual ao treinado"""
+    path = str(tmp_path / "lexical")
+    sharded.save(path, corpus_sha1="abc", doc_ids=[str(i) for i in range(len(CORPUS))])
+
+    loaded = ShardedTextSimilarity.load(path, corpus_sha1="abc")
+    assert loaded.n_shards == 3
+    assert loaded.n_docs == len(CORPUS)
+    assert loaded.doc_ids[-1] == str(len(CORPUS) - 1)
+    for query in QUERIES:
+        assert loaded.rank(query, top_k=3) == sharded.rank(query, top_k=3)
+
+
+def test_load_rejects_other_layout(monolithic, sharded, tmp_path):
+    """Testa que artefatos monolítico e particionado não se confundem"""
+    mono_path, shard_path = str(tmp_path / "mono"), str(tmp_path / "shard")
+    monolithic.save(mono_path, corpus_sha1="abc")
+    sharded.save(shard_path, corpus_sha1="abc")
+
+    with pytest.raises(ValueError, match="incompatível"):
+        ShardedTextSimilarity.load(mono_path, corpus_sha1="abc")
+    with pytest.raises(ValueError, match="incompatível"):
+        TextSimilarity.load(shard_path, corpus_sha1="abc")
+
+
+def test_exclude_matches_monolithic(monolithic, sharded):
+    """Testa que documentos excluídos saem antes do top-k em todas as faixas"""
+    exclude = np.zeros(len(CORPUS), dtype=bool)
+    exclude[[0, 4]] = True
+    for query in QUERIES:
+        expected = ids(monolithic.rank(query, top_k=3, exclude=exclude))
+        assert not {0, 4} & set(expected)
+        assert ids(sharded.rank(query, top_k=3, exclude=exclude)) == expected
+    assert [ids(r) for r in sharded.rank_many(QUERIES, top_k=3, exclude=exclude)] == [
+        ids(r) for r in monolithic.rank_many(QUERIES, top_k=3, exclude=exclude)
+    ]
+
+
+def test_min_df_prefilter_matches_monolithic():
+    """Testa que o pré-filtro por bucket de df mantém o vocabulário e o IDF do sklearn"""
+    mono = TextSimilarity(min_df=2, max_df=1.0, max_features=None)
+    mono.fit(CORPUS)
+    shard = ShardedTextSimilarity(n_shards=3, min_df=2, max_df=1.0, max_features=None)
+    shard.fit(CORPUS)
+    assert shard.vectorizer.vocabulary_ == mono.vectorizer.vocabulary_
+    np.testing.assert_allclose(shard.vectorizer.idf_, mono.vectorizer.idf_)
+    for query in QUERIES:
+        assert ids(shard.rank(query, top_k=3)) == ids(mono.rank(query, top_k=3))
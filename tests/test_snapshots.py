@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, Mock
+
+from app.ai.semantic.indexer import Indexer, doc_id
+from app.ai.semantic.manifest import IndexManifest
+from app.config.config import Config
+from app.services.compare_service import CorpusIndexes
+from app.services.snapshots import (
+    SnapshotManager,
+    read_published,
+    resolve_snapshot,
+    snapshot_config,
+)
+from app.utils.json_utils import read_json, write_json_atomic
+from benchmarks.encoders import HashingEncoder, HashingSparseEncoder
+from scripts.compact import compact
+from scripts.indexer import index_corpus, prune_versions, publish_version
+
+
+def _config(tmp_path) -> Config:
+    cfg = Config()
+    cfg.vector_backend = "local"
+    cfg.qdrant_local_path = ":memory:"
+    cfg.index_version_path = str(tmp_path / "version.json")
+    cfg.index_versions_path = str(tmp_path / "versions")
+    cfg.manifest_path = str(tmp_path / "manifest.json")
+    return cfg
+
+
+def _factory():
+    """Fábrica de serviços falsos, um por chamada, com aquecimento assíncrono"""
+
+    def build(config, retriever=None, corpus_sha1=None):
+        svc = Mock(config=config, corpus_sha1=corpus_sha1)
+        svc.awarm_up = AsyncMock()
+        return svc
+
+    return Mock(side_effect=build)
+
+
+def test_snapshot_config_points_to_version(tmp_path):
+    """Testa artefatos e coleções da versão, e o fallback para o layout sem versões"""
+    cfg = _config(tmp_path)
+    vcfg = snapshot_config(cfg, "v1")
+    assert vcfg.lexical_index_path == os.path.join(cfg.index_versions_path, "v1", "lexical")
+    assert vcfg.qdrant_collection_hybrid == f"{cfg.qdrant_collection_hybrid}__v1"
+    assert cfg.lexical_index_path == "data/index/lexical"
+
+    write_json_atomic(cfg.index_version_path, {"version": "v1", "corpus_sha1": "abc"})
+    assert resolve_snapshot(cfg) == (cfg, None)
+
+    os.makedirs(os.path.join(cfg.index_versions_path, "v1"))
+    resolved, corpus_sha1 = resolve_snapshot(cfg)
+    assert resolved.document_store_path == vcfg.document_store_path
+    assert corpus_sha1 == "abc"
+
+
+def test_manager_swaps_to_published_version(tmp_path):
+    """Testa a troca de versão com o serviço antigo intacto para quem já o tinha"""
+    cfg = _config(tmp_path)
+    for version in ("v1", "v2"):
+        os.makedirs(os.path.join(cfg.index_versions_path, version))
+    write_json_atomic(cfg.index_version_path, {"version": "v1", "corpus_sha1": "a"})
+    factory = _factory()
+    manager = SnapshotManager(cfg, factory)
+
+    old = manager.current()
+    assert manager.current() is old
+    assert not asyncio.run(manager.reload())
+
+    write_json_atomic(cfg.index_version_path, {"version": "v2", "corpus_sha1": "b"})
+    assert asyncio.run(manager.reload())
+    new = manager.current()
+    assert new is not old
+    assert manager.version == "v2"
+    assert new.corpus_sha1 == "b"
+    new.awarm_up.assert_awaited_once()
+    old.release.assert_called_once()
+    assert factory.call_args.kwargs["retriever"] is old.retriever
+
+
+def test_manager_keeps_old_version_on_failure(tmp_path):
+    """Testa que uma versão que falha ao carregar não derruba a em uso"""
+    cfg = _config(tmp_path)
+    write_json_atomic(cfg.index_version_path, {"version": "v1"})
+    factory = _factory()
+    manager = SnapshotManager(cfg, factory)
+    old = manager.current()
+
+    write_json_atomic(cfg.index_version_path, {"version": "v2"})
+    factory.side_effect = RuntimeError("artefato corrompido")
+    assert not asyncio.run(manager.reload())
+    assert manager.current() is old
+    assert manager.version == "v1"
+
+
+def test_publish_and_prune_versions(tmp_path):
+    """Testa aliases, histórico de versões e remoção das versões antigas"""
+    cfg = _config(tmp_path)
+    cfg.index_keep_versions = 2
+    idx = Indexer(cfg)
+    manifest = IndexManifest.load(cfg.manifest_path)
+    # layout antigo: coleção real com o nome público
+    idx.ensure_collection_hybrid(cfg.qdrant_collection_hybrid, dense_size=2)
+
+    for version in ("v1", "v2", "v3"):
+        vcfg = snapshot_config(cfg, version)
+        idx.ensure_collection_hybrid(vcfg.qdrant_collection_hybrid, dense_size=2)
+        idx.ensure_collection_passages(vcfg.qdrant_collection_passages, dense_size=2)
+        manifest.update(vcfg.qdrant_collection_hybrid, {}, count=0)
+        os.makedirs(os.path.join(cfg.index_versions_path, version))
+        publish_version(cfg, idx, version, corpus_sha1=version)
+    prune_versions(cfg, idx, manifest)
+
+    aliases = {a.alias_name: a.collection_name for a in idx.client.get_aliases().aliases}
+    assert aliases[cfg.qdrant_collection_hybrid] == f"{cfg.qdrant_collection_hybrid}__v3"
+    assert read_json(cfg.index_version_path)["history"] == ["v2", "v1"]
+    assert sorted(os.listdir(cfg.index_versions_path)) == ["v2", "v3"]
+    assert not idx.collection_exists(f"{cfg.qdrant_collection_passages}__v1")
+    assert idx.collection_exists(f"{cfg.qdrant_collection_passages}__v2")
+    assert manifest.points(f"{cfg.qdrant_collection_hybrid}__v1", count=0) is None
+
+
+def test_compact_publishes_journal_as_new_version(tmp_path):
+    """Testa a compactação do journal numa nova versão, com as coleções da de origem"""
+    cfg = _config(tmp_path)
+    cfg.data_path = str(tmp_path / "corpus.jsonl")
+    cfg.update_journal_path = str(tmp_path / "updates.jsonl")
+    texts = ["redação sobre meio ambiente", "redação sobre escola pública", "tecnologia na escola"]
+    with open(cfg.data_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"text": t}) + "\n" for t in texts)
+
+    idx = Indexer(cfg)
+    vcfg = snapshot_config(cfg, "v1")
+    idx.ensure_collection_hybrid(vcfg.qdrant_collection_hybrid, dense_size=2)
+    idx.ensure_collection_passages(vcfg.qdrant_collection_passages, dense_size=2)
+    os.makedirs(os.path.join(cfg.index_versions_path, "v1"))
+    worker = CorpusIndexes(vcfg)
+    publish_version(cfg, idx, "v1", corpus_sha1=worker.corpus_sha1)
+
+    added = worker.add_documents(["vulcões e terremotos na escola"])
+    assert worker.delete_document(doc_id(texts[0])) == 0
+    assert compact(cfg, idx) is None
+    version = compact(cfg, idx, force=True)
+
+    assert version.startswith("v1+")
+    assert read_published(cfg)["version"] == version
+    assert os.path.getsize(cfg.update_journal_path) == 0
+    assert worker.sync_updates() == 0
+
+    ncfg, corpus_sha1 = resolve_snapshot(cfg)
+    assert ncfg.qdrant_collection_hybrid == vcfg.qdrant_collection_hybrid
+    fresh = CorpusIndexes(ncfg, corpus_sha1)
+    assert list(fresh.texts) == [*texts[1:], "vulcões e terremotos na escola"]
+    assert fresh.tfidf.n_delta == fresh.tfidf.n_deleted == 0
+    assert fresh.parent_index[added[0]["id"]] == 2
+    assert doc_id(texts[0]) not in fresh.parent_index
+    with open(cfg.data_path, encoding="utf-8") as f:
+        assert [json.loads(line)["text"] for line in f] == list(fresh.texts)
+
+
+def test_indexer_keeps_compacted_changes(tmp_path):
+    """Testa que a indexação depois de uma compactação mantém as alterações feitas pela API"""
+    cfg = _config(tmp_path)
+    cfg.data_path = str(tmp_path / "corpus.jsonl")
+    cfg.update_journal_path = str(tmp_path / "updates.jsonl")
+    cfg.embedding_store_path = ""
+    texts = ["redação sobre meio ambiente", "redação sobre escola pública", "tecnologia na escola"]
+    with open(cfg.data_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"text": t}) + "\n" for t in texts)
+
+    idx = Indexer(cfg)
+    idx._dense_encoder = HashingEncoder()
+    idx._sparse_encoder = HashingSparseEncoder()
+    index_corpus(cfg, idx)
+    worker = CorpusIndexes(*resolve_snapshot(cfg))
+    added = worker.add_documents(["vulcões e terremotos na escola"])[0]["id"]
+    worker.delete_document(doc_id(texts[0]))
+    version = compact(cfg, idx, force=True)
+
+    assert index_corpus(cfg, idx) == version
+    vcfg, corpus_sha1 = resolve_snapshot(cfg)
+    fresh = CorpusIndexes(vcfg, corpus_sha1)
+    assert added in fresh.parent_index
+    assert doc_id(texts[0]) not in fresh.parent_index
+    points = idx.client.retrieve(vcfg.qdrant_collection_hybrid, [added, doc_id(texts[0])])
+    assert [str(p.id) for p in points] == [added]
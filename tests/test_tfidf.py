@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.ai.lexical.tfidf import TextSimilarity
+
+CORPUS = [
+    "O sol é uma estrela no centro do sistema solar",
+    "A lua orbita a terra e reflete a luz do sol",
+    "Plantas fazem fotossíntese usando a luz do sol",
+    "O futebol é o esporte mais popular do Brasil",
+]
+
+
+@pytest.fixture
+def fitted():
+    ts = TextSimilarity(min_df=1, max_df=1.0)
+    ts.fit(CORPUS)
+    return ts
+
+
+def test_rank_returns_most_similar_first(fitted):
+    """Testa ranking básico"""
+    ranked = fitted.rank("esporte popular no Brasil", top_k=2)
+    assert ranked[0][0] == 3
+    assert len(ranked) == 2
+
+
+def test_save_and_load_roundtrip(fitted, tmp_path):
+    """Testa que o artefato carregado ranqueia igual ao treinado"""
+    path = str(tmp_path / "lexical")
+    fitted.save(path, corpus_sha1="abc", doc_ids=["a", "b", "c", "d"])
+
+    loaded = TextSimilarity.load(path, corpus_sha1="abc")
+    assert loaded.n_docs == len(CORPUS)
+    assert loaded.doc_ids == ["a", "b", "c", "d"]
+    assert loaded.rank("luz do sol", top_k=3) == fitted.rank("luz do sol", top_k=3)
+
+
+def test_load_stale_or_missing(fitted, tmp_path):
+    """Testa artefato desatualizado e inexistente"""
+    path = str(tmp_path / "lexical")
+    with pytest.raises(FileNotFoundError):
+        TextSimilarity.load(path)
+
+    fitted.save(path, corpus_sha1="abc")
+    with pytest.raises(ValueError, match="desatualizado"):
+        TextSimilarity.load(path, corpus_sha1="outro")
+
+
+def test_rank_many_matches_rank(fitted):
+    """Testa que o ranking em lote bate com o individual"""
+    queries = ["luz do sol", "esporte popular no Brasil"]
+    assert fitted.rank_many(queries, top_k=2) == [fitted.rank(q, top_k=2) for q in queries]
+
+
+def test_rank_without_vocabulary_overlap(fitted):
+    """Testa saída antecipada quando a query não tem termos do vocabulário"""
+    assert fitted.rank("xyzzy qwerty", top_k=3) == []
+    assert fitted.rank_many(["xyzzy", "luz do sol"], top_k=1)[0] == []
+    assert fitted.top1("xyzzy") is None
+
+
+def test_rank_restricted_to_candidates(fitted):
+    """Testa o ranking só nas linhas pré-filtradas"""
+    assert fitted.rank("luz do sol", top_k=3, candidates=np.array([2, 3])) == [
+        r for r in fitted.rank("luz do sol", top_k=4) if r[0] in {2, 3}
+    ]
+    assert fitted.rank("luz do sol", candidates=np.array([], dtype=np.int64)) == []
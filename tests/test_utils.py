@@ -1,6 +1,7 @@
 import os
 import tempfile
 
+from app.utils.hash_utils import file_sha1
 from app.utils.json_utils import iter_jsonl, load_pt_corpus_from_jsonl
 
 
@@ -38,3 +39,15 @@ def test_iter_jsonl():
         assert items[1]["text"] == "Texto 2"
     finally:
         os.unlink(temp_file)
+
+
+def test_file_sha1():
+    """Testa hash do conteúdo de arquivo"""
+    with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+        f.write(b"abc")
+        temp_file = f.name
+
+    try:
+        assert file_sha1(temp_file) == "a9993e364706816aba3e25717850c26c9cd0d89d"
+    finally:
+        os.unlink(temp_file)